@@ -0,0 +1,376 @@
+"""
+Admission control: shed load at the door instead of letting a burst pile
+up in the threadpool and the DB pool queue until everything times out.
+
+Every API request falls into a route class:
+
+    auth    POST /token, /token/refresh (Argon2: CPU + 64 MB per hash)
+    heavy   full transaction / customer lists, customer search, the ledger
+            summary, reports, bulk import, ledger verify, job results
+    write   other POST / PUT / DELETE
+    read    other GETs
+
+Each class has its own concurrency limit, so a flood of reports can't take
+the slots that cheap reads need. The limits split this worker's DB
+connections (pool_size + max_overflow), so admitted requests don't queue
+again for a connection. Requests over the limit wait in a bounded FIFO
+queue:
+
+    * queue full                                 -> 503 + Retry-After
+    * estimated wait (queue position x recent handler time / concurrency)
+      longer than the class's max wait, or the client's
+      `X-Request-Timeout: <seconds>`             -> 503 + Retry-After, at once
+    * still waiting when that time is up         -> 503 + Retry-After
+
+Each caller (the user in the bearer token, otherwise the client IP) also
+has a token bucket per class: a user can run a couple of reports a second
+but dozens of cheap reads, and exhausting one doesn't block the other.
+An empty bucket gets 429 + Retry-After.
+
+Limits are per worker process: with serve.py's N workers a user gets up
+to N x the rate in total. Behind a proxy, run uvicorn with
+--proxy-headers so anonymous callers are keyed by their real IP.
+"""
+
+import asyncio
+import functools
+import math
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+
+import auth
+
+# ⚙️ CONFIGURATION
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+RATE_LIMIT_MAX_CALLERS = int(os.getenv("RATE_LIMIT_MAX_CALLERS", "10000"))
+
+TIMEOUT_HEADER = b"x-request-timeout"
+
+_API_PREFIXES = (
+    "/token",
+    "/admin",
+    "/customers",
+    "/transactions",
+    "/reports",
+    "/jobs",
+    "/sync",
+)
+_AUTH_PATHS = ("/token", "/token/refresh")
+_HEAVY = {
+    "GET": re.compile(
+        r"^/(customers/|customers/search/|transactions/|transactions/summary/"
+        r"|sync/|reports/.*|jobs/[^/]+/result)$"
+    ),
+    "POST": re.compile(r"^/(customers/bulk|admin/ledger/verify)$"),
+}
+
+
+@dataclass
+class RouteClass:
+    name: str
+    concurrency: int
+    queue: int
+    max_wait: float  # seconds a request may wait for a slot
+    rate: float  # per caller: requests per second...
+    burst: float  # ...and how many can come at once
+
+
+def _route_class(name: str, **defaults) -> RouteClass:
+    # ADMISSION_HEAVY_CONCURRENCY=8, ADMISSION_READ_RATE=50 etc. override these
+    env = f"ADMISSION_{name.upper()}_"
+    values = {
+        key: type(value)(os.getenv(env + key.upper(), value))
+        for key, value in defaults.items()
+    }
+    return RouteClass(name, **values)
+
+
+def plan_route_classes(connections: int) -> Dict[str, RouteClass]:
+    """Split a worker's DB connections across the route classes."""
+    heavy = max(connections // 6, 1)
+    write = max(connections // 4, 1)
+    login = 2  # Argon2 is memory-hard; a few at a time is plenty
+    read = max(connections - heavy - write - login, 2)
+    return {
+        rc.name: rc
+        for rc in (
+            _route_class(
+                "read",
+                concurrency=read,
+                queue=read * 8,
+                max_wait=2.0,
+                rate=20.0,
+                burst=60.0,
+            ),
+            _route_class(
+                "write",
+                concurrency=write,
+                queue=write * 8,
+                max_wait=5.0,
+                rate=5.0,
+                burst=20.0,
+            ),
+            _route_class(
+                "heavy",
+                concurrency=heavy,
+                queue=heavy * 4,
+                max_wait=10.0,
+                rate=2.0,
+                burst=10.0,
+            ),
+            # Keyed by IP (no token yet): leave room for an office behind NAT
+            _route_class(
+                "auth", concurrency=login, queue=16, max_wait=5.0, rate=1.0, burst=20.0
+            ),
+        )
+    }
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Route class for a request, or None for CORS preflights / the frontend."""
+    if method == "OPTIONS" or not path.startswith(_API_PREFIXES):
+        return None
+    if method == "POST" and path in _AUTH_PATHS:
+        return "auth"
+    heavy = _HEAVY.get(method)
+    if heavy is not None and heavy.match(path):
+        return "heavy"
+    return "read" if method in ("GET", "HEAD") else "write"
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(math.ceil(retry_after), 1)
+
+
+# ===========================
+# 1. CONCURRENCY GATES
+# ===========================
+
+
+class Gate:
+    """Concurrency limit + bounded FIFO queue for one route class."""
+
+    def __init__(self, route_class: RouteClass):
+        self.rc = route_class
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # Recent handler time (EWMA), for the queue-wait estimate
+        self.service_time = 0.05
+        self.admitted = 0
+        self.shed = 0
+
+    def estimated_wait(self) -> float:
+        # Everyone already queued plus us, served `concurrency` at a time
+        return (len(self.waiters) + 1) / self.rc.concurrency * self.service_time
+
+    async def acquire(self, budget: float):
+        if self.active < self.rc.concurrency and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        # Shed now rather than after a wait the caller can't afford
+        wait = self.estimated_wait()
+        if len(self.waiters) >= self.rc.queue or wait > budget:
+            self.shed += 1
+            raise Rejected(503, "Server busy, please retry.", wait)
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, budget)
+        except asyncio.TimeoutError:
+            self._abandon(fut)
+            self.shed += 1
+            raise Rejected(503, "Server busy, please retry.", self.estimated_wait())
+        except BaseException:
+            self._abandon(fut)
+            raise
+        self.admitted += 1
+
+    def _abandon(self, fut: asyncio.Future):
+        if fut.done() and not fut.cancelled():
+            self.release()  # a slot was handed over just as we gave up: pass it on
+            return
+        fut.cancel()
+        try:
+            self.waiters.remove(fut)
+        except ValueError:
+            pass
+
+    def release(self):
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # the slot goes straight to the next in line
+                return
+        self.active -= 1
+
+    def observe(self, seconds: float):
+        self.service_time += (seconds - self.service_time) * 0.2
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.rc.concurrency,
+            "queue_limit": self.rc.queue,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "avg_ms": round(self.service_time * 1000, 1),
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+# ===========================
+# 2. PER-CALLER RATE LIMITS
+# ===========================
+
+
+class TokenBuckets:
+    """A route class's per-caller buckets; least recently seen evicted first."""
+
+    def __init__(self, rate: float, burst: float, max_callers: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_callers = max_callers
+        self.buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self.limited = 0
+
+    def take(self, key: str) -> float:
+        """Spend a token. Returns 0, or the seconds until there is one."""
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+            self.limited += 1
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_callers:
+            self.buckets.popitem(last=False)
+        return wait
+
+
+@functools.lru_cache(maxsize=4096)
+def _token_subject(token: str) -> Optional[str]:
+    # Only keys the rate limit; get_current_user still does the real checks
+    try:
+        return jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]).get(
+            "sub"
+        )
+    except JWTError:
+        return None
+
+
+def _caller(scope, authorization: bytes) -> str:
+    if authorization[:7].lower() == b"bearer ":
+        subject = _token_subject(authorization[7:].decode("latin-1"))
+        if subject:
+            return f"user:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+# ===========================
+# 3. MIDDLEWARE
+# ===========================
+
+
+class AdmissionController:
+    """Per-app state: a gate and rate-limit buckets per route class."""
+
+    def __init__(self, route_classes: Dict[str, RouteClass]):
+        self.gates = {name: Gate(rc) for name, rc in route_classes.items()}
+        self.buckets = {
+            name: TokenBuckets(rc.rate, rc.burst, RATE_LIMIT_MAX_CALLERS)
+            for name, rc in route_classes.items()
+        }
+
+    def stats(self) -> dict:
+        classes = {}
+        for name, gate in self.gates.items():
+            buckets = self.buckets[name]
+            classes[name] = {
+                **gate.stats(),
+                "rate": buckets.rate,
+                "burst": buckets.burst,
+                "callers": len(buckets.buckets),
+                "rate_limited": buckets.limited,
+            }
+        return {"enabled": True, "classes": classes}
+
+
+class AdmissionMiddleware:
+    """Pure ASGI (no per-request BaseHTTPMiddleware overhead)."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            return await self.app(scope, receive, send)
+
+        gate = self.controller.gates[name]
+        authorization, budget = b"", gate.rc.max_wait
+        for key, value in scope["headers"]:
+            if key == b"authorization":
+                authorization = value
+            elif key == TIMEOUT_HEADER:
+                try:
+                    budget = min(budget, max(float(value), 0.0))
+                except ValueError:
+                    pass
+
+        try:
+            wait = self.controller.buckets[name].take(_caller(scope, authorization))
+            if wait:
+                raise Rejected(429, "Too many requests, slow down.", wait)
+            await gate.acquire(budget)
+        except Rejected as e:
+            response = JSONResponse(
+                {"detail": e.detail},
+                status_code=e.status_code,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            return await response(scope, receive, send)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.observe(time.perf_counter() - started)
+            gate.release()
+
+
+def install(app, connections: int):
+    """
+    Add admission control (unless ADMISSION_ENABLED=0), sized for
+    `connections` DB connections per worker.
+    """
+    if not ADMISSION_ENABLED:
+        app.state.admission = None
+        return
+    controller = AdmissionController(plan_route_classes(connections))
+    app.state.admission = controller
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+
+def stats(app) -> dict:
+    controller = getattr(app.state, "admission", None)
+    return {"enabled": False} if controller is None else controller.stats()
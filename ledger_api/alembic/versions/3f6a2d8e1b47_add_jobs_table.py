@@ -0,0 +1,44 @@
+"""Add jobs table for background reports/exports
+
+Revision ID: 3f6a2d8e1b47
+Revises: c9b140db1923
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f6a2d8e1b47"
+down_revision: Union[str, Sequence[str], None] = "c9b140db1923"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("JobID", sa.String(length=32), nullable=False),
+        sa.Column("Kind", sa.String(length=50), nullable=True),
+        sa.Column("Status", sa.String(length=20), nullable=True),
+        sa.Column("Progress", sa.Float(), nullable=True),
+        sa.Column("Params", sa.Text(), nullable=True),
+        sa.Column("ResultPath", sa.String(length=500), nullable=True),
+        sa.Column("Error", sa.String(length=1000), nullable=True),
+        sa.Column("CreatedBy", sa.Integer(), nullable=True),
+        sa.Column("CreatedAt", sa.DateTime(), nullable=True),
+        sa.Column("StartedAt", sa.DateTime(), nullable=True),
+        sa.Column("FinishedAt", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["CreatedBy"], ["users.id"]),
+        sa.PrimaryKeyConstraint("JobID"),
+    )
+    op.create_index(op.f("ix_jobs_Status"), "jobs", ["Status"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_jobs_Status"), table_name="jobs")
+    op.drop_table("jobs")
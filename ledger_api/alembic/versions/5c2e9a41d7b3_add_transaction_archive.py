@@ -0,0 +1,156 @@
+"""Add TransactionsArchive, CustomerArchiveTotals and EntryDate partitioning
+
+Revision ID: 5c2e9a41d7b3
+Revises: 8b1d4c7e2f90
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from datetime import date, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from online_migrations import create_index_online, unestimated_step
+
+# revision identifiers, used by Alembic.
+revision: str = "5c2e9a41d7b3"
+down_revision: Union[str, Sequence[str], None] = "8b1d4c7e2f90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# First monthly partition boundary on MSSQL. Later months are added with
+# `python archive.py partitions`.
+FIRST_PARTITION_MONTH = date(2024, 1, 1)
+
+
+def _monthly_boundaries(months_ahead: int = 12):
+    month = FIRST_PARTITION_MONTH
+    last = date.today() + timedelta(days=31 * months_ahead)
+    while month <= last:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def _archive_columns():
+    return [
+        sa.Column("TransactionID", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("CustomerID", sa.Integer(), nullable=True),
+        sa.Column("Amount", sa.DECIMAL(precision=18, scale=2), nullable=True),
+        sa.Column("EntryDate", sa.DateTime(), nullable=True),
+        sa.Column("Notes", sa.String(), nullable=True),
+        sa.Column("PrevHash", sa.String(length=64), nullable=True),
+        sa.Column("RowHash", sa.String(length=64), nullable=True),
+        sa.Column("ArchivedAt", sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # 1. HOT TABLE: index EntryDate so date-filtered queries stop scanning
+    # === AZURE SQL: monthly partitioned index (Ledger rows are never moved) ===
+    if bind.engine.name == "mssql":
+        # Hand-written DDL: plan lists it without a time
+        unestimated_step(
+            "partitioned index ix_Transactions_EntryDate", "Transactions", "dbo"
+        )
+        boundaries = ", ".join(f"'{m.isoformat()}'" for m in _monthly_boundaries())
+        op.execute(f"""
+            CREATE PARTITION FUNCTION pf_TransactionsMonthly (DATETIME)
+            AS RANGE RIGHT FOR VALUES ({boundaries});
+        """)
+        op.execute("""
+            CREATE PARTITION SCHEME ps_TransactionsMonthly
+            AS PARTITION pf_TransactionsMonthly ALL TO ([PRIMARY]);
+        """)
+        op.execute("""
+            CREATE NONCLUSTERED INDEX [ix_Transactions_EntryDate]
+            ON [dbo].[Transactions] ([EntryDate])
+            INCLUDE ([CustomerID], [Amount])
+            ON ps_TransactionsMonthly ([EntryDate]);
+        """)
+    else:
+        create_index_online("ix_Transactions_EntryDate", "Transactions", ["EntryDate"])
+
+    # 2. ARCHIVE TABLE
+    # === POSTGRES: range-partitioned by EntryDate (yearly, created on demand) ===
+    if bind.engine.name == "postgresql":
+        op.execute("""
+            CREATE TABLE "TransactionsArchive" (
+                "TransactionID" INTEGER NOT NULL,
+                "CustomerID" INTEGER NULL,
+                "Amount" NUMERIC(18, 2) NULL,
+                "EntryDate" TIMESTAMP WITHOUT TIME ZONE NULL,
+                "Notes" VARCHAR NULL,
+                "PrevHash" VARCHAR(64) NULL,
+                "RowHash" VARCHAR(64) NULL,
+                "ArchivedAt" TIMESTAMP WITHOUT TIME ZONE NULL
+            ) PARTITION BY RANGE ("EntryDate");
+        """)
+        op.execute(
+            'CREATE TABLE "TransactionsArchive_default" '
+            'PARTITION OF "TransactionsArchive" DEFAULT;'
+        )
+    # === SQLITE / MSSQL: plain table (stays empty on MSSQL) ===
+    else:
+        op.create_table(
+            "TransactionsArchive",
+            *_archive_columns(),
+            sa.PrimaryKeyConstraint("TransactionID"),
+        )
+    op.create_index(
+        op.f("ix_TransactionsArchive_CustomerID"),
+        "TransactionsArchive",
+        ["CustomerID"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_TransactionsArchive_EntryDate"),
+        "TransactionsArchive",
+        ["EntryDate"],
+        unique=False,
+    )
+    if bind.engine.name == "postgresql":
+        op.create_index(
+            op.f("ix_TransactionsArchive_TransactionID"),
+            "TransactionsArchive",
+            ["TransactionID"],
+            unique=False,
+        )
+
+    # 3. ARCHIVED BALANCES
+    op.create_table(
+        "CustomerArchiveTotals",
+        sa.Column("CustomerID", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("ArchivedAmount", sa.DECIMAL(precision=18, scale=2), nullable=True),
+        sa.Column("ArchivedRows", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["CustomerID"], ["Customers.CustomerID"]),
+        sa.PrimaryKeyConstraint("CustomerID"),
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    op.drop_table("CustomerArchiveTotals")
+    if bind.engine.name == "postgresql":
+        op.drop_index(
+            op.f("ix_TransactionsArchive_TransactionID"),
+            table_name="TransactionsArchive",
+        )
+    op.drop_index(
+        op.f("ix_TransactionsArchive_EntryDate"), table_name="TransactionsArchive"
+    )
+    op.drop_index(
+        op.f("ix_TransactionsArchive_CustomerID"), table_name="TransactionsArchive"
+    )
+    op.drop_table("TransactionsArchive")
+
+    if bind.engine.name == "mssql":
+        op.execute("DROP INDEX [ix_Transactions_EntryDate] ON [dbo].[Transactions];")
+        op.execute("DROP PARTITION SCHEME ps_TransactionsMonthly;")
+        op.execute("DROP PARTITION FUNCTION pf_TransactionsMonthly;")
+    else:
+        op.drop_index(op.f("ix_Transactions_EntryDate"), table_name="Transactions")
@@ -0,0 +1,83 @@
+"""Add hash chain columns to Transactions and ChainCheckpoints table
+
+Revision ID: 8b1d4c7e2f90
+Revises: 3f6a2d8e1b47
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from online_migrations import unestimated_step
+
+# revision identifiers, used by Alembic.
+revision: str = "8b1d4c7e2f90"
+down_revision: Union[str, Sequence[str], None] = "3f6a2d8e1b47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    # 1. Chain columns (nullable, so this is a metadata-only change)
+    op.add_column(
+        "Transactions",
+        sa.Column("PrevHash", sa.String(length=64), nullable=True),
+        schema=schema,
+    )
+    op.add_column(
+        "Transactions",
+        sa.Column("RowHash", sa.String(length=64), nullable=True),
+        schema=schema,
+    )
+
+    # 2. Verification checkpoints
+    op.create_table(
+        "ChainCheckpoints",
+        sa.Column("CheckpointID", sa.Integer(), nullable=False),
+        sa.Column("LastTransactionID", sa.Integer(), nullable=True),
+        sa.Column("LastHash", sa.String(length=64), nullable=True),
+        sa.Column("RowsVerified", sa.Integer(), nullable=True),
+        sa.Column("VerifiedAt", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("CheckpointID"),
+    )
+    op.create_index(
+        op.f("ix_ChainCheckpoints_LastTransactionID"),
+        "ChainCheckpoints",
+        ["LastTransactionID"],
+        unique=False,
+    )
+
+    # 3. Chain the rows that already exist (needs a live connection). Not on
+    # Azure SQL: the Ledger table already covers them, and rewriting every
+    # row would copy the whole table into TransactionsHistory
+    if bind.engine.name == "mssql":
+        return
+    if context.is_offline_mode():
+        # Hashes are computed in Python, row by row: plan can't time it
+        unestimated_step("hash chain backfill of Transactions", "Transactions")
+        print("-- NOTE: run 'python ledger_chain.py backfill' after this script.")
+        return
+
+    import ledger_chain
+
+    ledger_chain.backfill(Session(bind=bind))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    op.drop_index(
+        op.f("ix_ChainCheckpoints_LastTransactionID"), table_name="ChainCheckpoints"
+    )
+    op.drop_table("ChainCheckpoints")
+    with op.batch_alter_table("Transactions", schema=schema) as batch_op:
+        batch_op.drop_column("RowHash")
+        batch_op.drop_column("PrevHash")
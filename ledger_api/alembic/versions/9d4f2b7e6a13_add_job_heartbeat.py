@@ -0,0 +1,29 @@
+"""Add jobs.HeartbeatAt so abandoned jobs can be recovered
+
+Revision ID: 9d4f2b7e6a13
+Revises: f3c8a5e2d1b9
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4f2b7e6a13"
+down_revision: Union[str, Sequence[str], None] = "f3c8a5e2d1b9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable: existing rows fall back to StartedAt / CreatedAt
+    op.add_column("jobs", sa.Column("HeartbeatAt", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("HeartbeatAt")
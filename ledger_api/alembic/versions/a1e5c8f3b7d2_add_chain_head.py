@@ -0,0 +1,66 @@
+"""Add ChainHead: the lock row that serializes hash-chain inserts
+
+Revision ID: a1e5c8f3b7d2
+Revises: 9d4f2b7e6a13
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a1e5c8f3b7d2"
+down_revision: Union[str, Sequence[str], None] = "9d4f2b7e6a13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GENESIS_HASH = "0" * 64
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    head = op.create_table(
+        "ChainHead",
+        sa.Column("HeadID", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("LastTransactionID", sa.Integer(), nullable=True),
+        sa.Column("LastHash", sa.String(length=64), nullable=True),
+        sa.PrimaryKeyConstraint("HeadID"),
+    )
+
+    # Start at the newest chained row (none on Azure SQL, which skipped the
+    # backfill: the first new row then chains onto the genesis hash).
+    # Otherwise the app creates the row on its first insert.
+    if context.is_offline_mode():
+        return
+    last = None
+    for name in ("Transactions", "TransactionsArchive"):
+        t = sa.table(
+            name, sa.column("TransactionID"), sa.column("RowHash"), schema=schema
+        )
+        row = bind.execute(
+            sa.select(t.c.TransactionID, t.c.RowHash)
+            .where(t.c.RowHash.isnot(None))
+            .order_by(t.c.TransactionID.desc())
+            .limit(1)
+        ).first()
+        if row is not None and (last is None or row.TransactionID > last.TransactionID):
+            last = row
+    op.bulk_insert(
+        head,
+        [
+            {
+                "HeadID": 1,
+                "LastTransactionID": last.TransactionID if last else 0,
+                "LastHash": last.RowHash if last else GENESIS_HASH,
+            }
+        ],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ChainHead")
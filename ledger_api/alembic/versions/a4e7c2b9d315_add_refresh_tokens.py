@@ -0,0 +1,48 @@
+"""Add refresh_tokens table for refresh token rotation
+
+Revision ID: a4e7c2b9d315
+Revises: 5c2e9a41d7b3
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a4e7c2b9d315"
+down_revision: Union[str, Sequence[str], None] = "5c2e9a41d7b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "refresh_tokens",
+        sa.Column("TokenID", sa.String(length=32), nullable=False),
+        sa.Column("FamilyID", sa.String(length=32), nullable=True),
+        sa.Column("UserID", sa.Integer(), nullable=True),
+        sa.Column("CreatedAt", sa.DateTime(), nullable=True),
+        sa.Column("ExpiresAt", sa.DateTime(), nullable=True),
+        sa.Column("RevokedAt", sa.DateTime(), nullable=True),
+        sa.Column("ReplacedBy", sa.String(length=32), nullable=True),
+        sa.ForeignKeyConstraint(["UserID"], ["users.id"]),
+        sa.PrimaryKeyConstraint("TokenID"),
+    )
+    op.create_index(
+        op.f("ix_refresh_tokens_FamilyID"), "refresh_tokens", ["FamilyID"], unique=False
+    )
+    op.create_index(
+        op.f("ix_refresh_tokens_RevokedAt"),
+        "refresh_tokens",
+        ["RevokedAt"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_refresh_tokens_RevokedAt"), table_name="refresh_tokens")
+    op.drop_index(op.f("ix_refresh_tokens_FamilyID"), table_name="refresh_tokens")
+    op.drop_table("refresh_tokens")
@@ -0,0 +1,119 @@
+"""Add normalized dedupe key columns to Customers
+
+Revision ID: b6d3f1a8c472
+Revises: a4e7c2b9d315
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from online_migrations import (
+    create_index_online,
+    drop_index_online,
+    unestimated_step,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "b6d3f1a8c472"
+down_revision: Union[str, Sequence[str], None] = "a4e7c2b9d315"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _backfill(bind, schema):
+    from customer_upsert import customer_keys
+
+    customers = sa.table(
+        "Customers",
+        sa.column("CustomerID"),
+        sa.column("CustomerName"),
+        sa.column("Email"),
+        sa.column("PhoneNumber"),
+        sa.column("NameKey"),
+        sa.column("EmailKey"),
+        sa.column("PhoneKey"),
+        schema=schema,
+    )
+    c = customers.c
+    update = (
+        customers.update()
+        .where(c.CustomerID == sa.bindparam("id"))
+        .values(
+            NameKey=sa.bindparam("name_key"),
+            EmailKey=sa.bindparam("email_key"),
+            PhoneKey=sa.bindparam("phone_key"),
+        )
+    )
+
+    last_id, done = 0, 0
+    while True:
+        rows = bind.execute(
+            sa.select(c.CustomerID, c.CustomerName, c.Email, c.PhoneNumber)
+            .where(c.CustomerID > last_id)
+            .order_by(c.CustomerID)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for customer_id, name, email, phone in rows:
+            name_key, email_key, phone_key = customer_keys(name, email, phone)
+            params.append(
+                {
+                    "id": customer_id,
+                    "name_key": name_key,
+                    "email_key": email_key,
+                    "phone_key": phone_key,
+                }
+            )
+        bind.execute(update, params)
+        last_id = rows[-1][0]
+        done += len(rows)
+        print(f"   ...keyed {done:,} customers")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    # 1. Nullable columns (metadata-only change)
+    for name, length in (("NameKey", 100), ("EmailKey", 255), ("PhoneKey", 20)):
+        op.add_column(
+            "Customers",
+            sa.Column(name, sa.String(length=length), nullable=True),
+            schema=schema,
+        )
+
+    # 2. Fill them in before indexing (cheaper than maintaining the index)
+    if context.is_offline_mode():
+        # Keys are normalized in Python: plan can't time it
+        unestimated_step("dedupe key backfill of Customers", "Customers", schema)
+        print("-- NOTE: customer keys are not backfilled in offline mode.")
+    else:
+        _backfill(bind, schema)
+
+    # 3. Composite indexes for "same name AND (same email OR same phone)"
+    create_index_online(
+        "ix_Customers_NameKey_EmailKey", "Customers", ["NameKey", "EmailKey"], schema
+    )
+    create_index_online(
+        "ix_Customers_NameKey_PhoneKey", "Customers", ["NameKey", "PhoneKey"], schema
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    drop_index_online("ix_Customers_NameKey_PhoneKey", "Customers", schema)
+    drop_index_online("ix_Customers_NameKey_EmailKey", "Customers", schema)
+    with op.batch_alter_table("Customers", schema=schema) as batch_op:
+        batch_op.drop_column("PhoneKey")
+        batch_op.drop_column("EmailKey")
+        batch_op.drop_column("NameKey")
@@ -0,0 +1,89 @@
+"""Add integer-cents amount columns
+
+Revision ID: d2a9e6f4c1b8
+Revises: b6d3f1a8c472
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from online_migrations import backfill
+
+# revision identifiers, used by Alembic.
+revision: str = "d2a9e6f4c1b8"
+down_revision: Union[str, Sequence[str], None] = "b6d3f1a8c472"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    # 1. Nullable BIGINT columns (metadata-only change, no table rewrite)
+    for table in ("Transactions", "TransactionsArchive"):
+        op.add_column(
+            table,
+            sa.Column("AmountCents", sa.BigInteger(), nullable=True),
+            schema=schema,
+        )
+    op.add_column(
+        "CustomerArchiveTotals",
+        sa.Column("ArchivedCents", sa.BigInteger(), nullable=True),
+        schema=schema,
+    )
+
+    # 2. Backfill in primary-key batches (resumable, also: python money.py backfill).
+    # Not on Azure SQL: every UPDATE of the Ledger table also writes a
+    # TransactionsHistory row. Reads use Amount until AMOUNT_STORAGE=cents,
+    # so run the backfill in a quiet window before switching.
+    if bind.engine.name == "mssql":
+        print("-- NOTE: AmountCents left empty; run 'python money.py backfill'.")
+        return
+    for table in ("Transactions", "TransactionsArchive"):
+        t = sa.table(
+            table,
+            sa.column("TransactionID"),
+            sa.column("Amount"),
+            sa.column("AmountCents"),
+            schema=schema,
+        )
+        backfill(
+            t,
+            "TransactionID",
+            {"AmountCents": sa.cast(sa.func.round(t.c.Amount * 100, 0), sa.BigInteger)},
+            where=sa.and_(t.c.AmountCents.is_(None), t.c.Amount.isnot(None)),
+        )
+
+    # One row per customer: a single UPDATE
+    totals = sa.table(
+        "CustomerArchiveTotals",
+        sa.column("ArchivedAmount"),
+        sa.column("ArchivedCents"),
+        schema=schema,
+    )
+    op.execute(
+        totals.update()
+        .where(totals.c.ArchivedCents.is_(None))
+        .values(
+            ArchivedCents=sa.cast(
+                sa.func.round(sa.func.coalesce(totals.c.ArchivedAmount, 0) * 100, 0),
+                sa.BigInteger,
+            )
+        )
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    with op.batch_alter_table("CustomerArchiveTotals", schema=schema) as batch_op:
+        batch_op.drop_column("ArchivedCents")
+    for table in ("TransactionsArchive", "Transactions"):
+        with op.batch_alter_table(table, schema=schema) as batch_op:
+            batch_op.drop_column("AmountCents")
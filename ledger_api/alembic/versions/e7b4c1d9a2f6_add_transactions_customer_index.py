@@ -0,0 +1,30 @@
+"""Index Transactions by CustomerID
+
+Revision ID: e7b4c1d9a2f6
+Revises: d2a9e6f4c1b8
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from online_migrations import create_index_online, drop_index_online
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b4c1d9a2f6"
+down_revision: Union[str, Sequence[str], None] = "d2a9e6f4c1b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Found by query_budget.py: every customer_id filter scanned the table
+    create_index_online(
+        "ix_Transactions_CustomerID_EntryDate",
+        "Transactions",
+        ["CustomerID", "EntryDate"],
+    )
+
+
+def downgrade() -> None:
+    drop_index_online("ix_Transactions_CustomerID_EntryDate", "Transactions")
@@ -0,0 +1,54 @@
+"""Add Customers.UpdatedAt for the UI's delta sync
+
+Revision ID: f3c8a5e2d1b9
+Revises: e7b4c1d9a2f6
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from online_migrations import create_index_online, drop_index_online, unestimated_step
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c8a5e2d1b9"
+down_revision: Union[str, Sequence[str], None] = "e7b4c1d9a2f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    # 1. Nullable column (metadata-only change)
+    op.add_column(
+        "Customers", sa.Column("UpdatedAt", sa.DateTime(), nullable=True), schema=schema
+    )
+
+    # 2. Existing customers count as changed now. Customers is small, so one
+    # UPDATE (also rendered in offline mode) instead of a batched backfill
+    customers = sa.table("Customers", sa.column("UpdatedAt"), schema=schema)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    unestimated_step("UpdatedAt fill of Customers", "Customers", schema)
+    op.execute(
+        customers.update()
+        .where(customers.c.UpdatedAt.is_(None))
+        .values(UpdatedAt=sa.literal(now, sa.DateTime()))
+    )
+
+    # 3. Sync reads it as a cursor: ORDER BY UpdatedAt, CustomerID
+    create_index_online("ix_Customers_UpdatedAt", "Customers", ["UpdatedAt"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    schema = "dbo" if bind.engine.name == "mssql" else None
+
+    drop_index_online("ix_Customers_UpdatedAt", "Customers")
+    with op.batch_alter_table("Customers", schema=schema) as batch_op:
+        batch_op.drop_column("UpdatedAt")
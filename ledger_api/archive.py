@@ -0,0 +1,344 @@
+"""
+Cold-data archival for Transactions.
+
+Rows older than ARCHIVE_AFTER_DAYS are "cold". How they are kept out of
+the hot path depends on the database:
+
+    SQLite / Postgres  rows are moved (in batches) into TransactionsArchive,
+                       which on Postgres is range-partitioned by EntryDate
+                       (one partition per year, created on demand).
+    Azure SQL (MSSQL)  rows stay put. Transactions is a Ledger table, so a
+                       DELETE would only copy them into TransactionsHistory.
+                       Instead the EntryDate index is partitioned by month
+                       (pf/ps_TransactionsMonthly) and date-filtered queries
+                       only touch recent partitions.
+
+Archived rows keep their TransactionID and hash-chain digests, and each
+customer's archived SUM(Amount) is kept in CustomerArchiveTotals so
+balances never have to read the archive.
+
+Historical reads go through `select_transactions`, which only adds the
+archive to the query when the requested window reaches into it.
+
+CLI:
+    python archive.py status
+    python archive.py run [--days 365 | --before 2025-01-01] [--batch-size 5000]
+    python archive.py partitions [--months-ahead 12]
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import (
+    BigInteger,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.orm import Session
+
+import cache
+import database
+import models
+import money
+
+# ⚙️ CONFIGURATION
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+
+MSSQL_PARTITION_FUNCTION = "pf_TransactionsMonthly"
+MSSQL_PARTITION_SCHEME = "ps_TransactionsMonthly"
+
+HOT = models.Transaction.__table__
+COLD = models.TransactionArchive.__table__
+COLUMNS = (
+    "TransactionID",
+    "CustomerID",
+    "Amount",
+    "AmountCents",
+    "EntryDate",
+    "Notes",
+    "PrevHash",
+    "RowHash",
+)
+
+
+def default_cutoff() -> datetime:
+    return datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+# ===========================
+# 1. READ-THROUGH
+# ===========================
+
+
+def archived_through(db: Session) -> Optional[datetime]:
+    """Newest EntryDate in the archive (None if nothing is archived)."""
+    return db.query(func.max(models.TransactionArchive.EntryDate)).scalar()
+
+
+def needs_archive(db: Session, start: Optional[datetime] = None) -> bool:
+    """Does a query starting at `start` (None = all history) reach the archive?"""
+    newest = archived_through(db)
+    return newest is not None and (start is None or start <= newest)
+
+
+def select_transactions(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    customer_id: Optional[int] = None,
+    include_archived: Optional[bool] = None,
+    after_id: Optional[int] = None,
+):
+    """
+    SELECT over Transactions, plus TransactionsArchive when needed.
+
+    Filters are applied to each side of the UNION so both can use their
+    EntryDate / CustomerID / primary key indexes. `include_archived=None`
+    decides automatically from `start`. `after_id` keeps rows with a higher
+    TransactionID (delta sync).
+    """
+    if include_archived is None:
+        include_archived = needs_archive(db, start)
+
+    def _branch(table):
+        stmt = select(*(table.c[name] for name in COLUMNS))
+        if start is not None:
+            stmt = stmt.where(table.c.EntryDate >= start)
+        if end is not None:
+            stmt = stmt.where(table.c.EntryDate < end)
+        if customer_id is not None:
+            stmt = stmt.where(table.c.CustomerID == customer_id)
+        if after_id is not None:
+            stmt = stmt.where(table.c.TransactionID > after_id)
+        return stmt
+
+    if not include_archived:
+        return _branch(HOT)
+    return union_all(_branch(HOT), _branch(COLD))
+
+
+def archived_balances(db: Session, customer_ids=None) -> dict:
+    """CustomerID -> archived SUM(Amount), in integer cents."""
+    Totals = models.CustomerArchiveTotal
+    amount = Totals.ArchivedCents if money.USE_CENTS else Totals.ArchivedAmount
+    query = db.query(Totals.CustomerID, amount)
+    if customer_ids is not None:
+        query = query.filter(Totals.CustomerID.in_(customer_ids))
+    return {customer_id: money.to_cents(value) for customer_id, value in query.all()}
+
+
+# ===========================
+# 2. ARCHIVE COMMAND
+# ===========================
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def ensure_postgres_partitions(db: Session, first_year: int, last_year: int):
+    for year in range(first_year, last_year + 1):
+        db.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "TransactionsArchive_{year}" '
+                f'PARTITION OF "TransactionsArchive" '
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+        )
+    db.commit()
+
+
+def ensure_mssql_partitions(db: Session, months_ahead: int = 12) -> int:
+    """Split the monthly partition function up to `months_ahead` months from now."""
+    existing = {
+        row[0].date()
+        for row in db.execute(
+            text(
+                "SELECT CAST(prv.value AS DATETIME) FROM sys.partition_range_values prv "
+                "JOIN sys.partition_functions pf ON pf.function_id = prv.function_id "
+                "WHERE pf.name = :name"
+            ),
+            {"name": MSSQL_PARTITION_FUNCTION},
+        )
+    }
+    month = datetime.now().replace(day=1).date()
+    added = 0
+    for _ in range(months_ahead + 1):
+        if month not in existing:
+            db.execute(
+                text(
+                    f"ALTER PARTITION SCHEME {MSSQL_PARTITION_SCHEME} NEXT USED [PRIMARY]"
+                )
+            )
+            db.execute(
+                text(
+                    f"ALTER PARTITION FUNCTION {MSSQL_PARTITION_FUNCTION}() "
+                    f"SPLIT RANGE ('{month.isoformat()}')"
+                )
+            )
+            added += 1
+        month = (month + timedelta(days=32)).replace(day=1)
+    db.commit()
+    return added
+
+
+def _add_to_totals(db: Session, in_batch):
+    """Fold the batch about to be moved into CustomerArchiveTotals."""
+    batch_totals = db.execute(
+        select(
+            HOT.c.CustomerID,
+            func.sum(HOT.c.Amount),
+            # Rows written before AmountCents existed may still be NULL
+            func.sum(
+                func.coalesce(
+                    HOT.c.AmountCents,
+                    cast(func.round(HOT.c.Amount * 100, 0), BigInteger),
+                )
+            ),
+            func.count(),
+        )
+        .where(in_batch, HOT.c.CustomerID.isnot(None))
+        .group_by(HOT.c.CustomerID)
+    ).all()
+    existing = {
+        t.CustomerID: t
+        for t in db.query(models.CustomerArchiveTotal).filter(
+            models.CustomerArchiveTotal.CustomerID.in_([r[0] for r in batch_totals])
+        )
+    }
+    for customer_id, amount, cents, count in batch_totals:
+        cents = cents or 0
+        total = existing.get(customer_id)
+        if total is None:
+            db.add(
+                models.CustomerArchiveTotal(
+                    CustomerID=customer_id,
+                    ArchivedAmount=amount,
+                    ArchivedCents=cents,
+                    ArchivedRows=count,
+                )
+            )
+        else:
+            total.ArchivedAmount += amount
+            total.ArchivedCents = (total.ArchivedCents or 0) + cents
+            total.ArchivedRows += count
+
+
+def archive_transactions(
+    db: Session,
+    before: Optional[datetime] = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    progress=print,
+) -> int:
+    """
+    Move Transactions with EntryDate < `before` into TransactionsArchive.
+
+    Each batch (lowest TransactionIDs first) is copied, totalled and deleted in
+    one transaction, so the command can be interrupted and re-run safely.
+    """
+    before = before or default_cutoff()
+    dialect = _dialect(db)
+    if dialect == "mssql":
+        progress("☁️  Azure SQL: rows stay in the Ledger table; updating partitions.")
+        ensure_mssql_partitions(db)
+        return 0
+
+    if dialect == "postgresql":
+        oldest = db.query(func.min(models.Transaction.EntryDate)).scalar()
+        if oldest is not None:
+            ensure_postgres_partitions(db, oldest.year, before.year)
+
+    # Never archive the newest row: SQLite hands out max(TransactionID) + 1,
+    # so it must stay in the hot table for IDs to remain unique
+    newest_id = db.query(func.max(models.Transaction.TransactionID)).scalar() or 0
+
+    moved = 0
+    last_id = 0
+    now = datetime.now()
+    while True:
+        # Walk the primary key in ID ranges so every batch is an index seek
+        ids = (
+            db.execute(
+                select(HOT.c.TransactionID)
+                .where(
+                    HOT.c.TransactionID > last_id,
+                    HOT.c.TransactionID < newest_id,
+                    HOT.c.EntryDate < before,
+                )
+                .order_by(HOT.c.TransactionID)
+                .limit(batch_size)
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            break
+        in_batch = (
+            (HOT.c.TransactionID >= ids[0])
+            & (HOT.c.TransactionID <= ids[-1])
+            & (HOT.c.EntryDate < before)
+        )
+        last_id = ids[-1]
+
+        db.execute(
+            insert(COLD).from_select(
+                list(COLUMNS) + ["ArchivedAt"],
+                select(*(HOT.c[name] for name in COLUMNS), literal(now)).where(
+                    in_batch
+                ),
+            )
+        )
+        _add_to_totals(db, in_batch)
+        db.execute(delete(HOT).where(in_batch))
+        db.commit()
+
+        moved += len(ids)
+        progress(f"   moved {moved} rows (up to TransactionID {last_id})")
+
+    if moved:
+        cache.invalidate("transactions")
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transactions archival tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show hot/archived row counts")
+    run = sub.add_parser("run", help="Move cold rows into the archive")
+    run.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    run.add_argument("--before", type=datetime.fromisoformat, default=None)
+    run.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parts = sub.add_parser("partitions", help="Create upcoming MSSQL partitions")
+    parts.add_argument("--months-ahead", type=int, default=12)
+    args = parser.parse_args()
+
+    session = database.SessionLocal()
+    try:
+        if args.command == "status":
+            hot = session.query(func.count(models.Transaction.TransactionID)).scalar()
+            cold = session.query(
+                func.count(models.TransactionArchive.TransactionID)
+            ).scalar()
+            print(f"🔥 Hot rows:      {hot}")
+            print(f"🧊 Archived rows: {cold} (newest: {archived_through(session)})")
+        elif args.command == "run":
+            before = args.before or datetime.now() - timedelta(days=args.days)
+            print(f"🧊 Archiving transactions before {before:%Y-%m-%d}...")
+            moved = archive_transactions(session, before, args.batch_size)
+            print(f"✅ Archived {moved} transactions.")
+        elif _dialect(session) != "mssql":
+            print("❌ Partition maintenance is only needed on Azure SQL / MSSQL.")
+        else:
+            added = ensure_mssql_partitions(session, args.months_ahead)
+            print(f"✅ Added {added} monthly partitions.")
+    finally:
+        session.close()
@@ -0,0 +1,140 @@
+"""
+Benchmark: cheap-read latency during a burst of heavy list requests, with
+and without admission control (in-process ASGI, SQLite).
+
+A burst of GET /transactions/ (the full list) arrives at once while a
+steady trickle of cheap GET /jobs/ reads keeps coming. Without admission
+control the reads queue behind the burst in the threadpool and DB pool.
+With it, the heavy class is capped, the excess is shed with 503 +
+Retry-After, and reads keep their own slots.
+
+    cd ledger_api
+    python benchmarks/bench_admission.py
+    python benchmarks/bench_admission.py --heavy 80 --rows 50000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "ledger_bench_admission.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "bench")
+# One user sends everything here; measure shedding, not the per-user limits
+os.environ.setdefault("ADMISSION_HEAVY_BURST", "100000")
+os.environ.setdefault("ADMISSION_READ_BURST", "100000")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import admission  # noqa: E402
+import auth  # noqa: E402
+import database  # noqa: E402
+import main  # noqa: E402
+import models  # noqa: E402
+
+
+def seed(rows: int):
+    database.engine.dispose()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    models.Base.metadata.create_all(database.engine)
+    with database.engine.begin() as conn:
+        conn.execute(
+            insert(models.User),
+            [{"email": "bench@x", "hashed_password": "-", "is_admin": True}],
+        )
+        conn.execute(insert(models.Customer), [{"CustomerName": "Bench"}])
+        conn.execute(
+            insert(models.Transaction),
+            [
+                {
+                    "CustomerID": 1,
+                    "Amount": 1,
+                    "AmountCents": 100,
+                    "EntryDate": datetime(2026, 1, 1),
+                }
+                for _ in range(rows)
+            ],
+        )
+
+
+async def burst(app, heavy: int, reads: int, read_every: float):
+    headers = {
+        "Authorization": "Bearer "
+        + auth.create_access_token({"sub": "bench@x"}, expires_delta=None)
+    }
+    # Unhandled errors (e.g. DB pool timeouts) count as 500s instead of raising
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+
+        async def timed(path):
+            started = time.perf_counter()
+            r = await client.get(path, headers=headers)
+            return r.status_code, time.perf_counter() - started
+
+        async def trickle():
+            out = []
+            for _ in range(reads):
+                out.append(asyncio.create_task(timed("/jobs/")))
+                await asyncio.sleep(read_every)
+            return await asyncio.gather(*out)
+
+        started = time.perf_counter()
+        heavy_results, read_results = await asyncio.gather(
+            asyncio.gather(*(timed("/transactions/") for _ in range(heavy))),
+            trickle(),
+        )
+        return heavy_results, read_results, time.perf_counter() - started
+
+
+def report(label, heavy_results, read_results, wall):
+    latencies = sorted(t for _, t in read_results)
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+    heavy_codes = Counter(code for code, _ in heavy_results)
+    ok = [t for code, t in heavy_results if code == 200]
+    print(f"\n{label}")
+    print(
+        f"  cheap reads   p50 {statistics.median(latencies) * 1000:7.1f}ms   "
+        f"p99 {p99 * 1000:7.1f}ms"
+    )
+    print(
+        f"  heavy lists   {dict(heavy_codes)}   "
+        f"slowest 200 {max(ok) if ok else 0:.1f}s   burst done in {wall:.1f}s"
+    )
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--heavy", type=int, default=40)
+    parser.add_argument("--reads", type=int, default=100)
+    parser.add_argument("--read-every", type=float, default=0.02, help="seconds")
+    args = parser.parse_args()
+
+    seed(args.rows)
+    for enabled in (False, True):
+        admission.ADMISSION_ENABLED = enabled
+        app = main.create_app()
+        results = asyncio.run(burst(app, args.heavy, args.reads, args.read_every))
+        report(
+            f"admission control {'ON' if enabled else 'OFF'}"
+            f" ({args.heavy} heavy, {args.reads} reads)",
+            *results,
+        )
+    database.engine.dispose()
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,154 @@
+"""
+Benchmark: DECIMAL amounts vs BIGINT cents (SQLite).
+
+Three paths that every balance/report/listing goes through:
+
+    1. SUM(...) GROUP BY customer, fetched into Python
+    2. fetch N transactions and serialize them to JSON (Decimal field vs
+       money.Money)
+    3. summing amounts in Python (Decimal vs int)
+
+    cd ledger_api
+    python benchmarks/bench_amounts.py
+    python benchmarks/bench_amounts.py --rows 2000000 --customers 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "ledger_bench_amounts.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from pydantic import BaseModel, TypeAdapter  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+import database  # noqa: E402
+import models  # noqa: E402
+import money  # noqa: E402
+
+
+class DecimalRow(BaseModel):
+    TransactionID: int
+    CustomerID: int
+    Amount: Decimal
+
+
+class CentsRow(BaseModel):
+    TransactionID: int
+    CustomerID: int
+    Amount: money.Money
+
+
+def seed(rows: int, customers: int):
+    database.engine.dispose()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    models.Base.metadata.create_all(database.engine)
+    rng = random.Random(36)
+    now = datetime.now()
+    with database.engine.begin() as conn:
+        conn.execute(
+            insert(models.Customer),
+            [{"CustomerName": f"Customer {i}"} for i in range(customers)],
+        )
+        for start in range(0, rows, 50_000):
+            batch = []
+            for _ in range(min(50_000, rows - start)):
+                cents = rng.randint(100, 500_000) * rng.choice((1, 1, 1, -1))
+                batch.append(
+                    {
+                        "CustomerID": rng.randint(1, customers),
+                        "Amount": Decimal(cents).scaleb(-2),
+                        "AmountCents": cents,
+                        "EntryDate": now - timedelta(minutes=rng.randrange(500_000)),
+                    }
+                )
+            conn.execute(insert(models.Transaction), batch)
+
+
+def timed(fn, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--page", type=int, default=50_000, help="rows serialized")
+    args = parser.parse_args()
+
+    print(f"🌱 Seeding {args.rows:,} transactions...")
+    seed(args.rows, args.customers)
+    T = models.Transaction
+
+    def grouped(column):
+        def run():
+            with database.engine.connect() as conn:
+                return dict(
+                    conn.execute(
+                        select(T.CustomerID, func.sum(column)).group_by(T.CustomerID)
+                    ).all()
+                )
+
+        return run
+
+    sum_dec, by_dec = timed(grouped(T.Amount))
+    sum_int, by_int = timed(grouped(T.AmountCents))
+    assert all(money.to_cents(by_dec[c]) == by_int[c] for c in by_int)
+
+    def serialize(model, column):
+        adapter = TypeAdapter(list[model])
+
+        def run():
+            with database.engine.connect() as conn:
+                rows = conn.execute(
+                    select(T.TransactionID, T.CustomerID, column.label("Amount")).limit(
+                        args.page
+                    )
+                ).mappings()
+                return adapter.dump_json(adapter.validate_python(list(rows)))
+
+        return run
+
+    ser_dec, json_dec = timed(serialize(DecimalRow, T.Amount))
+    ser_int, json_int = timed(serialize(CentsRow, T.AmountCents))
+    assert json_dec == json_int
+
+    with database.engine.connect() as conn:
+        decimals = [r[0] for r in conn.execute(select(T.Amount))]
+        ints = [r[0] for r in conn.execute(select(T.AmountCents))]
+    py_dec, total_dec = timed(lambda: sum(decimals, Decimal(0)))
+    py_int, total_int = timed(lambda: sum(ints))
+    assert money.to_cents(total_dec) == total_int
+
+    database.engine.dispose()
+    os.remove(DB_PATH)
+
+    print(f"\n{args.rows:,} transactions, {args.customers:,} customers")
+    for label, dec, cents in (
+        ("SUM GROUP BY customer", sum_dec, sum_int),
+        (f"fetch + JSON {args.page:,} rows", ser_dec, ser_int),
+        ("Python sum of all rows", py_dec, py_int),
+    ):
+        print(
+            f"  {label:<28} decimal {dec * 1000:8.1f}ms   "
+            f"cents {cents * 1000:8.1f}ms  ({dec / cents:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
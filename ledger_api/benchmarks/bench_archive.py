@@ -0,0 +1,155 @@
+"""
+Benchmark: hot-path queries as Transactions history grows, before and after
+archiving cold rows (SQLite).
+
+For each history size a fresh database is filled with transactions spread
+over 5 years, the hot-path queries are timed, everything older than
+ARCHIVE_AFTER_DAYS is archived, and the same queries are timed again.
+
+    cd ledger_api
+    python benchmarks/bench_archive.py
+    python benchmarks/bench_archive.py --sizes 100000,1000000,3000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "ledger_bench_archive.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import func, select  # noqa: E402
+
+import archive  # noqa: E402
+import database  # noqa: E402
+import models  # noqa: E402
+
+CUSTOMERS = 1_000
+HISTORY_DAYS = 5 * 365
+REPEAT = 20
+
+
+def seed(rows: int, now: datetime):
+    rng = random.Random(42)
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql(
+            'INSERT INTO "Customers" ("CustomerName") VALUES (?)',
+            [(f"Customer {i}",) for i in range(CUSTOMERS)],
+        )
+        batch = []
+        for _ in range(rows):
+            entry = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+            batch.append(
+                (
+                    rng.randrange(1, CUSTOMERS + 1),
+                    f"{rng.randrange(-50_000, 100_000) / 100:.2f}",
+                    entry.strftime("%Y-%m-%d %H:%M:%S.%f"),
+                )
+            )
+            if len(batch) == 50_000:
+                _insert(conn, batch)
+                batch = []
+        if batch:
+            _insert(conn, batch)
+
+
+def _insert(conn, batch):
+    conn.exec_driver_sql(
+        'INSERT INTO "Transactions" ("CustomerID", "Amount", "EntryDate") '
+        "VALUES (?, ?, ?)",
+        batch,
+    )
+
+
+def hot_queries(now: datetime):
+    """The read paths the API runs all day, keyed by label."""
+    recent = now - timedelta(days=30)
+
+    def recent_window(db):
+        src = archive.select_transactions(db, start=recent).subquery()
+        return db.execute(select(func.count()).select_from(src)).scalar()
+
+    def customer_balance(db):
+        # Same shape as search_customers: hot SUM + archived total
+        hot = (
+            db.query(func.sum(models.Transaction.Amount))
+            .filter(models.Transaction.CustomerID == 7)
+            .scalar()
+        )
+        return hot, archive.archived_balances(db, [7]).get(7)
+
+    def hot_table_scan(db):
+        return db.query(func.count(models.Transaction.TransactionID)).scalar()
+
+    return {
+        "last 30 days (list)": recent_window,
+        "customer balance": customer_balance,
+        "unfiltered hot scan": hot_table_scan,
+    }
+
+
+def time_queries(now: datetime):
+    db = database.SessionLocal()
+    try:
+        results = {}
+        for label, query in hot_queries(now).items():
+            samples = []
+            for _ in range(REPEAT):
+                started = time.perf_counter()
+                query(db)
+                samples.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(samples)
+        return results
+    finally:
+        db.close()
+
+
+def run_size(rows: int):
+    database.engine.dispose()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    models.Base.metadata.create_all(database.engine)
+
+    now = datetime.now()
+    seed(rows, now)
+    before = time_queries(now)
+
+    db = database.SessionLocal()
+    started = time.perf_counter()
+    moved = archive.archive_transactions(
+        db, now - timedelta(days=archive.ARCHIVE_AFTER_DAYS), progress=lambda _: None
+    )
+    archive_seconds = time.perf_counter() - started
+    db.close()
+
+    after = time_queries(now)
+    print(
+        f"\n{rows:,} rows of history "
+        f"(archived {moved:,} in {archive_seconds:.1f}s, "
+        f"{rows - moved:,} stay hot)"
+    )
+    print(f"  {'query':<24} {'no archive':>12} {'archived':>12}")
+    for label in before:
+        print(f"  {label:<24} {before[label]:>10.2f}ms {after[label]:>10.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100000,500000,2000000")
+    args = parser.parse_args()
+
+    for rows in (int(s) for s in args.sizes.split(",")):
+        run_size(rows)
+    database.engine.dispose()
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
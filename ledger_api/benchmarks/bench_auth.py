@@ -0,0 +1,112 @@
+"""
+Benchmark: auth CPU per active user per day, password re-login vs refresh tokens.
+
+Times the real code paths (SQLite, in-process CPU via time.process_time):
+
+    login      user lookup + Argon2 verify + tokens       (POST /token)
+    refresh    JWT check + single-use UPDATE + new tokens (POST /token/refresh)
+    request    access token decode + revocation lookup    (every API call)
+
+and prices a working day: before, every ACCESS_TOKEN_EXPIRE_MINUTES the
+client logs in again; after, it logs in once and refreshes instead.
+
+    cd ledger_api
+    python benchmarks/bench_auth.py
+    python benchmarks/bench_auth.py --hours 10 --requests-per-hour 300 --users 5000
+"""
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "ledger_bench_auth.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import auth  # noqa: E402
+import database  # noqa: E402
+import models  # noqa: E402
+import refresh_tokens  # noqa: E402
+
+EMAIL = "bench@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    """Average CPU time per call."""
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=8)
+    parser.add_argument("--requests-per-hour", type=int, default=120)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    models.Base.metadata.create_all(database.engine)
+    db = database.SessionLocal()
+    db.add(models.User(email=EMAIL, hashed_password=auth.get_password_hash(PASSWORD)))
+    db.commit()
+
+    def login():
+        user = db.query(models.User).filter(models.User.email == EMAIL).first()
+        assert auth.verify_password(PASSWORD, user.hashed_password)
+        return refresh_tokens.start_session(db, user)
+
+    access, refresh = login()
+    state = {"refresh": refresh}
+
+    def refresh_once():
+        _, _, state["refresh"] = refresh_tokens.rotate(db, state["refresh"])
+
+    def request():
+        payload = auth.jwt.decode(access, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        refresh_tokens.is_session_revoked(db, payload.get("fam"))
+
+    login_ms = cpu_ms(login, max(args.repeat // 5, 5))
+    refresh_ms = cpu_ms(refresh_once, args.repeat)
+    request_ms = cpu_ms(request, args.repeat * 20)
+    db.close()
+    database.engine.dispose()
+    os.remove(DB_PATH)
+
+    renewals = math.ceil(args.hours * 60 / auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    requests = int(args.hours * args.requests_per_hour)
+    before = renewals * login_ms + requests * request_ms
+    after = login_ms + (renewals - 1) * refresh_ms + requests * request_ms
+
+    print(f"\nCPU per operation (Argon2 memory_cost={auth.ph.memory_cost // 1024} MiB)")
+    print(f"  {'login (Argon2)':<22} {login_ms:9.3f}ms")
+    print(f"  {'refresh (rotation)':<22} {refresh_ms:9.3f}ms")
+    print(f"  {'per-request check':<22} {request_ms:9.3f}ms")
+
+    print(
+        f"\nPer active user per day ({args.hours:g}h, {requests:,} requests, "
+        f"{renewals} session renewals with {auth.ACCESS_TOKEN_EXPIRE_MINUTES} min tokens)"
+    )
+    print(f"  {'':<22} {'logins':>7} {'CPU/user':>11} {f'CPU x {args.users:,}':>14}")
+    for label, logins, total in (
+        ("re-login (before)", renewals, before),
+        ("refresh (after)", 1, after),
+    ):
+        print(
+            f"  {label:<22} {logins:>7} {total:>9.1f}ms "
+            f"{total * args.users / 1000:>12.1f}s"
+        )
+    print(f"  auth CPU reduced {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
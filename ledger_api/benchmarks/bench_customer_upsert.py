@@ -0,0 +1,128 @@
+"""
+Benchmark: onboarding a customer book, one create_customer per row vs the
+bulk upsert (SQLite).
+
+The book has ~10% in-file duplicates (case/spacing/phone formatting) and
+~20% customers that already exist. The per-row path is the old
+create_customer logic (unindexed dedupe query + insert + commit) and is
+timed on a slice, then extrapolated.
+
+    cd ledger_api
+    python benchmarks/bench_customer_upsert.py
+    python benchmarks/bench_customer_upsert.py --rows 100000 --existing 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "ledger_bench_upsert.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import or_  # noqa: E402
+
+import customer_upsert  # noqa: E402
+import database  # noqa: E402
+import models  # noqa: E402
+from main import CustomerCreate  # noqa: E402
+
+
+def person(i: int) -> dict:
+    return {
+        "CustomerName": f"Customer {i}",
+        "Email": f"customer{i}@example.com",
+        "PhoneNumber": f"555-{i:07d}",
+        "HomeAddress": f"{i} Main St",
+    }
+
+
+def make_book(rows: int, existing: int, rng: random.Random) -> list:
+    book = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.2 and existing:
+            row = person(rng.randrange(existing))  # already a customer
+            row["HomeAddress"] = f"{rng.randrange(999)} New Address"
+        elif roll < 0.3 and book:
+            row = dict(rng.choice(book))  # same person, messier formatting
+            row["CustomerName"] = f"  {row['CustomerName'].upper()} "
+            row["PhoneNumber"] = row["PhoneNumber"].replace("-", " ")
+        else:
+            row = person(existing + len(book) + 1_000_000)
+        book.append(row)
+    return [CustomerCreate(**row).model_dump() for row in book]
+
+
+def reset(existing: int):
+    database.engine.dispose()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    models.Base.metadata.create_all(database.engine)
+    db = database.SessionLocal()
+    customer_upsert.upsert_customers(db, (person(i) for i in range(existing)))
+    db.close()
+
+
+def per_row(db, rows: list):
+    """The pre-bulk create_customer path."""
+    C = models.Customer
+    for row in rows:
+        duplicate = (
+            db.query(C)
+            .filter(
+                C.CustomerName == row["CustomerName"],
+                or_(C.Email == row["Email"], C.PhoneNumber == row["PhoneNumber"]),
+            )
+            .first()
+        )
+        if duplicate:
+            continue
+        db.add(models.Customer(**row))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--existing", type=int, default=100_000)
+    parser.add_argument("--per-row-sample", type=int, default=2_000)
+    args = parser.parse_args()
+
+    book = make_book(args.rows, args.existing, random.Random(7))
+
+    reset(args.existing)
+    db = database.SessionLocal()
+    sample = book[: args.per_row_sample]
+    started = time.perf_counter()
+    per_row(db, sample)
+    per_row_s = (time.perf_counter() - started) * len(book) / len(sample)
+    db.close()
+
+    reset(args.existing)
+    db = database.SessionLocal()
+    started = time.perf_counter()
+    result = customer_upsert.upsert_customers(db, book)
+    bulk_s = time.perf_counter() - started
+    db.close()
+    database.engine.dispose()
+    os.remove(DB_PATH)
+
+    print(f"\n{len(book):,} rows into {args.existing:,} existing customers")
+    print(
+        f"  per-row create_customer  {per_row_s:8.1f}s "
+        f"(extrapolated from {len(sample):,})"
+    )
+    print(f"  bulk upsert              {bulk_s:8.1f}s  ({per_row_s / bulk_s:.0f}x)")
+    print(
+        f"  created {result.created:,}, updated {result.updated:,}, "
+        f"skipped {result.skipped:,}"
+    )
+
+
+if __name__ == "__main__":
+    main()
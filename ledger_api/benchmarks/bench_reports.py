@@ -0,0 +1,146 @@
+"""
+Benchmark: vectorized aging/statement engine vs. a row-by-row Python baseline.
+
+Runs on synthetic columnar data so it measures the report math only
+(no database needed):
+
+    cd ledger_api
+    python benchmarks/bench_reports.py              # 10M rows
+    python benchmarks/bench_reports.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# reports.py only needs models for the DB loader; the math is pure NumPy
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+import reports  # noqa: E402
+
+
+def make_columns(rows: int, customers: int, as_of: datetime, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    customer_ids = rng.integers(1, customers + 1, rows, dtype=np.int64)
+    # ~75% charges, ~25% payments, between 1.00 and 5000.00
+    cents = rng.integers(100, 500_000, rows, dtype=np.int64)
+    cents[rng.random(rows) < 0.25] *= -1
+    age_seconds = rng.integers(0, 365 * 86400, rows, dtype=np.int64)
+    entry_dates = np.datetime64(as_of, "us") - age_seconds.astype("timedelta64[s]")
+    return reports.TransactionColumns(
+        customer_ids=customer_ids,
+        cents=cents,
+        entry_dates=entry_dates.astype("datetime64[us]"),
+        transaction_ids=np.arange(1, rows + 1, dtype=np.int64),
+    )
+
+
+# ===========================
+# ROW-BY-ROW BASELINE
+# ===========================
+
+
+def baseline_aging(rows, as_of: datetime):
+    credits = defaultdict(int)
+    charges = defaultdict(list)
+    for cust, cents, date in rows:
+        if cents < 0:
+            credits[cust] -= cents
+        elif cents > 0:
+            charges[cust].append((date, cents))
+
+    result = {}
+    for cust in set(credits) | set(charges):
+        buckets = [0, 0, 0, 0]
+        remaining_credit = credits[cust]
+        for date, cents in sorted(charges[cust]):
+            applied = min(remaining_credit, cents)
+            remaining_credit -= applied
+            open_cents = cents - applied
+            age = (as_of - date).days
+            if age <= 30:
+                buckets[0] += open_cents
+            elif age <= 60:
+                buckets[1] += open_cents
+            elif age <= 90:
+                buckets[2] += open_cents
+            else:
+                buckets[3] += open_cents
+        buckets[0] -= remaining_credit
+        result[cust] = buckets
+    return result
+
+
+def baseline_statement_summary(rows, start: datetime, end: datetime):
+    result = defaultdict(lambda: [0, 0, 0])
+    for cust, cents, date in rows:
+        if date >= end:
+            continue
+        totals = result[cust]
+        if date < start:
+            totals[0] += cents
+        elif cents > 0:
+            totals[1] += cents
+        else:
+            totals[2] += cents
+    return result
+
+
+def timed(label, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<32} {elapsed:8.2f}s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--customers", type=int, default=50_000)
+    args = parser.parse_args()
+
+    as_of = datetime(2026, 1, 1)
+    start, end = as_of - timedelta(days=30), as_of
+    print(
+        f"📊 Generating {args.rows:,} transactions for {args.customers:,} customers..."
+    )
+    cols = make_columns(args.rows, args.customers, as_of)
+
+    # The baseline gets plain Python tuples, as it would from a cursor
+    rows = list(
+        zip(
+            cols.customer_ids.tolist(),
+            cols.cents.tolist(),
+            cols.entry_dates.astype(datetime).tolist(),
+        )
+    )
+
+    print("\nAR aging")
+    (ids, buckets), vec_t = timed(
+        "vectorized (NumPy)", reports.compute_aging, cols, as_of
+    )
+    base, base_t = timed("row-by-row (Python)", baseline_aging, rows, as_of)
+    assert all(base[c] == buckets[i].tolist() for i, c in enumerate(ids.tolist()))
+    print(f"  speedup: {base_t / vec_t:.1f}x")
+
+    print("\nStatement summary")
+    (ids, opening, charges, payments, _), vec_t = timed(
+        "vectorized (NumPy)", reports.compute_statement_summary, cols, start, end
+    )
+    base, base_t = timed(
+        "row-by-row (Python)", baseline_statement_summary, rows, start, end
+    )
+    for i, c in enumerate(ids.tolist()):
+        assert base[c] == [int(opening[i]), int(charges[i]), int(payments[i])]
+    print(f"  speedup: {base_t / vec_t:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: cold-start time of one API worker.
+
+Each run is a fresh Python process (like a new uvicorn worker) that times:
+
+    import main      module imports only (no engine, no app)
+    create_app()     app + routes + middleware
+    lifespan start   engine creation + pool warm-up
+    first request    POST /token for an unknown user (one DB round trip)
+    first report     deferred NumPy import + first /reports call
+
+    cd ledger_api
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, {api_dir!r})
+timings = {{}}
+
+t = time.perf_counter()
+import main
+timings["import main"] = time.perf_counter() - t
+
+from fastapi.testclient import TestClient
+import auth, database, models
+from settings import Settings
+
+t = time.perf_counter()
+app = main.create_app(Settings(database_url={db_url!r}, static_dir="__none__"))
+timings["create_app()"] = time.perf_counter() - t
+
+client = TestClient(app)
+t = time.perf_counter()
+client.__enter__()
+timings["lifespan start"] = time.perf_counter() - t
+
+t = time.perf_counter()
+client.post("/token", data={{"username": "nobody", "password": "x"}})
+timings["first request"] = time.perf_counter() - t
+
+token = auth.create_access_token({{"sub": "bench@example.com"}})
+t = time.perf_counter()
+client.get("/reports/statements", headers={{"Authorization": f"Bearer {{token}}"}})
+timings["first report"] = time.perf_counter() - t
+
+client.__exit__(None, None, None)
+print(json.dumps(timings))
+"""
+
+
+def prepare_db(path: str):
+    sys.path.insert(0, API_DIR)
+    import auth
+    import database
+    import models
+
+    database.configure(f"sqlite:///{path}")
+    models.Base.metadata.create_all(database.get_engine())
+    db = database.SessionLocal()
+    db.add(
+        models.User(
+            email="bench@example.com",
+            hashed_password=auth.get_password_hash("bench"),
+            is_admin=True,
+        )
+    )
+    db.commit()
+    db.close()
+    database.dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SECRET_KEY", "bench")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "startup.db")
+        prepare_db(db_path)
+        code = CHILD.format(api_dir=API_DIR, db_url=f"sqlite:///{db_path}")
+
+        samples = []
+        for _ in range(args.runs):
+            out = subprocess.run(
+                [sys.executable, "-c", code],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=tmp,
+            ).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"\nCold start per worker (median of {args.runs} fresh processes)")
+    total = 0.0
+    for phase in samples[0]:
+        median_ms = statistics.median(s[phase] for s in samples) * 1000
+        total += median_ms
+        print(f"  {phase:<16} {median_ms:8.1f}ms")
+    print(f"  {'total':<16} {total:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Shared query-result cache for the read endpoints.
+
+Cached handlers store their *serialized JSON response*, so a hit skips the
+database, the ORM and Pydantic entirely.
+
+Invalidation is tag-based with versioned keys: every entry's key embeds the
+current version of each of its tags, and `invalidate("customers")` just
+bumps that version. Old entries become unreachable and age out through
+LRU / TTL, so invalidation is O(1) on every backend.
+
+Backends (CACHE_BACKEND):
+    memory  (default) per-process LRU bounded by entries, bytes and TTL
+    redis   shared across uvicorn workers (needs `pip install redis`, REDIS_URL)
+    none    disabled
+"""
+
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Iterable, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# ⚙️ CONFIGURATION
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Arguments that never take part in the cache key
+_IGNORED_ARGS = {"db", "current_user"}
+
+
+# ===========================
+# 1. METRICS
+# ===========================
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self.evictions = 0
+        self.invalidations = 0
+
+    def record(self, namespace: str, hit: bool):
+        with self._lock:
+            self.counters[namespace]["hits" if hit else "misses"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            per_route = {}
+            for namespace, c in self.counters.items():
+                total = c["hits"] + c["misses"]
+                per_route[namespace] = {
+                    **c,
+                    "hit_ratio": round(c["hits"] / total, 3) if total else 0.0,
+                }
+            return {
+                "routes": per_route,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# ===========================
+# 2. BACKENDS
+# ===========================
+
+
+class MemoryCache:
+    """Thread-safe LRU with TTL, bounded by entry count and total bytes."""
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, bytes)
+        self._bytes = 0
+        self._tag_versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def tag_versions(self, tags: Iterable[str]) -> list:
+        with self._lock:
+            return [self._tag_versions[t] for t in tags]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] += 1
+            self.stats.invalidations += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _drop(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class RedisCache:
+    """Out-of-process cache shared by every worker. TTL handles eviction."""
+
+    def __init__(self, url: str = REDIS_URL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires 'pip install redis'")
+        self.client = redis.Redis.from_url(url)
+        self.stats = CacheStats()
+
+    def tag_versions(self, tags: Iterable[str]) -> list:
+        tags = list(tags)
+        if not tags:
+            return []
+        values = self.client.mget([f"ledger:tag:{t}" for t in tags])
+        return [int(v or 0) for v in values]
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(f"ledger:cache:{key}")
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self.client.set(f"ledger:cache:{key}", value, ex=ttl)
+
+    def invalidate(self, *tags: str):
+        pipe = self.client.pipeline()
+        for tag in tags:
+            pipe.incr(f"ledger:tag:{tag}")
+        pipe.execute()
+        self.stats.invalidations += 1
+
+    def info(self) -> dict:
+        return {"backend": "redis", "entries": self.client.dbsize()}
+
+
+BACKENDS = {
+    "memory": MemoryCache,
+    "redis": RedisCache,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Create the configured backend on first use (None when disabled)."""
+    global _backend
+    if CACHE_BACKEND == "none":
+        return None
+    with _backend_lock:
+        if _backend is None:
+            if CACHE_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown CACHE_BACKEND '{CACHE_BACKEND}'")
+            _backend = BACKENDS[CACHE_BACKEND]()
+        return _backend
+
+
+def invalidate(*tags: str):
+    """Call after a write commits, e.g. invalidate("customers")."""
+    backend = get_backend()
+    if backend is not None:
+        backend.invalidate(*tags)
+
+
+def stats() -> dict:
+    backend = get_backend()
+    if backend is None:
+        return {"backend": "none"}
+    return {**backend.info(), **backend.stats.snapshot()}
+
+
+# ===========================
+# 3. ROUTE DECORATOR
+# ===========================
+
+
+def cached(response_model, tags: Iterable[str], ttl: int = CACHE_TTL_SECONDS):
+    """
+    Cache a read handler's JSON response.
+
+    Put it *under* @app.get(...). The key is the handler name plus its
+    arguments (minus db/current_user), so results are shared by all users.
+    """
+    tags = tuple(tags)
+    adapter = TypeAdapter(response_model)
+
+    def decorator(fn):
+        namespace = fn.__name__
+        arg_names = [
+            name
+            for name in inspect.signature(fn).parameters
+            if name not in _IGNORED_ARGS
+        ]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            if backend is None:
+                return fn(*args, **kwargs)
+
+            versions = backend.tag_versions(tags)
+            params = ",".join(f"{n}={kwargs.get(n)!r}" for n in arg_names)
+            key = f"{namespace}({params})@{versions}"
+
+            body = backend.get(key)
+            backend.stats.record(namespace, hit=body is not None)
+            if body is None:
+                result = fn(*args, **kwargs)
+                body = adapter.dump_json(
+                    adapter.validate_python(result, from_attributes=True)
+                )
+                backend.set(key, body, ttl)
+                return Response(
+                    body, media_type="application/json", headers={"X-Cache": "MISS"}
+                )
+            return Response(
+                body, media_type="application/json", headers={"X-Cache": "HIT"}
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,180 @@
+"""
+Bulk customer upsert (onboarding a client's whole customer book).
+
+A row matches an existing customer with create_customer's rule, same name
+AND (same email OR same phone), but compared on normalized key columns
+(NameKey/EmailKey/PhoneKey): case, extra spaces and phone punctuation are
+ignored, so an import finds more matches than create_customer's exact
+comparison. The key columns have composite indexes, so:
+
+    1. rows are cleaned by CustomerBase (strip, blanks -> None)
+    2. duplicates inside the batch are dropped with a hash lookup
+    3. existing customers are fetched per chunk with one indexed
+       `NameKey IN (...)` query and matched in memory
+    4. inserts and updates go out as executemany batches
+
+Missing email/phone normalize to "" (not NULL) so two customers that both
+lack an email still compare equal, like `Email == None` in create_customer.
+
+Uploads over UPSERT_SYNC_MAX_ROWS run as a `customers_upsert` job.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+import models
+
+# ⚙️ CONFIGURATION
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "1000"))  # <2100 MSSQL params
+UPSERT_MAX_ROWS = int(os.getenv("UPSERT_MAX_ROWS", "100000"))  # per request
+# Bigger uploads run as a background job (202 + job) instead of in the request
+UPSERT_SYNC_MAX_ROWS = int(os.getenv("UPSERT_SYNC_MAX_ROWS", "5000"))
+
+FIELDS = ("CustomerName", "Email", "PhoneNumber", "HomeAddress")
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+@dataclass
+class UpsertResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+
+# ===========================
+# 1. NORMALIZED KEYS
+# ===========================
+
+
+def customer_keys(
+    name: Optional[str], email: Optional[str], phone: Optional[str]
+) -> Tuple[str, str, str]:
+    """(NameKey, EmailKey, PhoneKey): case/whitespace-insensitive, phone digits only."""
+    name_key = " ".join((name or "").split()).casefold()[:100]
+    email_key = (email or "").strip().lower()[:255]
+    phone = (phone or "").strip()
+    phone_key = _NON_DIGITS.sub("", phone) or phone.lower()
+    return name_key, email_key, phone_key[:20]
+
+
+def set_keys(customer: models.Customer):
+    """Keep the key columns in sync; call before every insert/update."""
+    keys = customer_keys(customer.CustomerName, customer.Email, customer.PhoneNumber)
+    for column, value in _key_columns(keys).items():
+        setattr(customer, column, value)
+
+
+def _key_columns(keys: Tuple[str, str, str]) -> dict:
+    return dict(zip(("NameKey", "EmailKey", "PhoneKey"), keys))
+
+
+def _match_keys(keys: Tuple[str, str, str]):
+    name_key, email_key, phone_key = keys
+    return ("email", name_key, email_key), ("phone", name_key, phone_key)
+
+
+# ===========================
+# 2. UPSERT
+# ===========================
+
+
+def _dedupe(rows: Iterable[dict], result: UpsertResult) -> List[Tuple[tuple, dict]]:
+    """Keep the first row for each (name, email) / (name, phone) key."""
+    seen = set()
+    unique = []
+    for row in rows:
+        keys = customer_keys(row["CustomerName"], row["Email"], row["PhoneNumber"])
+        match_keys = _match_keys(keys)
+        if any(k in seen for k in match_keys):
+            result.skipped += 1
+            continue
+        seen.update(match_keys)
+        unique.append((keys, row))
+    return unique
+
+
+def _existing(db: Session, name_keys: List[str]) -> Dict[tuple, dict]:
+    """Existing customers for these names, indexed by both match keys."""
+    C = models.Customer
+    found = db.execute(
+        select(
+            C.CustomerID,
+            C.NameKey,
+            C.EmailKey,
+            C.PhoneKey,
+            *(getattr(C, f) for f in FIELDS)
+        )
+        .where(C.NameKey.in_(name_keys))
+        .order_by(C.CustomerID)
+    ).mappings()
+    index = {}
+    for existing in found:
+        keys = (existing["NameKey"], existing["EmailKey"], existing["PhoneKey"])
+        for k in _match_keys(keys):
+            index.setdefault(k, existing)  # lowest CustomerID wins
+    return index
+
+
+def _merge(existing: dict, row: dict, keys: Tuple[str, str, str]) -> dict:
+    """
+    Fill in / overwrite only what the import provides and what actually
+    differs once normalized. The name is the match key, so it's kept as is.
+    """
+    _, email_key, phone_key = keys
+    merged = {f: existing[f] for f in FIELDS}
+    if row["Email"] is not None and email_key != existing["EmailKey"]:
+        merged["Email"] = row["Email"]
+    if row["PhoneNumber"] is not None and phone_key != existing["PhoneKey"]:
+        merged["PhoneNumber"] = row["PhoneNumber"]
+    if row["HomeAddress"] is not None:
+        merged["HomeAddress"] = row["HomeAddress"]
+    return merged
+
+
+def upsert_customers(db: Session, rows: Iterable[dict]) -> UpsertResult:
+    """
+    Create or update customers in batches. `rows` are already cleaned
+    (CustomerBase.model_dump()). Commits once at the end.
+    """
+    result = UpsertResult()
+    unique = _dedupe(rows, result)
+    touched = set()  # an existing customer is updated at most once
+
+    for start in range(0, len(unique), UPSERT_BATCH_SIZE):
+        chunk = unique[start : start + UPSERT_BATCH_SIZE]
+        index = _existing(db, list({keys[0] for keys, _ in chunk}))
+
+        inserts, updates = [], []
+        for keys, row in chunk:
+            existing = next((index[k] for k in _match_keys(keys) if k in index), None)
+            if existing is None:
+                inserts.append({**row, **_key_columns(keys)})
+                continue
+
+            customer_id = existing["CustomerID"]
+            merged = _merge(existing, row, keys)
+            if customer_id in touched or merged == {f: existing[f] for f in FIELDS}:
+                result.skipped += 1
+                continue
+            touched.add(customer_id)
+            keys = customer_keys(
+                merged["CustomerName"], merged["Email"], merged["PhoneNumber"]
+            )
+            updates.append({"CustomerID": customer_id, **merged, **_key_columns(keys)})
+
+        if inserts:
+            db.execute(insert(models.Customer), inserts)
+        if updates:
+            # Every dict has the same columns, so this is one executemany
+            db.execute(update(models.Customer), updates)
+        result.created += len(inserts)
+        result.updated += len(updates)
+
+    db.commit()
+    return result
@@ -1,32 +1,63 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
+import threading
 import urllib.parse
 from dotenv import load_dotenv
 
 # 1. Load variables from .env
 load_dotenv()
 
-# 2. Get the raw connection string
-#    Example for SQLite: "sqlite:///./ledger.db"
-#    Example for Azure:  "Driver={ODBC Driver 18...};Server=tcp:..."
-raw_db_url = os.getenv("DATABASE_URL")
+# NOTE: Nothing connects at import time. The engine is created the first
+# time it is needed (get_engine), so CLI scripts, Alembic and tests only pay
+# for what they use, and each process can point at its own database via
+# configure().
 
-if not raw_db_url:
-    raise ValueError("DATABASE_URL is not set in the .env file")
+_url = None
+_pool_options = {}
+_engine = None
+_engine_lock = threading.Lock()
 
-# 3. Configure the Engine based on the Database Type
-if "sqlite" in raw_db_url:
-    # --- SQLITE SETTINGS ---
-    # SQLite is a file, not a server. It needs specific threading args for FastAPI.
-    print(f"💽 Database Mode: Local SQLite ({raw_db_url})")
 
-    engine = create_engine(
-        raw_db_url,
-        connect_args={"check_same_thread": False},  # CRITICAL for SQLite + FastAPI
-    )
+def configure(raw_db_url, pool_size=None, max_overflow=None):
+    """
+    Point this process at a database. Disposes the current engine, if any.
+    pool_size/max_overflow cap this process's connections (see serve.py).
+    """
+    global _url, _pool_options
+    with _engine_lock:
+        _url = raw_db_url
+        _pool_options = {
+            key: value
+            for key, value in (("pool_size", pool_size), ("max_overflow", max_overflow))
+            if value is not None
+        }
+        _dispose_locked()
+
+
+def max_connections():
+    """This process's connection cap (SQLAlchemy's QueuePool defaults: 5 + 10)."""
+    return _pool_options.get("pool_size", 5) + _pool_options.get("max_overflow", 10)
+
+
+def _build_engine(raw_db_url, pool_options=None):
+    # 2. Get the raw connection string
+    #    Example for SQLite: "sqlite:///./ledger.db"
+    #    Example for Azure:  "Driver={ODBC Driver 18...};Server=tcp:..."
+    if not raw_db_url:
+        raise ValueError("DATABASE_URL is not set in the .env file")
+
+    # 3. Configure the Engine based on the Database Type
+    if "sqlite" in raw_db_url:
+        # --- SQLITE SETTINGS ---
+        # SQLite is a file, not a server. It needs specific threading args for FastAPI.
+        print(f"💽 Database Mode: Local SQLite ({raw_db_url})")
+
+        return create_engine(
+            raw_db_url,
+            connect_args={"check_same_thread": False},  # CRITICAL for SQLite + FastAPI
+        )
 
-else:
     # --- AZURE / MSSQL SETTINGS ---
     # Azure SQL needs the URL to be "URL Encoded" to handle special characters in passwords.
     print("☁️  Database Mode: Azure SQL / MSSQL")
@@ -37,11 +68,62 @@ else:
     # Construct the SQLAlchemy connection string
     final_url = f"mssql+pyodbc:///?odbc_connect={params}"
 
-    engine = create_engine(final_url)
+    # Per-worker pool cap, so workers x pool stays under the server's limit
+    if pool_options:
+        print(f"   Pool per worker: {pool_options}")
+    return create_engine(final_url, **(pool_options or {}))
+
+
+def get_engine():
+    """The process-wide engine, created on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _build_engine(
+                    _url or os.getenv("DATABASE_URL"), _pool_options
+                )
+                _session_factory.configure(bind=_engine)
+    return _engine
+
+
+def warm_up(connections=1):
+    """Open `connections` pooled connections now instead of on the first requests."""
+    engine = get_engine()
+    opened = [engine.connect() for _ in range(connections)]
+    for conn in opened:
+        conn.close()
+
+
+def _dispose_locked():
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+
+def dispose_engine():
+    """Close every pooled connection (app shutdown)."""
+    with _engine_lock:
+        _dispose_locked()
+
+
+def __getattr__(name):
+    # Backwards compatible `database.engine` (resolved lazily)
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # 4. Create the Session Factory
 #    This is what creates the "database session" for every request.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+
+def SessionLocal():
+    get_engine()  # make sure the factory is bound
+    return _session_factory()
+
 
 # 5. Create the Base Class
 #    All your models (in models.py) will inherit from this.
@@ -56,4 +138,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
@@ -0,0 +1,603 @@
+"""
+Background jobs for long-running reports and exports.
+
+A job is a row in the `jobs` table (state, progress, error) plus a result
+file on local disk. Endpoints submit a job and return its ID straight away;
+the work runs on a backend:
+
+    JOB_BACKEND=thread  (default) bounded in-process thread pool
+    JOB_BACKEND=db      local broker stand-in: the jobs table *is* the queue,
+                        every uvicorn worker polls it and claims rows
+                        atomically, so any worker can run any job.
+
+Each process bumps HeartbeatAt on the jobs it holds every
+JOB_HEARTBEAT_SECONDS. A queued/running job whose heartbeat is older than
+JOB_STALE_SECONDS lost its worker (crash, kill -9, deploy) and is marked
+failed by whichever process notices first.
+
+Result files are kept for JOB_RESULT_RETENTION_DAYS. After that the
+heartbeat thread deletes them and marks their jobs expired.
+
+Handlers are plain functions registered with @job_handler("kind").
+"""
+
+import csv
+import dataclasses
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import func, update
+
+import archive
+import database
+import models
+import money
+
+# ⚙️ CONFIGURATION
+JOB_BACKEND = os.getenv("JOB_BACKEND", "thread")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "20"))
+JOB_RESULTS_DIR = os.getenv("JOB_RESULTS_DIR", "./job_results")
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+# Result files are deleted (job -> expired) after this long; 0 = keep them
+JOB_RESULT_RETENTION_DAYS = float(os.getenv("JOB_RESULT_RETENTION_DAYS", "7"))
+JOB_EXPIRY_SWEEP_SECONDS = 3600
+EXPORT_CHUNK_SIZE = 50_000
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+EXPIRED = "expired"  # succeeded, result file deleted after the retention period
+
+
+class QueueFull(Exception):
+    """Raised when the backend already holds JOB_MAX_PENDING unfinished jobs."""
+
+
+# ===========================
+# 1. HANDLER REGISTRY
+# ===========================
+
+# kind -> (handler, file extension)
+HANDLERS: Dict[str, tuple] = {}
+
+
+def job_handler(kind: str, extension: str):
+    """Register `fn(db, params, out_path, progress)` as the handler for `kind`."""
+
+    def decorator(fn: Callable):
+        HANDLERS[kind] = (fn, extension)
+        return fn
+
+    return decorator
+
+
+class ProgressReporter:
+    """Writes progress to the jobs table, at most once per `interval` seconds."""
+
+    def __init__(self, job_id: str, interval: float = 1.0):
+        self.job_id = job_id
+        self.interval = interval
+        self._last = 0.0
+
+    def __call__(self, fraction: float, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        _set_state(self.job_id, Progress=min(max(fraction, 0.0), 1.0))
+
+
+# ===========================
+# 2. JOB EXECUTION
+# ===========================
+
+
+def _set_state(job_id: str, **values):
+    db = database.SessionLocal()
+    try:
+        db.execute(
+            update(models.Job).where(models.Job.JobID == job_id).values(**values)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _set_state_many(job_ids, only_status: Optional[str] = None, **values):
+    query = update(models.Job).where(models.Job.JobID.in_(job_ids))
+    if only_status is not None:
+        query = query.where(models.Job.Status == only_status)
+    db = database.SessionLocal()
+    try:
+        db.execute(query.values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+
+def result_path(job: models.Job) -> str:
+    _, extension = HANDLERS[job.Kind]
+    return os.path.join(JOB_RESULTS_DIR, f"{job.JobID}.{extension}")
+
+
+def run_job(job_id: str):
+    """Execute one job. Never raises: failures are recorded on the job row."""
+    db = database.SessionLocal()
+    tmp_path = None
+    try:
+        job = db.query(models.Job).filter(models.Job.JobID == job_id).first()
+        if job is None:
+            return
+        handler, _ = HANDLERS[job.Kind]
+        out_path = result_path(job)
+        params = json.loads(job.Params or "{}")
+        # Uploaded rows travel as a file next to the results, never in Params
+        params["payload"] = _load_input(job_id)
+
+        _set_state(job_id, Status=RUNNING, StartedAt=datetime.now(), Progress=0.0)
+        os.makedirs(JOB_RESULTS_DIR, exist_ok=True)
+
+        # Write to a temp file so a half-written result is never downloadable
+        tmp_path = out_path + ".part"
+        handler(db, params, tmp_path, ProgressReporter(job_id))
+        os.replace(tmp_path, out_path)
+
+        _set_state(
+            job_id,
+            Status=SUCCEEDED,
+            Progress=1.0,
+            ResultPath=out_path,
+            FinishedAt=datetime.now(),
+        )
+    except Exception as e:
+        db.rollback()
+        if tmp_path is not None:
+            _remove(tmp_path)
+        _set_state(
+            job_id, Status=FAILED, Error=str(e)[:1000], FinishedAt=datetime.now()
+        )
+    finally:
+        db.close()
+        _remove(_input_path(job_id))
+
+
+def _input_path(job_id: str) -> str:
+    return os.path.join(JOB_RESULTS_DIR, f"{job_id}.input.json")
+
+
+def _load_input(job_id: str):
+    try:
+        with open(_input_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # never written, or already gone
+
+
+def expire_old_results() -> int:
+    """Delete result files older than JOB_RESULT_RETENTION_DAYS; mark those jobs expired."""
+    if JOB_RESULT_RETENTION_DAYS <= 0:
+        return 0
+    Job = models.Job
+    cutoff = datetime.now() - timedelta(days=JOB_RESULT_RETENTION_DAYS)
+    db = database.SessionLocal()
+    try:
+        old = (
+            db.query(Job.JobID, Job.ResultPath)
+            .filter(Job.Status == SUCCEEDED, Job.FinishedAt < cutoff)
+            .all()
+        )
+        expired = 0
+        for job_id, path in old:
+            # Conditional: only the process that flips the row deletes the file
+            claimed = db.execute(
+                update(Job)
+                .where(Job.JobID == job_id, Job.Status == SUCCEEDED)
+                .values(Status=EXPIRED, ResultPath=None)
+            ).rowcount
+            db.commit()
+            if claimed == 1:
+                if path:
+                    _remove(path)
+                expired += 1
+        return expired
+    finally:
+        db.close()
+
+
+def fail_stale_jobs(statuses) -> int:
+    """Fail jobs in `statuses` whose worker stopped sending heartbeats."""
+    Job = models.Job
+    now = datetime.now()
+    db = database.SessionLocal()
+    try:
+        failed = db.execute(
+            update(Job)
+            .where(
+                Job.Status.in_(statuses),
+                func.coalesce(Job.HeartbeatAt, Job.StartedAt, Job.CreatedAt)
+                < now - timedelta(seconds=JOB_STALE_SECONDS),
+            )
+            .values(
+                Status=FAILED,
+                Error="Worker stopped before the job finished",
+                FinishedAt=now,
+            )
+        ).rowcount
+        db.commit()
+        return failed
+    finally:
+        db.close()
+
+
+# ===========================
+# 3. BACKENDS
+# ===========================
+
+
+class _Heartbeat:
+    """
+    Held job IDs plus a thread that keeps their HeartbeatAt fresh and fails
+    other processes' stale jobs. `stale_statuses` are the states a job can
+    only be in while some process holds it.
+    """
+
+    stale_statuses = (QUEUED, RUNNING)
+
+    def __init__(self):
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._beat = threading.Thread(
+            target=self._heartbeat, name="ledger-job-heartbeat", daemon=True
+        )
+        self._beat.start()
+
+    def _hold(self, job_id: str):
+        with self._held_lock:
+            self._held.add(job_id)
+
+    def _release(self, job_id: str):
+        with self._held_lock:
+            self._held.discard(job_id)
+
+    def _heartbeat(self):
+        # First sweep right away: a restarted worker cleans up after itself
+        next_expiry = 0.0
+        while True:
+            try:
+                with self._held_lock:
+                    held = list(self._held)
+                if held:
+                    _set_state_many(held, HeartbeatAt=datetime.now())
+                failed = fail_stale_jobs(self.stale_statuses)
+                if failed:
+                    print(f"🧟 Marked {failed} abandoned job(s) as failed")
+                if time.monotonic() >= next_expiry:
+                    next_expiry = time.monotonic() + JOB_EXPIRY_SWEEP_SECONDS
+                    expired = expire_old_results()
+                    if expired:
+                        print(f"🧹 Deleted {expired} expired job result(s)")
+            except Exception:
+                pass  # database away: try again next beat
+            if self._stop.wait(JOB_HEARTBEAT_SECONDS):
+                return
+
+
+class ThreadPoolBackend(_Heartbeat):
+    """Bounded in-process pool. Jobs only run in the worker that accepted them."""
+
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ledger-job"
+        )
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        super().__init__()
+
+    def submit(self, job_id: str):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull()
+            self._pending += 1
+        self._hold(job_id)
+        self.executor.submit(self._run, job_id)
+
+    def _run(self, job_id: str):
+        try:
+            run_job(job_id)
+        finally:
+            self._release(job_id)
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self):
+        self._stop.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        # Cancelled jobs would otherwise sit in "queued" for good
+        with self._held_lock:
+            held = list(self._held)
+        if held:
+            _set_state_many(
+                held,
+                only_status=QUEUED,
+                Status=FAILED,
+                Error="Server shut down before the job ran",
+                FinishedAt=datetime.now(),
+            )
+
+
+class DatabaseQueueBackend(_Heartbeat):
+    """
+    Local broker stand-in for multi-worker deployments.
+
+    `submit` only checks the queue depth; the row inserted by `submit_job`
+    is the message. Poller threads in every process claim queued rows with a
+    conditional UPDATE, so exactly one worker wins each job.
+    """
+
+    # Queued rows belong to no one yet: any worker will still claim them
+    stale_statuses = (RUNNING,)
+
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.max_pending = max_pending
+        super().__init__()
+        self._threads = [
+            threading.Thread(target=self._poll, name=f"ledger-job-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, job_id: str):
+        db = database.SessionLocal()
+        try:
+            pending = (
+                db.query(models.Job)
+                .filter(models.Job.Status.in_([QUEUED, RUNNING]))
+                .count()
+            )
+        finally:
+            db.close()
+        # The new row is already counted
+        if pending > self.max_pending:
+            raise QueueFull()
+
+    def _claim(self) -> Optional[str]:
+        now = datetime.now()
+        db = database.SessionLocal()
+        try:
+            candidate = (
+                db.query(models.Job.JobID)
+                .filter(models.Job.Status == QUEUED)
+                .order_by(models.Job.CreatedAt)
+                .first()
+            )
+            if candidate is None:
+                return None
+            claimed = db.execute(
+                update(models.Job)
+                .where(models.Job.JobID == candidate.JobID, models.Job.Status == QUEUED)
+                .values(Status=RUNNING, StartedAt=now, HeartbeatAt=now)
+            )
+            db.commit()
+            if claimed.rowcount != 1:
+                return None
+            self._hold(candidate.JobID)
+            return candidate.JobID
+        finally:
+            db.close()
+
+    def _poll(self):
+        while not self._stop.is_set():
+            try:
+                job_id = self._claim()
+            except Exception:
+                job_id = None
+            if job_id:
+                try:
+                    run_job(job_id)
+                finally:
+                    self._release(job_id)
+            else:
+                self._stop.wait(JOB_POLL_SECONDS)
+
+    def shutdown(self):
+        self._stop.set()
+
+
+BACKENDS = {
+    "thread": ThreadPoolBackend,
+    "db": DatabaseQueueBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Create the configured backend (the lifespan does this at startup)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if JOB_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown JOB_BACKEND '{JOB_BACKEND}'")
+            _backend = BACKENDS[JOB_BACKEND]()
+        return _backend
+
+
+def shutdown_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.shutdown()
+            _backend = None
+
+
+def submit_job(
+    db, kind: str, params: dict, user: models.User, payload=None
+) -> models.Job:
+    """
+    Queue a job. `payload` (JSON-able, e.g. uploaded rows) is too big for
+    Params: it's written to a file that the handler gets as params["payload"].
+    """
+    if kind not in HANDLERS:
+        raise KeyError(kind)
+    job_id = uuid.uuid4().hex
+    if payload is not None:
+        # Before the row exists: a DB-queue worker may claim it right away
+        os.makedirs(JOB_RESULTS_DIR, exist_ok=True)
+        with open(_input_path(job_id), "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+    now = datetime.now()
+    job = models.Job(
+        JobID=job_id,
+        Kind=kind,
+        Status=QUEUED,
+        Progress=0.0,
+        Params=json.dumps(params, default=str),
+        CreatedBy=user.id,
+        CreatedAt=now,
+        HeartbeatAt=now,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    try:
+        get_backend().submit(job.JobID)
+    except QueueFull:
+        _set_state(job.JobID, Status=FAILED, Error="Job queue is full")
+        _remove(_input_path(job.JobID))
+        raise
+    return job
+
+
+# ===========================
+# 4. JOB HANDLERS
+# ===========================
+
+
+def _parse_dt(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+@job_handler("transactions_export", "csv")
+def export_transactions(db, params, out_path, progress):
+    """Full Transactions dump (archived rows included) as CSV, streamed in chunks."""
+    total = (
+        db.query(models.Transaction).count()
+        + db.query(models.TransactionArchive).count()
+    ) or 1
+    src = archive.select_transactions(db, include_archived=True).subquery()
+    query = (
+        db.query(
+            src.c.TransactionID,
+            src.c.CustomerID,
+            src.c.Amount,
+            src.c.EntryDate,
+            src.c.Notes,
+            src.c.AmountCents,
+        )
+        .order_by(src.c.TransactionID)
+        .yield_per(EXPORT_CHUNK_SIZE)
+    )
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["TransactionID", "CustomerID", "Amount", "EntryDate", "Notes"])
+        for i, row in enumerate(query, start=1):
+            # Rows written before AmountCents existed (not backfilled yet) fall
+            # back to Amount
+            if money.USE_CENTS and row.AmountCents is not None:
+                row = (*row[:2], money.format_cents(row.AmountCents), *row[3:5])
+            writer.writerow(row[:5])
+            if i % 10_000 == 0:
+                progress(i / total)
+
+
+@job_handler("customers_upsert", "json")
+def import_customers(db, params, out_path, progress):
+    """POST /customers/bulk uploads too big to run inside the request."""
+    import cache
+    import customer_upsert
+
+    rows = params.get("payload")
+    if rows is None:
+        raise ValueError("Upload customers with POST /customers/bulk")
+    # No progress updates in between: the upsert is one transaction, and on
+    # SQLite a second writer (the progress UPDATE) would wait for it
+    result = customer_upsert.upsert_customers(db, rows)
+    if result.created or result.updated:
+        cache.invalidate("customers")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(dataclasses.asdict(result), f)
+
+
+@job_handler("aging_report", "csv")
+def export_aging(db, params, out_path, progress):
+    import reports  # NumPy, only needed once a report job runs
+
+    as_of = _parse_dt(params.get("as_of")) or datetime.now()
+    cols = reports.load_transaction_columns(db, end=as_of + timedelta(microseconds=1))
+    progress(0.5, force=True)
+    customer_ids, buckets = reports.compute_aging(cols, as_of)
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["CustomerID", *reports.BUCKET_LABELS, "Total"])
+        for customer_id, row in zip(customer_ids, buckets):
+            if row.any():
+                writer.writerow(
+                    [int(customer_id)]
+                    + [money.format_cents(int(v)) for v in row]
+                    + [money.format_cents(int(row.sum()))]
+                )
+
+
+@job_handler("statement_summary", "csv")
+def export_statement_summary(db, params, out_path, progress):
+    import reports  # NumPy, only needed once a report job runs
+
+    start, end = reports.statement_period(
+        _parse_dt(params.get("start")), _parse_dt(params.get("end"))
+    )
+    cols = reports.load_transaction_columns(db, end=end)
+    progress(0.5, force=True)
+    customer_ids, opening, charges, payments, closing = (
+        reports.compute_statement_summary(cols, start, end)
+    )
+
+    def d(cents):
+        return money.format_cents(int(cents))
+
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["CustomerID", "OpeningBalance", "Charges", "Payments", "ClosingBalance"]
+        )
+        for i in range(len(customer_ids)):
+            writer.writerow(
+                [
+                    int(customer_ids[i]),
+                    d(opening[i]),
+                    d(charges[i]),
+                    d(payments[i]),
+                    d(closing[i]),
+                ]
+            )
@@ -0,0 +1,465 @@
+"""
+Application-level hash chain for Transactions (tamper evidence without
+Azure SQL Ledger, e.g. on SQLite).
+
+Every Transaction stores:
+
+    PrevHash = RowHash of the previous Transaction (by TransactionID)
+    RowHash  = sha256(canonical row content + PrevHash)
+
+Changing, inserting or deleting any row breaks the chain from that point on.
+AmountCents (see money.py) is not part of the hash; verification checks it
+against the hashed Amount instead.
+
+New rows are appended under a lock on the single ChainHead row (the last
+chained TransactionID + its hash), so concurrent inserts queue up instead
+of forking the chain, and TransactionIDs become visible in chain order.
+The hash is computed before the INSERT: no follow-up UPDATE, which on the
+Azure SQL Ledger table would also write a TransactionsHistory row.
+
+Verification is incremental: each successful run stores a checkpoint
+(last verified TransactionID + its hash), and the next run only walks the
+rows added after it. Large ranges are split across processes.
+
+CLI:
+    python ledger_chain.py verify [--full] [--workers N]
+    python ledger_chain.py backfill
+"""
+
+import argparse
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import (
+    DECIMAL,
+    DateTime,
+    bindparam,
+    column,
+    func,
+    insert,
+    select,
+    table,
+    text,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import archive
+import database
+import models
+import money
+
+GENESIS_HASH = "0" * 64
+
+# Below this many rows a single process is faster than spawning workers
+PARALLEL_THRESHOLD = 200_000
+CHUNK_SIZE = 10_000
+
+HEAD_ID = 1  # ChainHead has exactly one row
+
+
+# ===========================
+# 1. HASHING
+# ===========================
+
+
+def compute_row_hash(
+    transaction_id: int,
+    customer_id: Optional[int],
+    amount,
+    entry_date: Optional[datetime],
+    notes: Optional[str],
+    prev_hash: str,
+) -> str:
+    # Canonical form: fixed 2dp amount and a tz-less timestamp, so the value
+    # hashes identically before and after a round-trip through any backend
+    canonical = "|".join(
+        [
+            str(transaction_id),
+            "" if customer_id is None else str(customer_id),
+            "" if amount is None else f"{Decimal(amount):.2f}",
+            "" if entry_date is None else entry_date.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            notes or "",
+            prev_hash,
+        ]
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _hash_tx(tx, prev_hash: str) -> str:
+    return compute_row_hash(
+        tx.TransactionID, tx.CustomerID, tx.Amount, tx.EntryDate, tx.Notes, prev_hash
+    )
+
+
+def _last_chained(db: Session):
+    """(TransactionID, RowHash) of the newest chained row, hot or archived."""
+    candidates = [
+        db.execute(
+            select(t.c.TransactionID, t.c.RowHash)
+            .where(t.c.RowHash.isnot(None))
+            .order_by(t.c.TransactionID.desc())
+            .limit(1)
+        ).first()
+        for t in (archive.HOT, archive.COLD)
+    ]
+    return max(filter(None, candidates), default=None)
+
+
+def _lock_head(db: Session):
+    """
+    Lock the ChainHead row until commit and return (LastTransactionID,
+    LastHash), or None if it doesn't exist yet. A no-op UPDATE takes the row
+    lock on Postgres / MSSQL and the write lock on SQLite.
+    """
+    head = models.ChainHead.__table__
+    lock = (
+        update(head)
+        .where(head.c.HeadID == HEAD_ID)
+        .values(LastTransactionID=head.c.LastTransactionID)
+    )
+    if db.get_bind().dialect.update_returning:
+        return db.execute(
+            lock.returning(head.c.LastTransactionID, head.c.LastHash)
+        ).first()
+    db.execute(lock)
+    return db.execute(
+        select(head.c.LastTransactionID, head.c.LastHash).where(
+            head.c.HeadID == HEAD_ID
+        )
+    ).first()
+
+
+def _create_head(db: Session):
+    # Databases built with create_all() have no head yet: start it at the
+    # newest chained row
+    last = _last_chained(db)
+    try:
+        with db.begin_nested():
+            db.execute(
+                insert(models.ChainHead.__table__).values(
+                    HeadID=HEAD_ID,
+                    LastTransactionID=last.TransactionID if last else 0,
+                    LastHash=last.RowHash if last else GENESIS_HASH,
+                )
+            )
+    except IntegrityError:
+        pass  # another request created it first
+
+
+def _next_transaction_id(db: Session, head_id: int) -> int:
+    """The ID the INSERT will get. Only valid while the head is locked."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return db.execute(
+            text(
+                "SELECT nextval(pg_get_serial_sequence('\"Transactions\"', "
+                "'TransactionID'))"
+            )
+        ).scalar()
+    if dialect == "mssql":
+        # IDENTITY can't be drawn ahead of the INSERT, but nothing else
+        # inserts while we hold the head, so the next value is predictable
+        return db.execute(
+            text(
+                "SELECT COALESCE(CAST(last_value AS BIGINT) "
+                "+ CAST(increment_value AS BIGINT), CAST(seed_value AS BIGINT)) "
+                "FROM sys.identity_columns WHERE object_id = "
+                "OBJECT_ID('dbo.Transactions') AND name = 'TransactionID'"
+            )
+        ).scalar()
+    # SQLite: max + 1, but never below the head (the hot table may have been
+    # archived down to nothing)
+    hot_max = db.execute(select(func.max(archive.HOT.c.TransactionID))).scalar()
+    return max(hot_max or 0, head_id) + 1
+
+
+def append_transaction(db: Session, tx: models.Transaction):
+    """
+    Chain and INSERT a new Transaction (instead of `db.add`). Caller commits,
+    which releases the chain head for the next insert.
+    """
+    head = _lock_head(db)
+    if head is None:
+        _create_head(db)
+        head = _lock_head(db)
+    predicted = _next_transaction_id(db, head.LastTransactionID)
+    if db.get_bind().dialect.name != "mssql":
+        tx.TransactionID = predicted
+
+    # Hash what the DECIMAL(18,2) column will hold, not the raw input
+    tx.Amount = money.to_amount(tx.Amount)
+    tx.PrevHash = head.LastHash
+    tx.RowHash = compute_row_hash(
+        predicted, tx.CustomerID, tx.Amount, tx.EntryDate, tx.Notes, tx.PrevHash
+    )
+    db.add(tx)
+    db.flush()
+    if tx.TransactionID != predicted:
+        # MSSQL only: the IDENTITY jumped (e.g. its cache was lost on a
+        # restart). Re-hash; this one row pays for an UPDATE.
+        tx.RowHash = _hash_tx(tx, tx.PrevHash)
+
+    heads = models.ChainHead.__table__
+    db.execute(
+        update(heads)
+        .where(heads.c.HeadID == HEAD_ID)
+        .values(LastTransactionID=tx.TransactionID, LastHash=tx.RowHash)
+    )
+
+
+# ===========================
+# 2. VERIFICATION
+# ===========================
+
+
+@dataclass
+class RangeResult:
+    first_id: Optional[int] = None
+    first_prev_hash: Optional[str] = None
+    last_id: Optional[int] = None
+    last_hash: Optional[str] = None
+    rows: int = 0
+    broken_ids: List[int] = field(default_factory=list)
+
+
+def _verify_range(lo: int, hi: int, expected_prev: Optional[str]) -> RangeResult:
+    """
+    Verify rows with lo < TransactionID <= hi.
+
+    `expected_prev` is the hash the first row must point at; None means
+    "unknown" (a parallel chunk), in which case the caller checks the seam.
+    """
+    result = RangeResult()
+    db = database.SessionLocal()
+    try:
+        # Archived rows are part of the chain too
+        src = archive.select_transactions(db).subquery()
+        query = (
+            db.query(src)
+            .filter(src.c.TransactionID > lo, src.c.TransactionID <= hi)
+            .order_by(src.c.TransactionID)
+            .yield_per(CHUNK_SIZE)
+        )
+        prev = expected_prev
+        for row in query:
+            if result.rows == 0:
+                result.first_id, result.first_prev_hash = (
+                    row.TransactionID,
+                    row.PrevHash,
+                )
+            if prev is not None and row.PrevHash != prev:
+                result.broken_ids.append(row.TransactionID)
+            elif row.RowHash != _hash_tx(row, row.PrevHash or ""):
+                result.broken_ids.append(row.TransactionID)
+            elif row.AmountCents is not None and row.AmountCents != money.to_cents(
+                row.Amount
+            ):
+                # AmountCents isn't hashed; it must agree with the Amount that is
+                result.broken_ids.append(row.TransactionID)
+            prev = row.RowHash
+            result.last_id = row.TransactionID
+            result.last_hash = row.RowHash
+            result.rows += 1
+    finally:
+        db.close()
+    return result
+
+
+def _init_worker():
+    # Forked workers must not reuse the parent's pooled connections
+    database.engine.dispose(close=False)
+
+
+def _verify_parallel(lo: int, hi: int, start_hash: str, workers: int):
+    step = max((hi - lo) // workers, 1)
+    bounds = list(range(lo, hi, step)) + [hi]
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_verify_range, a, b, None) for a, b in ranges]
+        parts = [f.result() for f in futures]
+
+    # Stitch the chunks: each chunk's first row must point at the previous tail
+    merged = RangeResult(last_hash=start_hash)
+    for part in parts:
+        if part.rows == 0:
+            continue
+        if part.first_prev_hash != merged.last_hash:
+            part.broken_ids.insert(0, part.first_id)
+        merged.broken_ids.extend(part.broken_ids)
+        merged.rows += part.rows
+        merged.last_id, merged.last_hash = part.last_id, part.last_hash
+    return merged
+
+
+def _first_chained_id(db: Session) -> int:
+    firsts = [
+        db.execute(
+            select(func.min(t.c.TransactionID)).where(t.c.RowHash.isnot(None))
+        ).scalar()
+        for t in (archive.HOT, archive.COLD)
+    ]
+    return min(filter(None, firsts), default=1)
+
+
+def verify_chain(db: Session, full: bool = False, workers: Optional[int] = None):
+    """
+    Verify the chain and store a checkpoint if it is intact.
+
+    By default only rows after the last checkpoint are walked (the checkpointed
+    row itself is re-hashed, so tampering with the tail is still caught).
+    Pass full=True to re-verify from the first row.
+    """
+    workers = workers or os.cpu_count() or 1
+    checkpoint = None
+    if not full:
+        checkpoint = (
+            db.query(models.ChainCheckpoint)
+            .order_by(models.ChainCheckpoint.LastTransactionID.desc())
+            .first()
+        )
+
+    broken: List[int] = []
+    # Rows before the first chained one predate the chain (Azure SQL skips
+    # the backfill: the Ledger table already covers them)
+    lo, start_hash = _first_chained_id(db) - 1, GENESIS_HASH
+    if checkpoint:
+        lo, start_hash = checkpoint.LastTransactionID, checkpoint.LastHash
+        src = archive.select_transactions(db).subquery()
+        anchor = db.query(src).filter(src.c.TransactionID == lo).first()
+        if anchor is None or anchor.RowHash != start_hash:
+            broken.append(lo)
+        elif _hash_tx(anchor, anchor.PrevHash or "") != start_hash:
+            broken.append(lo)
+
+    hi = max(
+        db.query(func.max(models.Transaction.TransactionID)).scalar() or lo,
+        db.query(func.max(models.TransactionArchive.TransactionID)).scalar() or lo,
+    )
+    if hi - lo > PARALLEL_THRESHOLD and workers > 1:
+        result = _verify_parallel(lo, hi, start_hash, workers)
+    else:
+        result = _verify_range(lo, hi, start_hash)
+    broken.extend(result.broken_ids)
+
+    if not broken and result.last_id is not None:
+        db.add(
+            models.ChainCheckpoint(
+                LastTransactionID=result.last_id,
+                LastHash=result.last_hash,
+                RowsVerified=result.rows,
+                VerifiedAt=datetime.now(),
+            )
+        )
+        db.commit()
+
+    return {
+        "ok": not broken,
+        "from_transaction_id": lo,
+        "to_transaction_id": result.last_id or lo,
+        "rows_verified": result.rows,
+        "broken_transaction_ids": broken[:100],
+    }
+
+
+# ===========================
+# 3. BACKFILL (existing rows)
+# ===========================
+
+
+def _chain_table(schema: Optional[str]):
+    # Frozen at the columns 8b1d4c7e2f90 knows about: the migration calls
+    # backfill() too, so this must not depend on the current models
+    return table(
+        "Transactions",
+        column("TransactionID"),
+        column("CustomerID"),
+        column("Amount", DECIMAL(18, 2)),  # typed: the hash needs Decimal / datetime
+        column("EntryDate", DateTime),
+        column("Notes"),
+        column("PrevHash"),
+        column("RowHash"),
+        schema=schema,
+    )
+
+
+def backfill(db: Session, batch_size: int = CHUNK_SIZE) -> int:
+    """
+    Chain every row that has no RowHash yet, in TransactionID order.
+
+    Not on Azure SQL: the Ledger table already covers the old rows, and
+    every UPDATE there would also copy the row into TransactionsHistory.
+    """
+    if db.get_bind().dialect.name == "mssql":
+        return 0
+    t = _chain_table(None)
+    link = (
+        t.update()
+        .where(t.c.TransactionID == bindparam("id"))
+        .values(PrevHash=bindparam("prev"), RowHash=bindparam("row"))
+    )
+    prev_hash = GENESIS_HASH
+    last_id = 0
+    linked = 0
+    while True:
+        batch = db.execute(
+            select(t)
+            .where(t.c.TransactionID > last_id)
+            .order_by(t.c.TransactionID)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        params = []
+        for tx in batch:
+            row_hash = tx.RowHash
+            if row_hash is None:
+                row_hash = _hash_tx(tx, prev_hash)
+                params.append(
+                    {"id": tx.TransactionID, "prev": prev_hash, "row": row_hash}
+                )
+            prev_hash = row_hash
+            last_id = tx.TransactionID
+        if params:
+            db.execute(link, params)
+            linked += len(params)
+        db.commit()
+    return linked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transactions hash chain tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    verify = sub.add_parser("verify", help="Verify the chain (incremental)")
+    verify.add_argument("--full", action="store_true", help="Ignore checkpoints")
+    verify.add_argument("--workers", type=int, default=None)
+    sub.add_parser("backfill", help="Hash rows created before the chain existed")
+    args = parser.parse_args()
+
+    session = database.SessionLocal()
+    try:
+        if args.command == "backfill":
+            print(f"🔗 Linked {backfill(session)} transactions.")
+        else:
+            report = verify_chain(session, full=args.full, workers=args.workers)
+            if report["ok"]:
+                print(
+                    f"✅ Chain intact: {report['rows_verified']} rows verified "
+                    f"(TransactionID {report['from_transaction_id']} -> "
+                    f"{report['to_transaction_id']})."
+                )
+            else:
+                print(
+                    "❌ Chain broken at TransactionID(s): "
+                    f"{report['broken_transaction_ids']}"
+                )
+                raise SystemExit(1)
+    finally:
+        session.close()
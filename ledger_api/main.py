@@ -1,27 +1,24 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
-from typing import List, Optional
-import models, database, auth
-from pydantic import BaseModel, field_validator
+from fastapi.responses import FileResponse, Response
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, select
+from typing import Any, Dict, List, Optional, Union
+import models, database, auth, archive, cache, refresh_tokens
+import customer_upsert, profiling, money
+from settings import Settings
+from pydantic import BaseModel, Field, field_validator
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 
-app = FastAPI()
-
-# --- CORS CONFIGURATION ---
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# All API routes hang off this router; create_app() mounts it on an app.
+# Job backend, hash chain and admission control are imported where they're
+# used (or in create_app), so `import main` stays cheap for scripts.
+router = APIRouter(route_class=profiling.ProfiledRoute)
 
 # This tells FastAPI that the token is located in the "Authorization: Bearer" header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -42,15 +39,20 @@ def get_current_user(
         # Verify signature and expiration
         payload = auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("typ") == refresh_tokens.REFRESH_TYPE:
             raise credentials_exception
     except auth.JWTError:
         raise credentials_exception
 
+    # Logged-out sessions (in-memory lookup, synced every few seconds)
+    if refresh_tokens.is_session_revoked(db, payload.get("fam")):
+        raise credentials_exception
+
     # Check if user exists in DB
     user = db.query(models.User).filter(models.User.email == email).first()
     if user is None:
         raise credentials_exception
+    profiling.authorize(user)  # X-Profile is honoured for admins only
     return user
 
 
@@ -64,6 +66,11 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     is_admin: bool  # Sent to frontend to show/hide admin button
+    refresh_token: Optional[str] = None  # Swap at /token/refresh when it expires
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class UserCreate(BaseModel):
@@ -90,8 +97,17 @@ class TransactionBase(BaseModel):
 class TransactionCreate(TransactionBase):
     CustomerID: int
 
+    # Round like the DECIMAL(18,2) column does, so the chain hashes (and
+    # AmountCents holds) exactly the amount that gets stored
+    @field_validator("Amount")
+    @classmethod
+    def round_amount(cls, v):
+        return money.to_amount(v)
+
 
 class TransactionResponse(TransactionBase):
+    # Held as int cents, sent as "12.50" like before (see money.py)
+    Amount: money.Money = Field(validation_alias=money.AMOUNT_SOURCE)
     TransactionID: int
     CustomerID: int
 
@@ -130,10 +146,120 @@ class CustomerResponse(CustomerBase):
         from_attributes = True
 
 
+class BulkUpsertResponse(BaseModel):
+    created: int
+    updated: int
+    skipped: int  # duplicates within the batch, or nothing to change
+
+    class Config:
+        from_attributes = True
+
+
 class BalanceResponse(BaseModel):
     CustomerID: int
     CustomerName: str
-    Balance: Decimal
+    Balance: money.Money
+
+
+# --- Paged Table Models (one window of rows for the UI's virtual tables) ---
+class CustomerRow(CustomerBase):
+    CustomerID: int
+    TxCount: int  # recent (not archived) transactions, for the activity badge
+    Balance: money.Money
+
+
+class CustomerPage(BaseModel):
+    total: Optional[int] = None  # first page (offset=0) only
+    items: List[CustomerRow]
+
+
+class TransactionRow(TransactionResponse):
+    CustomerName: Optional[str] = None
+
+
+class TransactionPage(BaseModel):
+    total: Optional[int] = None  # first page only
+    items: List[TransactionRow]
+
+
+class SyncResponse(BaseModel):
+    customers: List[CustomerRow]  # changed since the cursor, or with new transactions
+    transactions: List[TransactionRow]
+    # Cursors for the next call
+    after_tx: int
+    customers_since: Optional[datetime] = None
+    customers_after_id: int = 0
+    # Where the next round starts: held behind edits that may not have committed
+    customers_resume_since: Optional[datetime] = None
+    customers_resume_after_id: int = 0
+    more: bool  # a list hit `limit`: call again right away
+
+
+class LedgerSummary(BaseModel):
+    Customers: int
+    Transactions: int
+    Volume: money.Money
+    ActivityCutoffs: List[int]  # TxCount at the 33rd / 66th percentile
+
+
+# --- Report Models ---
+class AgingRow(BaseModel):
+    CustomerID: int
+    Current: money.Money
+    Days31to60: money.Money
+    Days61to90: money.Money
+    Over90: money.Money
+    Total: money.Money
+
+
+class AgingReport(BaseModel):
+    AsOf: datetime
+    rows: List[AgingRow]
+    totals: AgingRow
+
+
+class StatementSummaryRow(BaseModel):
+    CustomerID: int
+    OpeningBalance: money.Money
+    Charges: money.Money
+    Payments: money.Money
+    ClosingBalance: money.Money
+
+
+class StatementLine(BaseModel):
+    TransactionID: int
+    EntryDate: datetime
+    Amount: money.Money
+    RunningBalance: money.Money
+
+
+class JobCreate(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+
+class JobResponse(BaseModel):
+    JobID: str
+    Kind: str
+    Status: str
+    Progress: float
+    Error: Optional[str] = None
+    CreatedAt: datetime
+    StartedAt: Optional[datetime] = None
+    FinishedAt: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CustomerStatement(BaseModel):
+    CustomerID: int
+    CustomerName: str
+    Start: datetime
+    End: datetime
+    OpeningBalance: money.Money
+    ClosingBalance: money.Money
+    lines: List[StatementLine]
 
 
 # ===========================
@@ -141,7 +267,7 @@ class BalanceResponse(BaseModel):
 # ===========================
 
 
-@app.post("/token", response_model=Token)
+@router.post("/token", response_model=Token)
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(database.get_db),
@@ -157,21 +283,46 @@ def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 3. Generate Token
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    # 3. Generate Tokens (access + refresh, so the client doesn't log in again)
+    access_token, refresh_token = refresh_tokens.start_session(db, user)
 
     # 4. Return Token + Admin Status
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "is_admin": user.is_admin,
+        "refresh_token": refresh_token,
     }
 
 
-@app.post("/admin/create-user", response_model=Token)
+@router.post("/token/refresh", response_model=Token)
+def refresh_access_token(body: RefreshRequest, db: Session = Depends(database.get_db)):
+    # No Argon2 here: a signature check + one UPDATE. The old refresh token is spent.
+    try:
+        user, access_token, refresh_token = refresh_tokens.rotate(
+            db, body.refresh_token
+        )
+    except refresh_tokens.InvalidRefreshToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "is_admin": user.is_admin,
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post("/token/revoke", status_code=204)
+def revoke_refresh_token(body: RefreshRequest, db: Session = Depends(database.get_db)):
+    # Logout: kills the refresh token and every access token from that login
+    refresh_tokens.revoke(db, body.refresh_token)
+
+
+@router.post("/admin/create-user", response_model=Token)
 def create_user_by_admin(
     new_user: UserCreate,
     db: Session = Depends(database.get_db),
@@ -198,7 +349,7 @@ def create_user_by_admin(
     return {"access_token": "", "token_type": "bearer", "is_admin": False}
 
 
-@app.get("/admin/users", response_model=List[UserResponse])
+@router.get("/admin/users", response_model=List[UserResponse])
 def read_users(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(get_current_user),
@@ -208,7 +359,72 @@ def read_users(
     return db.query(models.User).all()
 
 
-@app.delete("/admin/users/{user_id}")
+@router.post("/admin/ledger/verify")
+def verify_ledger_chain(
+    full: bool = False,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized.")
+    import ledger_chain
+
+    return ledger_chain.verify_chain(db, full=full)
+
+
+@router.get("/admin/cache/stats")
+def read_cache_stats(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized.")
+    return cache.stats()
+
+
+@router.get("/admin/admission/stats")
+def read_admission_stats(
+    request: Request, current_user: models.User = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized.")
+    import admission
+
+    return admission.stats(request.app)
+
+
+@router.get("/admin/profiles")
+def read_profiles(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized.")
+    return profiling.list_profiles()
+
+
+@router.get("/admin/profiles/{profile_id}")
+def read_profile(
+    profile_id: str, current_user: models.User = Depends(get_current_user)
+):
+    # Metadata + every SQL statement with its timing
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized.")
+    meta = profiling.load_profile(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return meta
+
+
+@router.get("/admin/profiles/{profile_id}/download")
+def download_profile(
+    profile_id: str, current_user: models.User = Depends(get_current_user)
+):
+    # .prof (pstats / snakeviz) or .speedscope.json (speedscope.app)
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized.")
+    meta = profiling.load_profile(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path = profiling.profile_file(meta)
+    return FileResponse(path, filename=os.path.basename(path))
+
+
+@router.delete("/admin/users/{user_id}")
 def delete_user(
     user_id: int,
     db: Session = Depends(database.get_db),
@@ -227,6 +443,13 @@ def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # jobs.CreatedBy references users.id: keep their jobs (admins still see
+    # them), just without an owner
+    db.query(models.Job).filter(models.Job.CreatedBy == user_id).update(
+        {models.Job.CreatedBy: None}, synchronize_session=False
+    )
+    # Same for refresh_tokens.UserID; this also ends their sessions
+    refresh_tokens.revoke_user(db, user_id)
     db.delete(user)
     db.commit()
     return {"message": "User deleted"}
@@ -237,29 +460,45 @@ def delete_user(
 # ===========================
 
 
-@app.get("/customers/", response_model=List[CustomerResponse])
+@router.get("/customers/", response_model=List[CustomerResponse])
+@cache.cached(List[CustomerResponse], tags=["customers", "transactions"])
 def read_customers(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    # PERFORMANCE FIX: 'joinedload' fetches everything in 1 query
-    return (
-        db.query(models.Customer)
-        .options(joinedload(models.Customer.transactions))
-        .all()
-    )
-
-
-@app.post("/customers/", response_model=CustomerResponse)
+    # Two queries: the customers, then every transaction (archived ones too,
+    # the relationship only sees the hot table) grouped up in Python
+    customers = db.query(models.Customer).all()
+    src = archive.select_transactions(db, include_archived=True).subquery()
+    by_customer: Dict[int, list] = {}
+    for tx in db.query(src).order_by(src.c.TransactionID):
+        by_customer.setdefault(tx.CustomerID, []).append(tx)
+    return [
+        {
+            "CustomerID": cust.CustomerID,
+            "CustomerName": cust.CustomerName,
+            "Email": cust.Email,
+            "PhoneNumber": cust.PhoneNumber,
+            "HomeAddress": cust.HomeAddress,
+            "transactions": by_customer.get(cust.CustomerID, []),
+        }
+        for cust in customers
+    ]
+
+
+@router.post("/customers/", response_model=CustomerResponse)
 def create_customer(
     cust: CustomerCreate,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    # Check for duplicates
+    # Check for duplicates: exact values. NameKey (indexed) only narrows the
+    # search; the bulk import is the one that matches on normalized keys.
+    name_key, _, _ = customer_upsert.customer_keys(cust.CustomerName, None, None)
     existing = (
-        db.query(models.Customer)
+        db.query(models.Customer.CustomerID)
         .filter(
+            models.Customer.NameKey == name_key,
             models.Customer.CustomerName == cust.CustomerName,
             or_(
                 models.Customer.Email == cust.Email,
@@ -275,13 +514,15 @@ def create_customer(
         )
 
     db_customer = models.Customer(**cust.model_dump())
+    customer_upsert.set_keys(db_customer)  # bulk import matches on these
     db.add(db_customer)
     db.commit()
+    cache.invalidate("customers")
     db.refresh(db_customer)
     return db_customer
 
 
-@app.put("/customers/{customer_id}", response_model=CustomerResponse)
+@router.put("/customers/{customer_id}", response_model=CustomerResponse)
 def update_customer(
     customer_id: int,
     cust_update: CustomerUpdate,
@@ -299,13 +540,56 @@ def update_customer(
     update_data = cust_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_customer, key, value)
+    customer_upsert.set_keys(db_customer)
 
     db.commit()
+    cache.invalidate("customers")
     db.refresh(db_customer)
     return db_customer
 
 
-@app.get("/customers/search/", response_model=List[BalanceResponse])
+@router.post("/customers/bulk", response_model=Union[BulkUpsertResponse, JobResponse])
+def bulk_upsert_customers(
+    rows: List[CustomerCreate],
+    response: Response,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # Onboarding a whole customer book: existing rows are updated instead of
+    # rejected (matching is looser than create_customer, see customer_upsert)
+    if len(rows) > customer_upsert.UPSERT_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {customer_upsert.UPSERT_MAX_ROWS} customers per request.",
+        )
+    if len(rows) > customer_upsert.UPSERT_SYNC_MAX_ROWS:
+        # Too big to hold a request for: 202 + a job (GET /jobs/{id}/result)
+        import jobs
+
+        try:
+            job = jobs.submit_job(
+                db,
+                "customers_upsert",
+                {"rows": len(rows)},
+                current_user,
+                payload=[r.model_dump() for r in rows],
+            )
+        except jobs.QueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many jobs in progress. Try again later.",
+                headers={"Retry-After": "30"},
+            )
+        response.status_code = 202
+        return job
+    result = customer_upsert.upsert_customers(db, (r.model_dump() for r in rows))
+    if result.created or result.updated:
+        cache.invalidate("customers")
+    return result
+
+
+@router.get("/customers/search/", response_model=List[BalanceResponse])
+@cache.cached(List[BalanceResponse], tags=["customers", "transactions"])
 def search_customers(
     query: str,
     db: Session = Depends(database.get_db),
@@ -327,24 +611,90 @@ def search_customers(
             status_code=404, detail=f"No customers found matching '{query}'."
         )
 
-    results = []
+    # One grouped SUM in integer cents; archived rows are pre-summed in
+    # CustomerArchiveTotals
+    ids = [c.CustomerID for c in customers]
+    hot = models.Transaction.__table__
+    balances = dict(
+        db.execute(
+            select(hot.c.CustomerID, func.sum(money.cents_column(hot.c)))
+            .where(hot.c.CustomerID.in_(ids))
+            .group_by(hot.c.CustomerID)
+        ).all()
+    )
+    archived = archive.archived_balances(db, ids)
+
+    return [
+        {
+            "CustomerID": cust.CustomerID,
+            "CustomerName": cust.CustomerName,
+            "Balance": (balances.get(cust.CustomerID) or 0)
+            + (archived.get(cust.CustomerID) or 0),
+        }
+        for cust in customers
+    ]
+
+
+def _customer_rows(db: Session, customers: List[models.Customer]) -> List[dict]:
+    """CustomerRow dicts: each customer with its recent TxCount and balance."""
+    activity, archived = {}, {}
+    hot = models.Transaction.__table__
+    # IN lists of at most 1000 (SQL Server takes 2100 parameters per query)
+    for i in range(0, len(customers), 1000):
+        ids = [c.CustomerID for c in customers[i : i + 1000]]
+        for customer_id, count, cents in db.execute(
+            select(hot.c.CustomerID, func.count(), func.sum(money.cents_column(hot.c)))
+            .where(hot.c.CustomerID.in_(ids))
+            .group_by(hot.c.CustomerID)
+        ):
+            activity[customer_id] = (count, cents)
+        archived.update(archive.archived_balances(db, ids))
+
+    rows = []
     for cust in customers:
-        total = db.query(func.sum(models.Transaction.Amount)).filter(
-            models.Transaction.CustomerID == cust.CustomerID
-        ).scalar() or Decimal("0.00")
-
-        results.append(
+        count, cents = activity.get(cust.CustomerID, (0, 0))
+        rows.append(
             {
                 "CustomerID": cust.CustomerID,
                 "CustomerName": cust.CustomerName,
-                "Balance": total,
+                "Email": cust.Email,
+                "PhoneNumber": cust.PhoneNumber,
+                "HomeAddress": cust.HomeAddress,
+                "TxCount": count,
+                "Balance": (cents or 0) + (archived.get(cust.CustomerID) or 0),
             }
         )
+    return rows
 
-    return results
 
+@router.get("/customers/page/", response_model=CustomerPage)
+@cache.cached(CustomerPage, tags=["customers", "transactions"])
+def read_customer_page(
+    q: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # One window of the customer table (the UI asks for what's on screen),
+    # with counts and balances instead of every nested transaction
+    query = db.query(models.Customer)
+    if q:
+        query = query.filter(
+            or_(
+                models.Customer.CustomerName.ilike(f"%{q}%"),
+                models.Customer.Email.ilike(f"%{q}%"),
+            )
+        )
+    total = query.count() if offset == 0 else None
+    customers = (
+        query.order_by(models.Customer.CustomerID).offset(offset).limit(limit).all()
+    )
 
-@app.post("/transactions/", response_model=TransactionResponse)
+    return {"total": total, "items": _customer_rows(db, customers)}
+
+
+@router.post("/transactions/", response_model=TransactionResponse)
 def create_transaction(
     tx: TransactionCreate,
     db: Session = Depends(database.get_db),
@@ -357,44 +707,490 @@ def create_transaction(
     ):
         raise HTTPException(status_code=404, detail="Customer not found")
 
+    # tx.Amount is already rounded to cents: both columns hold the same value
     db_tx = models.Transaction(
         CustomerID=tx.CustomerID,
         Amount=tx.Amount,
+        AmountCents=money.to_cents(tx.Amount),
         EntryDate=tx.EntryDate,
         Notes=tx.Notes,
     )
-    db.add(db_tx)
+    # Tamper evidence: hashed onto the previous row, then inserted
+    import ledger_chain
+
+    ledger_chain.append_transaction(db, db_tx)
     db.commit()
+    cache.invalidate("transactions")
     db.refresh(db_tx)
     return db_tx
 
 
-@app.get("/transactions/", response_model=List[TransactionResponse])
+@router.get("/transactions/", response_model=List[TransactionResponse])
 def read_transactions(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    customer_id: Optional[int] = None,
+    include_archived: Optional[bool] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    return db.query(models.Transaction).all()
+    # Archived rows are only read when the window reaches back into them
+    # (or include_archived=true is passed explicitly)
+    stmt = archive.select_transactions(
+        db,
+        start=start,
+        end=end,
+        customer_id=customer_id,
+        include_archived=include_archived,
+    )
+    src = stmt.subquery()
+    # Only load the amount column the response reads (no Decimals in cents mode)
+    skip = "Amount" if money.USE_CENTS else "AmountCents"
+    columns = [c for c in src.c if c.name != skip]
+    return db.execute(select(*columns).order_by(src.c.TransactionID)).all()
+
+
+@router.get("/transactions/page/", response_model=TransactionPage)
+@cache.cached(TransactionPage, tags=["customers", "transactions"])
+def read_transaction_page(
+    q: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    include_archived: Optional[bool] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # Newest first, one window at a time; `q` matches notes or customer name
+    src = archive.select_transactions(
+        db, customer_id=customer_id, include_archived=include_archived
+    ).subquery()
+    skip = {"Amount" if money.USE_CENTS else "AmountCents", "PrevHash", "RowHash"}
+    stmt = select(
+        *(c for c in src.c if c.name not in skip), models.Customer.CustomerName
+    ).outerjoin(models.Customer, models.Customer.CustomerID == src.c.CustomerID)
+    if q:
+        stmt = stmt.where(
+            or_(
+                src.c.Notes.ilike(f"%{q}%"),
+                models.Customer.CustomerName.ilike(f"%{q}%"),
+            )
+        )
 
-    # ... (existing imports and API routes above) ...
+    total = None
+    if offset == 0:
+        total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+    rows = db.execute(
+        stmt.order_by(src.c.EntryDate.desc(), src.c.TransactionID.desc())
+        .offset(offset)
+        .limit(limit)
+    ).all()
+    return {"total": total, "items": rows}
+
+
+@router.get("/transactions/summary/", response_model=LedgerSummary)
+@cache.cached(LedgerSummary, tags=["customers", "transactions"])
+def ledger_summary(
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # Dashboard cards, summed in SQL instead of over every row in the browser
+    hot = models.Transaction.__table__
+    per_customer = db.execute(
+        select(func.count(), func.sum(money.cents_column(hot.c)))
+        .where(hot.c.CustomerID.isnot(None))
+        .group_by(hot.c.CustomerID)
+    ).all()
+    counts = sorted(count for count, _ in per_customer)
+    cutoffs = [counts[int(len(counts) * p)] if counts else 0 for p in (0.33, 0.66)]
+
+    archived_count = db.query(
+        func.count(models.TransactionArchive.TransactionID)
+    ).scalar()
+    archived_cents = sum(v or 0 for v in archive.archived_balances(db).values())
+    return {
+        "Customers": db.query(func.count(models.Customer.CustomerID)).scalar(),
+        "Transactions": sum(counts) + archived_count,
+        "Volume": sum(cents or 0 for _, cents in per_customer) + archived_cents,
+        "ActivityCutoffs": cutoffs,
+    }
+
+
+# Customer edits stamp UpdatedAt before they commit, so one can become visible
+# after a later edit: the sync cursor stays this far behind the clock
+SYNC_SAFETY_LAG_SECONDS = int(os.getenv("SYNC_SAFETY_LAG_SECONDS", "60"))
+
+
+@router.get("/sync/", response_model=SyncResponse)
+def sync(
+    after_tx: int = Query(0, ge=0),
+    customers_since: Optional[datetime] = None,
+    customers_after_id: int = Query(0, ge=0),
+    limit: int = Query(5000, ge=1, le=10000),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Delta feed for the UI's offline cache. The first call (no cursors) pages
+    through everything; later calls only return what changed.
+
+    Transactions are append-only, and their IDs are drawn under the chain
+    head lock, which is held until commit (ledger_chain.append_transaction).
+    A lower ID can't commit after a higher one, so TransactionID is a safe
+    cursor.
+
+    Customers are edited in place: their cursor is (UpdatedAt, CustomerID).
+    UpdatedAt is stamped before commit, so it is not commit-ordered. The
+    customers_* cursor pages on within one round (`more`); the next round
+    starts from customers_resume_*, which never passes now -
+    SYNC_SAFETY_LAG_SECONDS, so an edit that commits late is still read.
+    Customers that got new transactions come back too, with fresh balances.
+    """
+    src = archive.select_transactions(
+        db, include_archived=True, after_id=after_tx
+    ).subquery()
+    skip = {"Amount" if money.USE_CENTS else "AmountCents", "PrevHash", "RowHash"}
+    transactions = db.execute(
+        select(*(c for c in src.c if c.name not in skip))
+        .order_by(src.c.TransactionID)
+        .limit(limit)
+    ).all()
+
+    Customer = models.Customer
+    query = db.query(Customer)
+    if customers_since is not None:
+        query = query.filter(
+            or_(
+                Customer.UpdatedAt > customers_since,
+                and_(
+                    Customer.UpdatedAt == customers_since,
+                    Customer.CustomerID > customers_after_id,
+                ),
+            )
+        )
+    changed = query.order_by(Customer.UpdatedAt, Customer.CustomerID).limit(limit).all()
+
+    # The keyset cursor only moves with `changed`; touched customers ride along
+    if changed:
+        customers_since = changed[-1].UpdatedAt
+        customers_after_id = changed[-1].CustomerID
+    # ... and the resume cursor never passes the horizon
+    horizon = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        seconds=SYNC_SAFETY_LAG_SECONDS
+    )
+    resume_since, resume_after_id = customers_since, customers_after_id
+    if customers_since is not None and customers_since > horizon:
+        resume_since, resume_after_id = horizon, 0
+    seen = {c.CustomerID for c in changed}
+    touched = {t.CustomerID for t in transactions if t.CustomerID is not None} - seen
+    extra = []
+    for ids in (sorted(touched)[i : i + 1000] for i in range(0, len(touched), 1000)):
+        extra += db.query(Customer).filter(Customer.CustomerID.in_(ids)).all()
+
+    return {
+        "customers": _customer_rows(db, changed + extra),
+        "transactions": transactions,
+        "after_tx": transactions[-1].TransactionID if transactions else after_tx,
+        "customers_since": customers_since,
+        "customers_after_id": customers_after_id,
+        "customers_resume_since": resume_since,
+        "customers_resume_after_id": resume_after_id,
+        "more": len(transactions) == limit or len(changed) == limit,
+    }
+
+
+# ===========================
+# 5. REPORT ENDPOINTS (Protected)
+# ===========================
+# `reports` pulls in NumPy, so it is imported inside the handlers: workers
+# that never serve a report never pay for it.
+
+
+def _default_period(start: Optional[datetime], end: Optional[datetime]):
+    # Same default as the statement_summary job (see reports.statement_period)
+    import reports
+
+    try:
+        return reports.statement_period(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/reports/aging", response_model=AgingReport)
+@cache.cached(AgingReport, tags=["transactions"])
+def aging_report(
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    import reports
+
+    as_of = as_of or datetime.now()
+    cols = reports.load_transaction_columns(db, end=as_of + timedelta(microseconds=1))
+    customer_ids, buckets = reports.compute_aging(cols, as_of)
+
+    def _row(customer_id, values):
+        amounts = [int(v) for v in values]
+        return dict(
+            CustomerID=int(customer_id),
+            **dict(zip(reports.BUCKET_LABELS, amounts)),
+            Total=sum(amounts),
+        )
+
+    # Only customers with something outstanding (or in credit) show up
+    nonzero = buckets.any(axis=1)
+    return {
+        "AsOf": as_of,
+        "rows": [_row(c, b) for c, b in zip(customer_ids[nonzero], buckets[nonzero])],
+        "totals": _row(0, buckets.sum(axis=0)),
+    }
+
+
+@router.get("/reports/statements", response_model=List[StatementSummaryRow])
+@cache.cached(List[StatementSummaryRow], tags=["transactions"])
+def statement_summary(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    import reports
+
+    start, end = _default_period(start, end)
+    cols = reports.load_transaction_columns(db, end=end)
+    customer_ids, opening, charges, payments, closing = (
+        reports.compute_statement_summary(cols, start, end)
+    )
+    return [
+        {
+            "CustomerID": int(customer_ids[i]),
+            "OpeningBalance": int(opening[i]),
+            "Charges": int(charges[i]),
+            "Payments": int(payments[i]),
+            "ClosingBalance": int(closing[i]),
+        }
+        for i in range(len(customer_ids))
+    ]
+
+
+@router.get("/reports/statements/{customer_id}", response_model=CustomerStatement)
+@cache.cached(CustomerStatement, tags=["customers", "transactions"])
+def customer_statement(
+    customer_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    import reports
+
+    start, end = _default_period(start, end)
+    customer = (
+        db.query(models.Customer)
+        .filter(models.Customer.CustomerID == customer_id)
+        .first()
+    )
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    cols = reports.load_transaction_columns(db, customer_id=customer_id, end=end)
+    opening, line_index, running = reports.compute_customer_statement(cols, start, end)
+
+    lines = [
+        {
+            "TransactionID": int(cols.transaction_ids[i]),
+            "EntryDate": cols.entry_dates[i].item(),
+            "Amount": int(cols.cents[i]),
+            "RunningBalance": int(bal),
+        }
+        for i, bal in zip(line_index, running)
+    ]
+    return {
+        "CustomerID": customer.CustomerID,
+        "CustomerName": customer.CustomerName,
+        "Start": start,
+        "End": end,
+        "OpeningBalance": int(opening),
+        "ClosingBalance": int(running[-1] if len(running) else opening),
+        "lines": lines,
+    }
+
+
+# ===========================
+# 6. JOB ENDPOINTS (Protected)
+# ===========================
+
+
+def _get_job(job_id: str, db: Session, current_user: models.User) -> models.Job:
+    job = db.query(models.Job).filter(models.Job.JobID == job_id).first()
+    # Users only see their own jobs; admins see everything
+    if not job or (job.CreatedBy != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/", response_model=JobResponse, status_code=202)
+def submit_job(
+    job_in: JobCreate,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    import jobs
+
+    if job_in.kind not in jobs.HANDLERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown job kind. Choose one of: {', '.join(jobs.HANDLERS)}",
+        )
+    try:
+        return jobs.submit_job(db, job_in.kind, job_in.params, current_user)
+    except jobs.QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many jobs in progress. Try again later.",
+            headers={"Retry-After": "30"},
+        )
+
+
+@router.get("/jobs/", response_model=List[JobResponse])
+def read_jobs(
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    return (
+        db.query(models.Job)
+        .filter(models.Job.CreatedBy == current_user.id)
+        .order_by(models.Job.CreatedAt.desc())
+        .limit(50)
+        .all()
+    )
 
-    # 1. Mount the "assets" folder (CSS/JS images)
 
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def read_job(
+    job_id: str,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    return _get_job(job_id, db, current_user)
 
-if os.path.isdir("dist"):
-    app.mount("/assets", StaticFiles(directory="dist/assets"), name="assets")
+
+@router.get("/jobs/{job_id}/result")
+def download_job_result(
+    job_id: str,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    import jobs
+
+    job = _get_job(job_id, db, current_user)
+    if job.Status == jobs.EXPIRED:
+        raise HTTPException(
+            status_code=410,
+            detail=f"Job results are kept for {jobs.JOB_RESULT_RETENTION_DAYS:g} days.",
+        )
+    if job.Status != jobs.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.Status}.")
+    if not job.ResultPath or not os.path.isfile(job.ResultPath):
+        raise HTTPException(
+            status_code=410, detail="Job result is no longer available."
+        )
+    extension = os.path.splitext(job.ResultPath)[1]
+    return FileResponse(
+        job.ResultPath, filename=f"{job.Kind}-{job.CreatedAt:%Y%m%d-%H%M%S}{extension}"
+    )
+
+
+# ===========================
+# 7. APP FACTORY
+# ===========================
+
+
+def _mount_frontend(app: FastAPI, static_dir: str):
+    # 1. Mount the "assets" folder (CSS/JS images)
+    app.mount("/assets", StaticFiles(directory=f"{static_dir}/assets"), name="assets")
 
     # 2. Catch-All Route (For React Router)
     @app.get("/{full_path:path}")
     async def serve_react_app(full_path: str):
         # Construct the full path to the requested file
-        file_path = f"dist/{full_path}"
+        file_path = f"{static_dir}/{full_path}"
 
         # CRITICAL FIX: Only serve if it is a FILE, not a folder
         if full_path != "" and os.path.isfile(file_path):
             return FileResponse(file_path)
 
         # For everything else (root URL, folders, unknown routes), serve index.html
-        return FileResponse("dist/index.html")
-else:
-    print("⚠️ Warning: 'dist' folder not found. Frontend will not be served.")
+        return FileResponse(f"{static_dir}/index.html")
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the API. Nothing here touches the database: the engine is created
+    lazily and warmed up in the lifespan, so importing this module is cheap.
+
+        uvicorn main:create_app --factory
+    """
+    import admission
+    import jobs
+
+    settings = settings or Settings.from_env()
+    database.configure(
+        settings.database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Startup: connect once per worker before serving traffic, and start
+        # the job backend (DB pollers, heartbeat) even before the first submit
+        database.warm_up(settings.warm_up_connections)
+        jobs.get_backend()
+        yield
+        # Shutdown: stop background jobs, then close pooled connections
+        jobs.shutdown_backend()
+        database.dispose_engine()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.settings = settings
+
+    # --- ADMISSION CONTROL (added before CORS, so 429/503 still get CORS headers) ---
+    admission.install(app, connections=database.max_connections())
+
+    # --- CORS CONFIGURATION ---
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # --- PROFILING (no-op unless PROFILING_ENABLED=1 / settings.profiling) ---
+    profiling.install(app, enabled=settings.profiling)
+
+    app.include_router(router)
+
+    # Frontend last, so its catch-all route never shadows the API
+    if os.path.isdir(settings.static_dir):
+        _mount_frontend(app, settings.static_dir)
+    else:
+        print(
+            f"⚠️ Warning: '{settings.static_dir}' folder not found. "
+            "Frontend will not be served."
+        )
+    return app
+
+
+_app = None
+
+
+def __getattr__(name):
+    # `uvicorn main:app` keeps working: the default app is built on first access
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,26 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, ForeignKey, DateTime, Boolean
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DECIMAL,
+    ForeignKey,
+    DateTime,
+    Boolean,
+    BigInteger,
+    Float,
+    Text,
+    Index,
+)
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 from database import Base
 
 
+def _utcnow():
+    # UTC: a local-time cursor would jump back when the clocks change
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Customer(Base):
     __tablename__ = "Customers"
     # By default, SQLAlchemy assumes 'dbo' schema for SQL Server
@@ -12,6 +30,17 @@ class Customer(Base):
     Email = Column(String(255))
     PhoneNumber = Column(String(20))
     HomeAddress = Column(String(500))
+    # Normalized dedupe keys (see customer_upsert.customer_keys)
+    NameKey = Column(String(100), nullable=True)
+    EmailKey = Column(String(255), nullable=True)
+    PhoneKey = Column(String(20), nullable=True)
+    # Set on every insert/update: the UI's offline cache syncs by it (/sync/)
+    UpdatedAt = Column(DateTime, default=_utcnow, onupdate=_utcnow, index=True)
+
+    __table_args__ = (
+        Index("ix_Customers_NameKey_EmailKey", "NameKey", "EmailKey"),
+        Index("ix_Customers_NameKey_PhoneKey", "NameKey", "PhoneKey"),
+    )
 
     # Relationship: One Customer has many Transactions
     transactions = relationship("Transaction", back_populates="customer")
@@ -22,11 +51,46 @@ class Transaction(Base):
     TransactionID = Column(Integer, primary_key=True, index=True)
     CustomerID = Column(Integer, ForeignKey("Customers.CustomerID"))
     Amount = Column(DECIMAL(18, 2))
-    EntryDate = Column(DateTime)  # datetime2 maps to DateTime in Python
+    AmountCents = Column(BigInteger, nullable=True)  # Amount * 100 (see money.py)
+    EntryDate = Column(DateTime, index=True)  # datetime2 maps to DateTime in Python
     Notes = Column(String, nullable=True)
+    # Hash chain (see ledger_chain.py): tamper evidence outside Azure Ledger
+    PrevHash = Column(String(64), nullable=True)
+    RowHash = Column(String(64), nullable=True)
     # Relationship: A Transaction belongs to one Customer
     customer = relationship("Customer", back_populates="transactions")
 
+    __table_args__ = (
+        # Per-customer reads: statements, search balances, relationship loads
+        Index("ix_Transactions_CustomerID_EntryDate", "CustomerID", "EntryDate"),
+    )
+
+
+class TransactionArchive(Base):
+    # Cold storage for old Transactions (see archive.py).
+    # Same columns, rows keep their original TransactionID and hashes.
+    # On Postgres this table is range-partitioned by EntryDate.
+    __tablename__ = "TransactionsArchive"
+    TransactionID = Column(Integer, primary_key=True, autoincrement=False)
+    CustomerID = Column(Integer, index=True)
+    Amount = Column(DECIMAL(18, 2))
+    AmountCents = Column(BigInteger, nullable=True)
+    EntryDate = Column(DateTime, index=True)
+    Notes = Column(String, nullable=True)
+    PrevHash = Column(String(64), nullable=True)
+    RowHash = Column(String(64), nullable=True)
+    ArchivedAt = Column(DateTime)
+
+
+class CustomerArchiveTotal(Base):
+    # Running SUM(Amount) of each customer's archived rows, so balances
+    # never have to read the archive
+    __tablename__ = "CustomerArchiveTotals"
+    CustomerID = Column(Integer, ForeignKey("Customers.CustomerID"), primary_key=True)
+    ArchivedAmount = Column(DECIMAL(18, 2), default=0)
+    ArchivedCents = Column(BigInteger, default=0)
+    ArchivedRows = Column(Integer, default=0)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -35,3 +99,53 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_admin = Column(Boolean, default=False)
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    TokenID = Column(String(32), primary_key=True)  # jti, uuid4 hex
+    FamilyID = Column(String(32), index=True)  # one family per login
+    UserID = Column(Integer, ForeignKey("users.id"))
+    CreatedAt = Column(DateTime)
+    ExpiresAt = Column(DateTime)
+    RevokedAt = Column(DateTime, nullable=True, index=True)
+    ReplacedBy = Column(String(32), nullable=True)  # set when rotated
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    JobID = Column(String(32), primary_key=True)  # uuid4 hex
+    Kind = Column(String(50))
+    # queued / running / succeeded / failed / expired
+    Status = Column(String(20), index=True)
+    Progress = Column(Float, default=0.0)
+    Params = Column(Text, nullable=True)  # JSON
+    ResultPath = Column(String(500), nullable=True)
+    Error = Column(String(1000), nullable=True)
+    CreatedBy = Column(Integer, ForeignKey("users.id"))
+    CreatedAt = Column(DateTime)
+    StartedAt = Column(DateTime, nullable=True)
+    FinishedAt = Column(DateTime, nullable=True)
+    HeartbeatAt = Column(DateTime, nullable=True)  # bumped by the worker holding it
+
+
+class ChainCheckpoint(Base):
+    __tablename__ = "ChainCheckpoints"
+
+    CheckpointID = Column(Integer, primary_key=True)
+    LastTransactionID = Column(Integer, index=True)
+    LastHash = Column(String(64))
+    RowsVerified = Column(Integer)
+    VerifiedAt = Column(DateTime)
+
+
+class ChainHead(Base):
+    # One row: the newest chained transaction. Locked by every insert so the
+    # chain can't fork (see ledger_chain.append_transaction)
+    __tablename__ = "ChainHead"
+
+    HeadID = Column(Integer, primary_key=True, autoincrement=False)
+    LastTransactionID = Column(Integer)
+    LastHash = Column(String(64))
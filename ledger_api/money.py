@@ -0,0 +1,212 @@
+"""
+Amounts as integer cents.
+
+Transactions.Amount (DECIMAL(18,2)) stays the amount of record: the hash
+chain and the Azure SQL ledger digests cover it. Every row also stores
+AmountCents (BIGINT), written together with Amount.
+
+AMOUNT_STORAGE picks which column the read paths use:
+
+    decimal  (default) Amount, converted to cents in SQL where needed
+    cents    AmountCents: sums, sorts, reports and JSON serialization run
+             on plain ints and never build Decimal objects
+
+Either way the API contract doesn't change. Amounts go out as "12.50"
+strings, like Pydantic's Decimal, and come in as decimals.
+
+Run `python money.py backfill` after rows were written by code that
+predates AmountCents (e.g. during a rolling deploy). It resumes where it
+stopped.
+
+    cd ledger_api
+    python money.py status
+    python money.py backfill
+"""
+
+import argparse
+import numbers
+import os
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Annotated, Optional, Union
+
+from pydantic import BeforeValidator, PlainSerializer, StrictInt
+from sqlalchemy import BigInteger, and_, cast, column, func, select, table
+from sqlalchemy.orm import Session
+
+# ⚙️ CONFIGURATION
+AMOUNT_STORAGE = os.getenv("AMOUNT_STORAGE", "decimal")
+BACKFILL_BATCH_SIZE = int(os.getenv("CENTS_BACKFILL_BATCH_SIZE", "20000"))
+
+if AMOUNT_STORAGE not in ("decimal", "cents"):
+    raise ValueError(f"Unknown AMOUNT_STORAGE '{AMOUNT_STORAGE}'")
+
+USE_CENTS = AMOUNT_STORAGE == "cents"
+# Attribute the response models read the amount from
+AMOUNT_SOURCE = "AmountCents" if USE_CENTS else "Amount"
+
+_CENT = Decimal("0.01")
+
+
+# ===========================
+# 1. CONVERSIONS (the API edges)
+# ===========================
+
+
+def to_amount(value) -> Optional[Decimal]:
+    """Decimal / str / float -> the DECIMAL(18,2) value we store (half-up)."""
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def to_cents(value) -> Optional[int]:
+    """Decimal / str / float amount -> int cents (half-up). Ints are cents already."""
+    if value is None or isinstance(value, numbers.Integral):
+        return None if value is None else int(value)
+    return int(to_amount(value).scaleb(2))
+
+
+def format_cents(cents: int) -> str:
+    """1250 -> "12.50", -5 -> "-0.05" (same text as a DECIMAL(18,2))."""
+    if cents >= 0:
+        return "%d.%02d" % divmod(cents, 100)
+    return "-%d.%02d" % divmod(-cents, 100)
+
+
+# Response field type: held as int cents, serialized as "12.50". Ints
+# (AmountCents) validate natively; only Decimals go through to_cents.
+Money = Annotated[
+    Union[StrictInt, Annotated[int, BeforeValidator(to_cents)]],
+    PlainSerializer(format_cents, return_type=str, when_used="json"),
+]
+
+
+def cents_column(columns):
+    """
+    SQL expression for an amount in cents, given a table's `.c`:
+    the BIGINT column, or Amount * 100 rounded in SQL.
+    """
+    if USE_CENTS:
+        return columns.AmountCents
+    return cast(func.round(columns.Amount * 100, 0), BigInteger)
+
+
+# ===========================
+# 2. BACKFILL
+# ===========================
+
+# Lightweight table stubs: the migration calls backfill() too, so this
+# must not depend on the current models
+_AMOUNT_TABLES = {
+    "Transactions": "TransactionID",
+    "TransactionsArchive": "TransactionID",
+}
+
+
+def _amount_table(name: str, pk: str, schema: Optional[str]):
+    return table(
+        name, column(pk), column("Amount"), column("AmountCents"), schema=schema
+    )
+
+
+def _schema(db: Session) -> Optional[str]:
+    return "dbo" if db.get_bind().dialect.name == "mssql" else None
+
+
+def backfill(db: Session, batch_size: int = BACKFILL_BATCH_SIZE, progress=print) -> int:
+    """
+    Fill AmountCents where it is NULL, one primary-key range per
+    transaction. Set-based (UPDATE ... SET AmountCents = ROUND(Amount*100)),
+    resumable, and safe to run while the API is writing.
+    """
+    from online_migrations import backfill_batches
+
+    schema = _schema(db)
+    filled = 0
+    for name, pk in _AMOUNT_TABLES.items():
+        t = _amount_table(name, pk, schema)
+        filled += backfill_batches(
+            db,
+            t,
+            pk,
+            {"AmountCents": cast(func.round(t.c.Amount * 100, 0), BigInteger)},
+            where=and_(t.c.AmountCents.is_(None), t.c.Amount.isnot(None)),
+            batch_size=batch_size,
+            progress=progress,
+        )
+
+    totals = table(
+        "CustomerArchiveTotals",
+        column("ArchivedAmount"),
+        column("ArchivedCents"),
+        schema=schema,
+    )
+    db.execute(
+        totals.update()
+        .where(totals.c.ArchivedCents.is_(None))
+        .values(
+            ArchivedCents=cast(
+                func.round(func.coalesce(totals.c.ArchivedAmount, 0) * 100, 0),
+                BigInteger,
+            )
+        )
+    )
+    db.commit()
+    return filled
+
+
+def status(db: Session) -> dict:
+    """Rows still missing AmountCents, and rows where it disagrees with Amount."""
+    schema = _schema(db)
+    out = {}
+    for name, pk in _AMOUNT_TABLES.items():
+        t = _amount_table(name, pk, schema)
+        expected = cast(func.round(t.c.Amount * 100, 0), BigInteger)
+        out[name] = {
+            "missing": db.execute(
+                select(func.count()).where(
+                    t.c.AmountCents.is_(None), t.c.Amount.isnot(None)
+                )
+            ).scalar(),
+            "mismatched": db.execute(
+                select(func.count()).where(t.c.AmountCents != expected)
+            ).scalar(),
+        }
+    return out
+
+
+# ===========================
+# 3. CLI
+# ===========================
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Integer-cents amount column")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="count rows missing / disagreeing")
+    run = sub.add_parser("backfill", help="fill AmountCents in batches")
+    run.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    import database
+
+    db = database.SessionLocal()
+    try:
+        if args.command == "status":
+            print(f"💰 AMOUNT_STORAGE={AMOUNT_STORAGE}")
+            for name, counts in status(db).items():
+                print(
+                    f"   {name}: {counts['missing']:,} missing, "
+                    f"{counts['mismatched']:,} mismatched"
+                )
+        else:
+            filled = backfill(db, batch_size=args.batch_size)
+            print(f"✅ Filled AmountCents on {filled:,} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""
+Migration helpers for big, live tables (Transactions has millions of rows).
+
+    from online_migrations import backfill, create_index_online
+
+    def upgrade():
+        create_index_online(
+            "ix_Transactions_CustomerID_EntryDate",
+            "Transactions",
+            ["CustomerID", "EntryDate"],
+            include=["Amount"],
+        )
+
+create_index_online / drop_index_online
+    MSSQL      WITH (ONLINE = ON). On Azure SQL also RESUMABLE = ON: an
+               interrupted build (or one paused by INDEX_MAX_DURATION_MINUTES)
+               carries on where it stopped the next time the migration runs
+    Postgres   CREATE / DROP INDEX CONCURRENTLY. An invalid index left by a
+               failed build is dropped and rebuilt
+    SQLite     plain CREATE INDEX
+
+backfill
+    UPDATE ... in primary-key ranges, each batch committed on its own, with
+    progress and an ETA. `where` must exclude rows that are already done
+    (e.g. `NewColumn IS NULL`), so running it again resumes instead of
+    starting over.
+
+unestimated_step
+    For work the helpers can't express (values computed in Python,
+    hand-written DDL): `plan` lists it with the table's row count and flags
+    it as not estimated, instead of leaving it out.
+
+The helpers run outside the migration transaction and are safe to re-run.
+Anything else in the same revision (op.add_column, ...) is not, so put
+a long backfill in its own revision after the one that adds the column.
+
+Dry run (executes nothing, apart from one rolled-back sample batch per
+backfill to measure its speed):
+
+    cd ledger_api
+    python online_migrations.py plan          # rows + duration per step
+    python online_migrations.py plan --sql    # ... and the SQL it would run
+"""
+
+import argparse
+import io
+import os
+import time
+from typing import Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import context, op
+
+# ⚙️ CONFIGURATION
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "10000"))
+# Sleep between backfill batches, so app writes and log shipping keep up
+MIGRATION_BATCH_PAUSE_MS = int(os.getenv("MIGRATION_BATCH_PAUSE_MS", "0"))
+# Azure SQL: pause a resumable index build after this long (0 = no limit)
+INDEX_MAX_DURATION_MINUTES = int(os.getenv("INDEX_MAX_DURATION_MINUTES", "0"))
+
+# Dry-run speeds when a step can't be timed on the real table (e.g. the
+# column it fills doesn't exist yet). Rough, tune per database tier.
+ESTIMATE_BACKFILL_ROWS_PER_SECOND = int(
+    os.getenv("ESTIMATE_BACKFILL_ROWS_PER_SECOND", "20000")
+)
+ESTIMATE_INDEX_ROWS_PER_SECOND = int(
+    os.getenv("ESTIMATE_INDEX_ROWS_PER_SECOND", "200000")
+)
+ESTIMATE_SAMPLE_ROWS = 1000
+
+# SERVERPROPERTY('EngineEdition'): 3 Enterprise/Developer, 5 Azure SQL
+# Database, 8 Azure SQL Managed Instance
+_MSSQL_ONLINE_EDITIONS = (3, 5, 8)
+_MSSQL_RESUMABLE_EDITIONS = (5, 8)
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+# ===========================
+# 1. BATCHED BACKFILL (plain SQLAlchemy, also used outside Alembic)
+# ===========================
+
+
+def backfill_batches(
+    bind,
+    table,
+    pk: str,
+    values: dict,
+    where=None,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    progress=print,
+    commit: bool = True,
+) -> int:
+    """
+    UPDATE `table` SET `values` in ranges of the integer primary key `pk`,
+    committing each range. `bind` is a Connection or Session (commit=False
+    if it is in autocommit mode already). Starts at the lowest key still
+    matching `where`. Returns the number of rows updated.
+    """
+    key = table.c[pk]
+    pending = [] if where is None else [where]
+    lo = bind.execute(sa.select(sa.func.min(key)).where(*pending)).scalar()
+    hi = bind.execute(sa.select(sa.func.max(key))).scalar()
+    if lo is None:
+        return 0
+
+    span = hi - lo + 1
+    updated = 0
+    started = time.perf_counter()
+    for start in range(lo, hi + 1, batch_size):
+        result = bind.execute(
+            table.update()
+            .where(key >= start, key < start + batch_size, *pending)
+            .values(values)
+        )
+        if commit:
+            bind.commit()
+        updated += max(result.rowcount, 0)
+
+        done = min(start + batch_size, hi + 1) - lo
+        left = (time.perf_counter() - started) / done * (span - done)
+        progress(
+            f"   ...{table.name}: {done:,}/{span:,} ids ({done / span:.0%}), "
+            f"{updated:,} rows updated, ~{_duration(left)} left"
+        )
+        if MIGRATION_BATCH_PAUSE_MS:
+            time.sleep(MIGRATION_BATCH_PAUSE_MS / 1000)
+    return updated
+
+
+# ===========================
+# 2. DRY-RUN ESTIMATES
+# ===========================
+
+
+def _dry_run() -> bool:
+    return context.is_offline_mode() and context.config.attributes.get("dry_run")
+
+
+def _record(step: str, rows: Optional[int], seconds: Optional[float], note: str = ""):
+    context.config.attributes.setdefault("estimates", []).append(
+        {"step": step, "rows": rows, "seconds": seconds, "note": note}
+    )
+
+
+def _qualified(table_name: str, schema: Optional[str]) -> str:
+    return f"{schema}.{table_name}" if schema else table_name
+
+
+def estimate_rows(conn, table_name: str, schema: Optional[str] = None):
+    """Row count from catalog statistics (exact COUNT on SQLite); None if no table."""
+    name = _qualified(table_name, schema)
+    dialect = conn.engine.name
+    if dialect == "mssql":
+        sql = (
+            "SELECT SUM(row_count) FROM sys.dm_db_partition_stats "
+            "WHERE object_id = OBJECT_ID(:t) AND index_id IN (0, 1)"
+        )
+    elif dialect == "postgresql":
+        sql = "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass(:t)"
+    else:
+        if not sa.inspect(conn).has_table(table_name, schema=schema):
+            return None
+        return conn.execute(
+            sa.select(sa.func.count()).select_from(sa.table(name))
+        ).scalar()
+    return conn.execute(sa.text(sql), {"t": name}).scalar()
+
+
+def _timed_sample(conn, statement) -> Optional[float]:
+    """Seconds to run `statement` in a transaction that is rolled back."""
+    conn.rollback()
+    try:
+        started = time.perf_counter()
+        conn.execute(statement)
+        return time.perf_counter() - started
+    except sa.exc.DBAPIError:
+        return None  # schema not there yet (added earlier in the same plan)
+    finally:
+        conn.rollback()
+
+
+def _estimate_backfill(conn, table, pk, values, where, batch_size):
+    step = f"backfill {table.name} ({', '.join(values)})"
+    key = table.c[pk]
+    pending = [] if where is None else [where]
+    try:
+        rows, lo = conn.execute(
+            sa.select(sa.func.count(), sa.func.min(key)).where(*pending)
+        ).one()
+    except sa.exc.DBAPIError:
+        # The column doesn't exist yet, so every row needs filling
+        conn.rollback()
+        rows = estimate_rows(conn, table.name, table.schema)
+        lo = conn.execute(sa.select(sa.func.min(key))).scalar() if rows else None
+    if not rows:
+        _record(step, rows, 0)
+        return
+
+    sample = table.update().where(key >= lo, key < lo + ESTIMATE_SAMPLE_ROWS)
+    if where is not None:
+        sample = sample.where(where)
+    elapsed = _timed_sample(conn, sample.values(values))
+    if elapsed:
+        rate, note = ESTIMATE_SAMPLE_ROWS / elapsed, "timed on a sample"
+    else:
+        rate, note = ESTIMATE_BACKFILL_ROWS_PER_SECOND, "assumed speed"
+    pauses = rows / batch_size * MIGRATION_BATCH_PAUSE_MS / 1000
+    _record(step, rows, rows / rate + pauses, f"{note}, {rate:,.0f} rows/s")
+
+
+def _estimate_index(conn, name, table_name, columns, schema):
+    step = f"create index {name} on {table_name}"
+    rows = estimate_rows(conn, table_name, schema)
+    if not rows:
+        _record(step, rows, 0)
+        return
+    # Reading + sorting the key columns is most of an index build
+    t = sa.table(table_name, *(sa.column(c) for c in columns), schema=schema)
+    cols = [t.c[c] for c in columns]
+    limit = min(rows, 100_000)
+    elapsed = _timed_sample(conn, sa.select(*cols).order_by(*cols).limit(limit))
+    if elapsed:
+        rate, note = limit / elapsed, "timed on a sorted sample"
+    else:
+        rate, note = ESTIMATE_INDEX_ROWS_PER_SECOND, "assumed speed"
+    _record(step, rows, rows / rate, f"{note}, {rate:,.0f} rows/s")
+
+
+# ===========================
+# 3. ALEMBIC OPERATIONS
+# ===========================
+
+
+def backfill(
+    table,
+    pk: str,
+    values: dict,
+    where=None,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+):
+    """
+    Batched, resumable UPDATE for use inside a migration. `table` is a
+    lightweight `sa.table(...)` stub (not the model) and `values` /
+    `where` are expressions on it.
+    """
+    if _dry_run():
+        conn = context.config.attributes["estimate_conn"]
+        _estimate_backfill(conn, table, pk, values, where, batch_size)
+        return
+    if context.is_offline_mode():
+        print(f"-- NOTE: backfill of {table.name} is not rendered in offline mode.")
+        return
+    with op.get_context().autocommit_block():
+        # Every UPDATE commits on its own in here
+        updated = backfill_batches(
+            op.get_bind(), table, pk, values, where, batch_size=batch_size, commit=False
+        )
+    print(f"   ✅ {table.name}: {updated:,} rows updated")
+
+
+def unestimated_step(step: str, table_name: str, schema: Optional[str] = None):
+    """Tell `plan` about a step it can't time (a no-op outside the dry run)."""
+    if _dry_run():
+        conn = context.config.attributes["estimate_conn"]
+        _record(step, estimate_rows(conn, table_name, schema), None)
+
+
+def _mssql_edition(bind) -> int:
+    return bind.execute(
+        sa.text("SELECT CAST(SERVERPROPERTY('EngineEdition') AS INT)")
+    ).scalar()
+
+
+def _mssql_index_state(bind, name: str, table_name: str, schema: Optional[str]):
+    """'PAUSED' / 'RUNNING' for a resumable build, 'EXISTS', or None."""
+    params = {"n": name, "t": _qualified(table_name, schema)}
+    state = bind.execute(
+        sa.text(
+            "SELECT state_desc FROM sys.index_resumable_operations "
+            "WHERE name = :n AND object_id = OBJECT_ID(:t)"
+        ),
+        params,
+    ).scalar()
+    if state:
+        return state
+    exists = bind.execute(
+        sa.text(
+            "SELECT 1 FROM sys.indexes WHERE name = :n AND object_id = OBJECT_ID(:t)"
+        ),
+        params,
+    ).scalar()
+    return "EXISTS" if exists else None
+
+
+def _create_index_mssql(
+    name, table_name, columns, schema, unique, include, where, online, resumable
+):
+    q = op.get_context().dialect.identifier_preparer.quote
+    target = f"{q(schema)}.{q(table_name)}" if schema else q(table_name)
+    sql = (
+        f"CREATE {'UNIQUE ' if unique else ''}NONCLUSTERED INDEX {q(name)} "
+        f"ON {target} ({', '.join(q(c) for c in columns)})"
+    )
+    if include:
+        sql += f" INCLUDE ({', '.join(q(c) for c in include)})"
+    if where:
+        sql += f" WHERE {where}"
+
+    options = ["ONLINE = ON"] if online else []
+    if resumable:
+        options.append("RESUMABLE = ON")
+        if INDEX_MAX_DURATION_MINUTES:
+            options.append(f"MAX_DURATION = {INDEX_MAX_DURATION_MINUTES} MINUTES")
+    if options:
+        sql += f" WITH ({', '.join(options)})"
+    op.execute(sql)
+
+
+def create_index_online(
+    name: str,
+    table_name: str,
+    columns: Sequence[str],
+    schema: Optional[str] = None,
+    unique: bool = False,
+    include: Sequence[str] = (),
+    where: Optional[str] = None,
+):
+    """
+    Build an index without blocking writes to the table. `include` adds
+    covering columns (MSSQL / Postgres), `where` makes it filtered/partial.
+    """
+    bind = op.get_bind()
+    dialect = bind.engine.name
+    if dialect == "mssql" and schema is None:
+        schema = "dbo"
+    if _dry_run():
+        conn = context.config.attributes["estimate_conn"]
+        _estimate_index(conn, name, table_name, columns, schema)
+
+    if dialect == "mssql":
+        if context.is_offline_mode():
+            _create_index_mssql(
+                name, table_name, columns, schema, unique, include, where, True, False
+            )
+            return
+        edition = _mssql_edition(bind)
+        online = edition in _MSSQL_ONLINE_EDITIONS
+        resumable = edition in _MSSQL_RESUMABLE_EDITIONS
+        if not online:
+            print(
+                f"⚠️  This SQL Server edition can't build {name} online: it will lock {table_name}."
+            )
+
+        with op.get_context().autocommit_block():
+            state = _mssql_index_state(bind, name, table_name, schema)
+            if state == "EXISTS":
+                return
+            if state == "PAUSED":
+                print(f"   ↪️  Resuming paused build of {name}")
+                op.execute(f"ALTER INDEX [{name}] ON [{schema}].[{table_name}] RESUME")
+            elif state is None:
+                _create_index_mssql(
+                    name,
+                    table_name,
+                    columns,
+                    schema,
+                    unique,
+                    include,
+                    where,
+                    online,
+                    resumable,
+                )
+            else:
+                raise RuntimeError(f"Index {name} is being built by another session")
+            if _mssql_index_state(bind, name, table_name, schema) == "PAUSED":
+                raise RuntimeError(
+                    f"Build of {name} paused after {INDEX_MAX_DURATION_MINUTES} "
+                    "minutes. Run the migration again to resume it."
+                )
+        return
+
+    kwargs = {}
+    if where:
+        kwargs[f"{dialect}_where"] = sa.text(where)
+    if dialect == "postgresql":
+        if include:
+            kwargs["postgresql_include"] = list(include)
+        with op.get_context().autocommit_block():
+            if not context.is_offline_mode():
+                invalid = bind.execute(
+                    sa.text(
+                        "SELECT NOT i.indisvalid FROM pg_index i "
+                        "JOIN pg_class c ON c.oid = i.indexrelid "
+                        "WHERE c.relname = :n"
+                    ),
+                    {"n": name},
+                ).scalar()
+                if invalid:
+                    print(f"   🧹 Dropping invalid index {name} from an earlier run")
+                    op.drop_index(
+                        name,
+                        table_name=table_name,
+                        schema=schema,
+                        postgresql_concurrently=True,
+                    )
+            op.create_index(
+                name,
+                table_name,
+                list(columns),
+                schema=schema,
+                unique=unique,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                **kwargs,
+            )
+        return
+
+    op.create_index(
+        name,
+        table_name,
+        list(columns),
+        schema=schema,
+        unique=unique,
+        if_not_exists=True,
+        **kwargs,
+    )
+
+
+def drop_index_online(name: str, table_name: str, schema: Optional[str] = None):
+    """Drop an index without blocking the table (a no-op if it's gone)."""
+    dialect = op.get_bind().engine.name
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(
+                name,
+                table_name=table_name,
+                schema=schema,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
+        return
+    if dialect == "mssql" and schema is None:
+        schema = "dbo"
+    # MSSQL: dropping a nonclustered index is a metadata change
+    op.drop_index(name, table_name=table_name, schema=schema, if_exists=True)
+
+
+# ===========================
+# 4. CLI (dry run)
+# ===========================
+
+
+def plan(show_sql: bool = False):
+    from alembic import command
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    import database
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    sql = io.StringIO()
+    cfg = Config(os.path.join(here, "alembic.ini"), output_buffer=sql)
+    head = ScriptDirectory.from_config(cfg).get_current_head()
+
+    with database.get_engine().connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+        conn.rollback()
+        if current == head:
+            print(f"✅ Database is at head ({head}), nothing to migrate.")
+            return
+        cfg.attributes["dry_run"] = True
+        cfg.attributes["estimate_conn"] = conn
+        command.upgrade(cfg, f"{current}:head" if current else "head", sql=True)
+
+    if show_sql:
+        print(sql.getvalue())
+
+    estimates = cfg.attributes.get("estimates", [])
+    print(f"📋 {current or 'empty database'} -> {head}")
+    if not estimates:
+        print("   No index builds or backfills (schema changes only).")
+    for e in estimates:
+        rows = "no table yet" if e["rows"] is None else f"{e['rows']:,} rows"
+        note = f"  ({e['note']})" if e["note"] else ""
+        took = (
+            "⚠️  not estimated"
+            if e["seconds"] is None
+            else f"~{_duration(e['seconds'])}"
+        )
+        print(f"   {e['step']}: {rows}, {took}{note}")
+    total = sum(e["seconds"] for e in estimates if e["seconds"] is not None)
+    unknown = sum(e["seconds"] is None for e in estimates)
+    extra = f", plus {unknown} step(s) not estimated" if unknown else ""
+    print(f"   Estimated total: ~{_duration(total)}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online migration helpers")
+    sub = parser.add_subparsers(dest="command", required=True)
+    dry = sub.add_parser("plan", help="estimate pending migrations (dry run)")
+    dry.add_argument("--sql", action="store_true", help="also print the SQL")
+    args = parser.parse_args()
+    plan(show_sql=args.sql)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+On-demand per-request profiling.
+
+Off unless PROFILING_ENABLED=1 (Settings.profiling, decided per app in
+create_app). When off, nothing is installed: no middleware, no SQL hooks.
+Routes are always ProfiledRoutes, which then cost one ContextVar lookup.
+
+When on, a request is profiled if either
+    * an admin sends `X-Profile: cprofile` or `X-Profile: sample`, or
+    * it is picked by PROFILE_SAMPLE_RATE (0.0-1.0, sampling profiler)
+and the handler runs under:
+
+    cprofile   deterministic, every call. Download as .prof (pstats,
+               snakeviz, `python -m pstats`). Slows the request down.
+    sample     a side thread grabs the handler's stack every
+               PROFILE_INTERVAL_MS. Download as speedscope JSON
+               (https://www.speedscope.app). Cheap enough for production.
+
+Every SQL statement the request issues is recorded with its duration.
+The response carries `X-Profile-Id`; admins list and download profiles at
+/admin/profiles.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import functools
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi.routing import APIRoute
+
+# ⚙️ CONFIGURATION
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+
+HEADER = "X-Profile"
+MODES = ("cprofile", "sample")
+# Per-statement SQL text is cut here so a huge IN (...) doesn't bloat the file
+MAX_SQL_CHARS = 2000
+
+
+# ===========================
+# 1. PER-REQUEST STATE
+# ===========================
+
+
+class ProfileRequest:
+    """Set by the middleware, approved by get_current_user, run by the route."""
+
+    def __init__(self, mode: str, requested_by_header: bool):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.requested_by_header = requested_by_header
+        self.allowed = False
+        self.active = False
+        self.user = None
+        self.statements: List[dict] = []
+        self.handler_seconds = 0.0
+        self.profiler = None  # cProfile.Profile or StackSampler
+
+
+_current: contextvars.ContextVar[Optional[ProfileRequest]] = contextvars.ContextVar(
+    "ledger_profile", default=None
+)
+
+
+def authorize(user):
+    """
+    Called from get_current_user. Header-triggered profiles need an admin;
+    sampled ones profile whoever is calling.
+    """
+    req = _current.get()
+    if req is None:
+        return
+    req.user = user.email
+    req.allowed = user.is_admin or not req.requested_by_header
+
+
+# ===========================
+# 2. PROFILERS
+# ===========================
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval_ms: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.samples = []  # root-first tuples of (name, file, line)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.samples.append(tuple(reversed(stack)))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def to_speedscope(self, name: str) -> dict:
+        frames, index = [], {}
+        samples = []
+        for stack in self.samples:
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append(
+                        {"name": frame[0], "file": frame[1], "line": frame[2]}
+                    )
+                ids.append(index[frame])
+            samples.append(ids)
+        interval_ms = self.interval * 1000
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": len(samples) * interval_ms,
+                    "samples": samples,
+                    "weights": [interval_ms] * len(samples),
+                }
+            ],
+            "name": name,
+            "exporter": "ledger_api",
+        }
+
+
+# Python 3.12+ allows one active cProfile per interpreter; the rest sample
+_cprofile_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _profiling(req: ProfileRequest):
+    """Profile the current thread (the one running the handler)."""
+    if req.mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+        req.mode = "sample"
+    if req.mode == "cprofile":
+        req.profiler = cProfile.Profile()
+    else:
+        req.profiler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS)
+
+    req.active = True
+    started = time.perf_counter()
+    if req.mode == "cprofile":
+        req.profiler.enable()
+    else:
+        req.profiler.start()
+    try:
+        yield
+    finally:
+        if req.mode == "cprofile":
+            req.profiler.disable()
+            _cprofile_lock.release()
+        else:
+            req.profiler.stop()
+        req.handler_seconds = time.perf_counter() - started
+        req.active = False
+
+
+def _profiled(endpoint):
+    """Wrap a route handler; costs one ContextVar lookup when not profiling."""
+    if getattr(endpoint, "_profiled", False):
+        return endpoint  # include_router re-creates routes from wrapped endpoints
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            req = _current.get()
+            if req is None or not req.allowed:
+                return await endpoint(*args, **kwargs)
+            # Runs on the event loop thread, so other coroutines may show up too
+            with _profiling(req):
+                return await endpoint(*args, **kwargs)
+
+        async_wrapper._profiled = True
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        req = _current.get()
+        if req is None or not req.allowed:
+            return endpoint(*args, **kwargs)
+        with _profiling(req):
+            return endpoint(*args, **kwargs)
+
+    wrapper._profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+
+# ===========================
+# 3. SQL CAPTURE
+# ===========================
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    req = _current.get()
+    if req is not None and req.active:
+        conn.info.setdefault("ledger_profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    req = _current.get()
+    if req is None or not req.active:
+        return
+    started = conn.info.get("ledger_profile_started")
+    if not started:
+        return
+    req.statements.append(
+        {
+            "sql": statement[:MAX_SQL_CHARS],
+            "ms": round((time.perf_counter() - started.pop()) * 1000, 3),
+            "rows": cursor.rowcount,
+            "executemany": executemany,
+        }
+    )
+
+
+def _install_sql_hooks():
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ===========================
+# 4. MIDDLEWARE & STORAGE
+# ===========================
+
+
+def _pick_mode(request) -> Optional[tuple]:
+    header = request.headers.get(HEADER)
+    if header:
+        mode = header.strip().lower()
+        return (mode if mode in MODES else "cprofile"), True
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample", False
+    return None
+
+
+def install(app, enabled: bool):
+    """Add the profiling middleware + SQL hooks (only if enabled)."""
+    if not enabled:
+        return
+    _install_sql_hooks()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    print(f"🔬 Profiling enabled (sample rate {PROFILE_SAMPLE_RATE:.1%})")
+
+    @app.middleware("http")
+    async def profile_request(request, call_next):
+        picked = _pick_mode(request)
+        if picked is None:
+            return await call_next(request)
+
+        req = ProfileRequest(*picked)
+        token = _current.set(req)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _current.reset(token)
+        if req.profiler is not None:
+            save(req, request, response.status_code, time.perf_counter() - started)
+            response.headers["X-Profile-Id"] = req.id
+        return response
+
+
+def _paths(profile_id: str) -> dict:
+    base = os.path.join(PROFILE_DIR, profile_id)
+    return {
+        "meta": base + ".json",
+        "cprofile": base + ".prof",
+        "sample": base + ".speedscope.json",
+    }
+
+
+def save(req: ProfileRequest, request, status_code: int, total_seconds: float):
+    paths = _paths(req.id)
+    name = f"{request.method} {request.url.path}"
+    if req.mode == "cprofile":
+        req.profiler.dump_stats(paths["cprofile"])
+    else:
+        with open(paths["sample"], "w") as f:
+            json.dump(req.profiler.to_speedscope(name), f)
+
+    meta = {
+        "id": req.id,
+        "mode": req.mode,
+        "method": request.method,
+        "path": request.url.path,
+        "query": request.url.query,
+        "status_code": status_code,
+        "user": req.user,
+        "trigger": "header" if req.requested_by_header else "sampled",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "total_ms": round(total_seconds * 1000, 3),
+        "handler_ms": round(req.handler_seconds * 1000, 3),
+        "sql_count": len(req.statements),
+        "sql_ms": round(sum(s["ms"] for s in req.statements), 3),
+        "statements": req.statements,
+    }
+    with open(paths["meta"], "w") as f:
+        json.dump(meta, f)
+    _prune()
+
+
+def _prune():
+    metas = sorted(
+        (
+            e
+            for e in os.scandir(PROFILE_DIR)
+            if e.name.endswith(".json") and e.name.count(".") == 1
+        ),
+        key=lambda e: e.stat().st_mtime,
+    )
+    for entry in metas[: max(len(metas) - PROFILE_KEEP, 0)]:
+        for path in _paths(entry.name[: -len(".json")]).values():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_profiles() -> List[dict]:
+    """Newest first, without the statement lists."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    out = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.name.endswith(".json") and entry.name.count(".") == 1:
+            with open(entry.path) as f:
+                meta = json.load(f)
+            meta.pop("statements", None)
+            out.append(meta)
+    return sorted(out, key=lambda m: m["created_at"], reverse=True)
+
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    if not profile_id.isalnum():
+        return None
+    path = _paths(profile_id)["meta"]
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def profile_file(meta: dict) -> str:
+    return _paths(meta["id"])[meta["mode"]]
@@ -0,0 +1,365 @@
+"""
+SQL budget check for the API routes.
+
+Calls every route against a seeded SQLite database, records each SQL
+statement it issues together with its EXPLAIN QUERY PLAN, and fails when
+a route
+    * issues more statements than its budget plus BUDGET_SLACK (an N+1
+      loop, a lost joinedload, ...), or
+    * scans a whole table that isn't in its `allow_scans` (a filter that
+      stopped using its index)
+Scans of an index (`SCAN ... USING INDEX`) don't count as full scans.
+
+    cd ledger_api
+    python query_budget.py                       # exit 1 on any regression
+    python query_budget.py -v                    # + each statement and plan
+    python query_budget.py --route transactions  # only matching routes
+    python query_budget.py --report query_report.json
+    python query_budget.py --strict              # no slack: exact counts
+
+Counts are taken in steady state: each route is called once to warm up
+(revocation sync, lazy imports), then measured. The result cache, admission
+control and profiling are switched off.
+
+Budgets are the exact counts each route issues today, so any drift shows
+up (⚠️) in the output and the report. A route only fails once it goes
+more than BUDGET_SLACK statements over. One statement of headroom absorbs
+incidental changes, like a SQLAlchemy upgrade that splits a statement. An
+N+1 adds a statement per row and still fails. If a change adds a query
+on purpose, raise the route's budget in the same commit.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "ledger_query_budget.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "query-budget")
+os.environ["CACHE_BACKEND"] = "none"
+os.environ["ADMISSION_ENABLED"] = "0"
+os.environ["PROFILING_ENABLED"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+import archive  # noqa: E402
+import auth  # noqa: E402
+import customer_upsert  # noqa: E402
+import database  # noqa: E402
+import main as api  # noqa: E402
+import models  # noqa: E402
+
+# ⚙️ CONFIGURATION
+SEED_CUSTOMERS = 300
+SEED_TRANSACTIONS = 6000
+ADMIN = "budget@example.com"
+PASSWORD = "budget-password"
+BUDGET_SLACK = int(os.getenv("QUERY_BUDGET_SLACK", "1"))  # statements over budget
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class Route:
+    method: str
+    path: str
+    budget: int  # statements per request today, including auth
+    allow_scans: Tuple[str, ...] = ()
+    body: Optional[Callable[[], dict]] = None  # fresh JSON per call
+    form: Optional[dict] = None
+    authenticated: bool = True
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+def _new_customer() -> dict:
+    n = next(_ids)
+    return {"CustomerName": f"Budget {n}", "Email": f"budget{n}@example.com"}
+
+
+def _new_transaction() -> dict:
+    return {"CustomerID": 7, "Amount": "12.50", "EntryDate": datetime.now().isoformat()}
+
+
+# Every authenticated request also pays for get_current_user (1 statement).
+# allow_scans are for tables SQLite rightly scans at the seed's size.
+ROUTES: List[Route] = [
+    # user lookup, refresh token insert, user reload after commit
+    Route(
+        "POST",
+        "/token",
+        3,
+        form={"username": ADMIN, "password": PASSWORD},
+        authenticated=False,
+    ),
+    Route("GET", "/admin/users", 2, allow_scans=("users",)),
+    # customers, then all transactions (hot UNION archive) in one pass
+    Route(
+        "GET",
+        "/customers/",
+        3,
+        allow_scans=("Customers", "Transactions", "TransactionsArchive"),
+    ),
+    # matching customers (ILIKE '%...%' can't use an index), one grouped SUM
+    # of their recent transactions, their archived totals
+    Route(
+        "GET",
+        "/customers/search/?query=Customer 1",
+        4,
+        allow_scans=("Customers", "CustomerArchiveTotals"),
+    ),
+    # dedupe lookup, insert, reload, transactions for the response
+    Route("POST", "/customers/", 5, body=_new_customer),
+    Route("PUT", "/customers/7", 5, body=_new_customer),
+    # customer check, lock + read the chain head, next ID, insert, move the
+    # head, reload
+    Route("POST", "/transactions/", 7, body=_new_transaction),
+    # Paged tables: the first page also COUNTs the matches; OFFSET walks the
+    # customers in ID order; small pages of balances
+    Route(
+        "GET",
+        "/customers/page/?q=customer1",
+        5,
+        allow_scans=("Customers", "CustomerArchiveTotals"),
+    ),
+    Route("GET", "/customers/page/?offset=100&limit=50", 4, allow_scans=("Customers",)),
+    Route("GET", "/transactions/?customer_id=7", 3),
+    # Without STAT4 histograms SQLite can't cost a date range and walks
+    # Transactions in TransactionID order to skip the sort
+    Route("GET", "/transactions/?start={recent}", 3, allow_scans=("Transactions",)),
+    Route("GET", "/transactions/?start={old}&customer_id=7", 3),
+    Route(
+        "GET",
+        "/transactions/page/?q=Customer 7",
+        4,
+        allow_scans=("Transactions", "TransactionsArchive"),
+    ),
+    Route("GET", "/transactions/page/?offset=200&limit=100", 3),
+    Route("GET", "/transactions/page/?customer_id=7&limit=50", 4),
+    Route("GET", "/transactions/summary/", 5, allow_scans=("CustomerArchiveTotals",)),
+    Route("GET", "/reports/aging", 3),
+    Route("GET", "/reports/statements", 3),
+    Route("GET", "/reports/statements/7", 4),
+    # Offline cache: a delta walks the TransactionID / UpdatedAt indexes (every
+    # seeded customer changed {recent}, so the archive totals are scanned)
+    Route("GET", "/sync/?limit=500", 5, allow_scans=("CustomerArchiveTotals",)),
+    Route(
+        "GET",
+        "/sync/?after_tx=5990&customers_since={recent}",
+        5,
+        allow_scans=("CustomerArchiveTotals",),
+    ),
+    Route("GET", "/jobs/", 2, allow_scans=("jobs",)),  # empty in the seed
+]
+
+
+# ===========================
+# 1. SEED
+# ===========================
+
+
+def seed():
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    models.Base.metadata.create_all(database.engine)
+
+    db = database.SessionLocal()
+    try:
+        db.add(
+            models.User(
+                email=ADMIN,
+                hashed_password=auth.get_password_hash(PASSWORD),
+                is_admin=True,
+            )
+        )
+        customer_upsert.upsert_customers(
+            db,
+            (
+                {
+                    "CustomerName": f"Customer {i}",
+                    "Email": f"customer{i}@example.com",
+                    "PhoneNumber": f"555-{i:07d}",
+                    "HomeAddress": f"{i} Main St",
+                }
+                for i in range(1, SEED_CUSTOMERS + 1)
+            ),
+        )
+        # Two years of history; the older half goes to the archive
+        now = datetime.now()
+        rows = []
+        for i in range(SEED_TRANSACTIONS):
+            cents = (i * 7919) % 500_000 - 100_000
+            rows.append(
+                {
+                    "CustomerID": i % SEED_CUSTOMERS + 1,
+                    "Amount": cents / 100,
+                    "AmountCents": cents,
+                    "EntryDate": now - timedelta(days=730 * i / SEED_TRANSACTIONS),
+                }
+            )
+        db.execute(insert(models.Transaction), rows)
+        db.commit()
+        archive.archive_transactions(
+            db, before=now - timedelta(days=365), progress=lambda *_: None
+        )
+    finally:
+        db.close()
+    # Planner statistics, like a production database has; without them
+    # SQLite guesses and the plans differ from what users get
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+# ===========================
+# 2. CAPTURE & EXPLAIN
+# ===========================
+
+_captured: Optional[list] = None
+
+_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if _captured is not None:
+        _captured.append((statement, parameters, executemany))
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    if (
+        not statement.lstrip()
+        .upper()
+        .startswith(("SELECT", "WITH", "UPDATE", "DELETE"))
+    ):
+        return []
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return [row[3] for row in rows]
+
+
+def full_scans(plan: List[str], tables: set) -> List[str]:
+    """Base tables read start to finish without an index."""
+    out = []
+    for step in plan:
+        match = _SCAN.match(step)
+        if match and match.group(1).lower() in tables:
+            out.append(match.group(1))
+    return out
+
+
+# ===========================
+# 3. RUN
+# ===========================
+
+
+def _request(client: TestClient, route: Route, headers: dict, path: str):
+    kwargs = {"headers": headers if route.authenticated else {}}
+    if route.body is not None:
+        kwargs["json"] = route.body()
+    if route.form is not None:
+        kwargs["data"] = route.form
+    return client.request(route.method, path, **kwargs)
+
+
+def check(client, route: Route, headers: dict, tables: set, slack: int) -> dict:
+    global _captured
+    now = datetime.now()
+    path = route.path.format(
+        recent=(now - timedelta(days=30)).isoformat(timespec="seconds"),
+        old=(now - timedelta(days=500)).isoformat(timespec="seconds"),
+    )
+    _request(client, route, headers, path)  # warm-up
+
+    _captured = []
+    response = _request(client, route, headers, path)
+    captured, _captured = _captured, None
+
+    statements, scans = [], []
+    with database.engine.connect() as conn:
+        for statement, parameters, executemany in captured:
+            plan = [] if executemany else explain(conn, statement, parameters)
+            found = full_scans(plan, tables)
+            scans += [t for t in found if t not in route.allow_scans]
+            statements.append({"sql": statement, "plan": plan, "full_scans": found})
+
+    problems, warnings = [], []
+    if response.status_code >= 400:
+        problems.append(f"HTTP {response.status_code}")
+    if len(statements) > route.budget + slack:
+        problems.append(f"{len(statements)} statements > budget {route.budget}")
+    elif len(statements) > route.budget:
+        warnings.append(f"over budget {route.budget}, within slack of {slack}")
+    if scans:
+        problems.append(f"full scan of {', '.join(sorted(set(scans)))}")
+    return {
+        "route": route.name,
+        "status_code": response.status_code,
+        "budget": route.budget,
+        "statement_count": len(statements),
+        "statements": statements,
+        "problems": problems,
+        "warnings": warnings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL budget check for the API")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument("--route", help="only routes containing this text")
+    parser.add_argument("--report", help="write every statement + plan as JSON")
+    parser.add_argument("--strict", action="store_true", help="no slack")
+    args = parser.parse_args()
+    slack = 0 if args.strict else BUDGET_SLACK
+
+    print("🌱 Seeding SQLite...")
+    seed()
+    # On the class: create_app() replaces the engine
+    event.listen(Engine, "before_cursor_execute", _capture)
+    tables = {name.lower() for name in models.Base.metadata.tables}
+
+    client = TestClient(api.create_app())
+    token = client.post("/token", data={"username": ADMIN, "password": PASSWORD})
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+    results = []
+    for route in ROUTES:
+        if args.route and args.route not in route.name:
+            continue
+        result = check(client, route, headers, tables, slack)
+        results.append(result)
+        mark = "❌" if result["problems"] else "⚠️ " if result["warnings"] else "✅"
+        print(
+            f"{mark} {route.name:<48} {result['statement_count']:>2}/{route.budget} "
+            f"statements  {'; '.join(result['problems'] + result['warnings'])}"
+        )
+        if args.verbose or result["problems"]:
+            for s in result["statements"]:
+                print(f"     {' '.join(s['sql'].split())[:150]}")
+                for step in s["plan"]:
+                    print(f"        {'⚠️ ' if step.startswith('SCAN') else ''}{step}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📝 Wrote {args.report}")
+
+    database.engine.dispose()
+    os.remove(DB_PATH)
+    failed = [r for r in results if r["problems"]]
+    if failed:
+        print(f"\n❌ {len(failed)} route(s) over budget")
+        sys.exit(1)
+    print(f"\n✅ All {len(results)} routes within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Refresh tokens with rotation and server-side revocation.
+
+/token runs Argon2 once and hands out a short-lived access token plus a
+refresh token. When the access token expires the client calls
+/token/refresh, which costs an HMAC check and one indexed UPDATE instead of
+a password hash.
+
+Rotation: every refresh token is single-use. Using it marks the row as
+replaced and issues a new one in the same *family* (one family per login).
+If an already-replaced token shows up again it has been copied, so the
+whole family is revoked and that session has to log in again. The one
+exception is a replay within REFRESH_REUSE_GRACE_SECONDS while the
+successor is still unused (several tabs refreshing at once): that caller
+gets the same successor token instead.
+
+Revoked families are also kept in memory (RevocationStore) so
+get_current_user can reject access tokens from a logged-out session with a
+dict lookup. Each worker re-syncs from the database every
+REVOCATION_SYNC_SECONDS, which bounds how long another worker may still
+accept them.
+
+    cd ledger_api
+    python refresh_tokens.py purge      # delete expired rows
+"""
+
+import argparse
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+import auth
+import models
+
+# ⚙️ CONFIGURATION
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+REVOCATION_SYNC_SECONDS = int(os.getenv("REVOCATION_SYNC_SECONDS", "30"))
+# RevokedAt is stamped before the revoking transaction commits, so a row can
+# show up after a sync has already moved past its timestamp: look back this far
+REVOCATION_SYNC_OVERLAP_SECONDS = int(
+    os.getenv("REVOCATION_SYNC_OVERLAP_SECONDS", "60")
+)
+# Two tabs refreshing with the same token at once isn't theft: for this long
+# after a rotation, the old token gets the (still unused) successor back
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "10"))
+
+REFRESH_TYPE = "refresh"
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def _utcnow() -> datetime:
+    # Stored naive (UTC), like the rest of the DateTime columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ===========================
+# 1. IN-MEMORY REVOCATION STORE
+# ===========================
+
+
+class RevocationStore:
+    """Revoked family ids -> when they can be forgotten. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+        self._synced_until = None  # RevokedAt high-water mark
+        self._next_sync = 0.0
+
+    def add(self, family: str, forget_after: datetime):
+        with self._lock:
+            self._families[family] = forget_after
+
+    def is_revoked(self, family: Optional[str]) -> bool:
+        return family is not None and family in self._families
+
+    def sync(self, db: Session, force: bool = False):
+        """Pull families revoked (by any worker) since the last sync."""
+        if not force and time.monotonic() < self._next_sync:
+            return
+        RT = models.RefreshToken
+        now = _utcnow()
+        query = db.query(RT.FamilyID, func.max(RT.ExpiresAt)).filter(
+            RT.RevokedAt.isnot(None),
+            RT.ReplacedBy.is_(None),  # rotated rows don't revoke their family
+            RT.ExpiresAt > now,
+        )
+        if self._synced_until is not None:
+            overlap = timedelta(seconds=REVOCATION_SYNC_OVERLAP_SECONDS)
+            query = query.filter(RT.RevokedAt >= self._synced_until - overlap)
+        rows = query.group_by(RT.FamilyID).all()
+
+        with self._lock:
+            for family, expires_at in rows:
+                self._families[family] = expires_at
+            # Forget families whose tokens can no longer be used anyway
+            access_ttl = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+            for family, forget_after in list(self._families.items()):
+                if forget_after + access_ttl < now:
+                    del self._families[family]
+            self._synced_until = now
+            self._next_sync = time.monotonic() + REVOCATION_SYNC_SECONDS
+
+    def __len__(self):
+        return len(self._families)
+
+
+revocations = RevocationStore()
+
+
+def is_session_revoked(db: Session, family: Optional[str]) -> bool:
+    """Used by get_current_user on every request: usually just a dict lookup."""
+    if family is None:
+        return False
+    revocations.sync(db)
+    return revocations.is_revoked(family)
+
+
+# ===========================
+# 2. ISSUE / ROTATE / REVOKE
+# ===========================
+
+
+def _encode(user: models.User, token_id: str, family: str, expires_at: datetime):
+    return auth.jwt.encode(
+        {
+            "sub": user.email,
+            "typ": REFRESH_TYPE,
+            "jti": token_id,
+            "fam": family,
+            "exp": expires_at.replace(tzinfo=timezone.utc),
+        },
+        auth.SECRET_KEY,
+        algorithm=auth.ALGORITHM,
+    )
+
+
+def _new_row(db: Session, user: models.User, family: str, token_id: str) -> str:
+    now = _utcnow()
+    expires_at = now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(
+        models.RefreshToken(
+            TokenID=token_id,
+            FamilyID=family,
+            UserID=user.id,
+            CreatedAt=now,
+            ExpiresAt=expires_at,
+        )
+    )
+    return _encode(user, token_id, family, expires_at)
+
+
+def create_access_token(user: models.User, family: str) -> str:
+    return auth.create_access_token(
+        data={"sub": user.email, "fam": family},
+        expires_delta=timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+
+
+def start_session(db: Session, user: models.User) -> Tuple[str, str]:
+    """After a successful password login: (access_token, refresh_token)."""
+    family = uuid.uuid4().hex
+    refresh_token = _new_row(db, user, family, uuid.uuid4().hex)
+    db.commit()
+    return create_access_token(user, family), refresh_token
+
+
+def _decode(token: str) -> dict:
+    try:
+        payload = auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    except auth.JWTError:
+        raise InvalidRefreshToken("Invalid or expired refresh token")
+    if payload.get("typ") != REFRESH_TYPE or not payload.get("jti"):
+        raise InvalidRefreshToken("Not a refresh token")
+    return payload
+
+
+def rotate(db: Session, token: str) -> Tuple[models.User, str, str]:
+    """
+    Swap a refresh token for (user, access_token, refresh_token).
+
+    Raises InvalidRefreshToken when the token is bad, expired, revoked or
+    has already been used (which also revokes its whole family).
+    """
+    payload = _decode(token)
+    family = payload.get("fam")
+    if revocations.is_revoked(family):
+        raise InvalidRefreshToken("Session has been revoked")
+
+    RT = models.RefreshToken
+    now = _utcnow()
+    new_id = uuid.uuid4().hex
+
+    # Single-use: only one caller can flip RevokedAt from NULL
+    claimed = db.execute(
+        update(RT)
+        .where(RT.TokenID == payload["jti"], RT.RevokedAt.is_(None), RT.ExpiresAt > now)
+        .values(RevokedAt=now, ReplacedBy=new_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed != 1:
+        db.rollback()
+        row = db.get(RT, payload["jti"])
+        if row is not None and row.ReplacedBy is not None:
+            successor = _grace_successor(db, row, now)
+            if successor is not None:
+                return successor
+            print(f"🚨 Refresh token reuse detected, revoking session {family}")
+            revoke_family(db, family)
+            raise InvalidRefreshToken("Refresh token has already been used")
+        raise InvalidRefreshToken("Invalid or expired refresh token")
+
+    user = db.query(models.User).filter(models.User.email == payload["sub"]).first()
+    if user is None:
+        db.rollback()
+        raise InvalidRefreshToken("User no longer exists")
+
+    refresh_token = _new_row(db, user, family, new_id)
+    db.commit()
+    return user, create_access_token(user, family), refresh_token
+
+
+def _grace_successor(db: Session, row: models.RefreshToken, now: datetime):
+    """
+    (user, access_token, refresh_token) for a token rotated moments ago
+    whose successor hasn't been used yet, else None. The JWT encoding is
+    deterministic, so this is the very token the first caller received.
+    """
+    if row.RevokedAt is None or row.RevokedAt < now - timedelta(
+        seconds=REFRESH_REUSE_GRACE_SECONDS
+    ):
+        return None
+    successor = db.get(models.RefreshToken, row.ReplacedBy)
+    if successor is None or successor.RevokedAt is not None:
+        return None
+    user = db.get(models.User, successor.UserID) if successor.UserID else None
+    if user is None:
+        return None
+    refresh_token = _encode(
+        user, successor.TokenID, successor.FamilyID, successor.ExpiresAt
+    )
+    return user, create_access_token(user, successor.FamilyID), refresh_token
+
+
+def revoke_family(db: Session, family: str):
+    """Log a session out everywhere (logout, or reuse detected)."""
+    RT = models.RefreshToken
+    now = _utcnow()
+    db.execute(
+        update(RT)
+        .where(RT.FamilyID == family, RT.RevokedAt.is_(None))
+        .values(RevokedAt=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    revocations.add(family, now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+
+def revoke_user(db: Session, user_id: int):
+    """
+    Before deleting a user: log out all their sessions and detach their
+    rows (refresh_tokens.UserID references users.id). The rows stay until
+    `purge` so other workers still sync the revocations. Caller commits.
+    """
+    RT = models.RefreshToken
+    now = _utcnow()
+    families = [
+        family
+        for (family,) in db.query(RT.FamilyID).filter(RT.UserID == user_id).distinct()
+    ]
+    db.execute(
+        update(RT)
+        .where(RT.UserID == user_id)
+        .values(UserID=None, RevokedAt=func.coalesce(RT.RevokedAt, now))
+        .execution_options(synchronize_session=False)
+    )
+    for family in families:
+        revocations.add(family, now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+
+def revoke(db: Session, token: str):
+    """Logout with a refresh token. Expired/unknown tokens are ignored."""
+    try:
+        payload = _decode(token)
+    except InvalidRefreshToken:
+        return
+    if payload.get("fam"):
+        revoke_family(db, payload["fam"])
+
+
+def purge_expired(db: Session) -> int:
+    RT = models.RefreshToken
+    deleted = (
+        db.query(RT).filter(RT.ExpiresAt < _utcnow()).delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+# ===========================
+# 3. CLI
+# ===========================
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh token maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("purge", help="delete expired refresh tokens")
+    parser.parse_args()
+
+    import database
+
+    db = database.SessionLocal()
+    try:
+        print(f"🧹 Deleted {purge_expired(db):,} expired refresh tokens")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
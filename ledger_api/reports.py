@@ -0,0 +1,247 @@
+"""
+Vectorized reporting engine (AR aging + customer statements).
+
+Transactions are streamed out of the database in chunks and packed into
+columnar NumPy arrays:
+
+    customer_ids -> int64
+    cents        -> int64          (AmountCents, or Amount * 100 rounded in SQL)
+    entry_dates  -> datetime64[us]
+
+All report math then runs on those arrays with bincount group-bys and
+cumsums, so we never loop over rows in Python.
+
+Sign convention: a positive Amount is a charge (the customer owes us),
+a negative Amount is a payment/credit. This matches `search_customers`,
+where Balance = SUM(Amount).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import archive
+import money
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Aging buckets: 0-30 / 31-60 / 61-90 / 90+ days
+BUCKET_EDGES = np.array([31, 61, 91], dtype=np.int64)
+BUCKET_LABELS = ("Current", "Days31to60", "Days61to90", "Over90")
+
+# Statements cover the last 30 days unless a start is given
+STATEMENT_DAYS = 30
+
+
+@dataclass
+class TransactionColumns:
+    customer_ids: np.ndarray
+    cents: np.ndarray
+    entry_dates: np.ndarray
+    transaction_ids: np.ndarray
+
+    def __len__(self):
+        return len(self.cents)
+
+
+# ===========================
+# 1. LOADING (DB -> NumPy)
+# ===========================
+
+
+def _empty_columns() -> TransactionColumns:
+    return TransactionColumns(
+        customer_ids=np.empty(0, dtype=np.int64),
+        cents=np.empty(0, dtype=np.int64),
+        entry_dates=np.empty(0, dtype="datetime64[us]"),
+        transaction_ids=np.empty(0, dtype=np.int64),
+    )
+
+
+def iter_transaction_chunks(
+    db: Session,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    customer_id: Optional[int] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[TransactionColumns]:
+    """Stream Transactions as columnar chunks of at most `chunk_size` rows."""
+    # Archived rows are read through transparently (see archive.py)
+    src = archive.select_transactions(db, end=end, customer_id=customer_id).subquery()
+
+    # Integer cents straight from SQL so no Decimal objects are ever built
+    cents_expr = money.cents_column(src.c)
+
+    stmt = select(
+        src.c.CustomerID,
+        cents_expr,
+        src.c.EntryDate,
+        src.c.TransactionID,
+    ).where(
+        cents_expr.isnot(None),
+        src.c.EntryDate.isnot(None),
+    )
+
+    result = db.execute(stmt.execution_options(yield_per=chunk_size))
+    for rows in result.partitions(chunk_size):
+        cust, cents, dates, ids = zip(*rows)
+        yield TransactionColumns(
+            customer_ids=np.fromiter(
+                (c if c is not None else -1 for c in cust), np.int64, len(rows)
+            ),
+            cents=np.fromiter(cents, np.int64, len(rows)),
+            entry_dates=np.array(dates, dtype="datetime64[us]"),
+            transaction_ids=np.fromiter(ids, np.int64, len(rows)),
+        )
+
+
+def load_transaction_columns(db: Session, **filters) -> TransactionColumns:
+    """Load every matching Transaction into one set of columnar arrays."""
+    chunks = list(iter_transaction_chunks(db, **filters))
+    if not chunks:
+        return _empty_columns()
+    return TransactionColumns(
+        customer_ids=np.concatenate([c.customer_ids for c in chunks]),
+        cents=np.concatenate([c.cents for c in chunks]),
+        entry_dates=np.concatenate([c.entry_dates for c in chunks]),
+        transaction_ids=np.concatenate([c.transaction_ids for c in chunks]),
+    )
+
+
+# ===========================
+# 2. VECTORIZED HELPERS
+# ===========================
+
+
+def _factorize(ids: np.ndarray):
+    """Like np.unique(return_inverse=True), but O(n) for dense integer IDs."""
+    if len(ids) and ids.min() >= 0 and ids.max() < 4 * len(ids) + 1024:
+        present = np.zeros(ids.max() + 1, dtype=bool)
+        present[ids] = True
+        lookup = np.cumsum(present) - 1
+        return np.flatnonzero(present), lookup[ids]
+    return np.unique(ids, return_inverse=True)
+
+
+# ===========================
+# 3. AR AGING
+# ===========================
+
+
+def compute_aging(cols: TransactionColumns, as_of: datetime):
+    """
+    Open receivables per customer, split into aging buckets.
+
+    Payments (negative amounts) are applied FIFO against the oldest charges,
+    so what remains in each bucket is the unpaid part of the charges of that age.
+
+    Returns (customer_ids, buckets) where buckets is an int64 array of
+    shape (n_customers, 4) in cents.
+    """
+    as_of64 = np.datetime64(as_of, "us")
+    mask = cols.entry_dates <= as_of64
+    cust = cols.customer_ids[mask]
+    cents = cols.cents[mask]
+    dates = cols.entry_dates[mask]
+
+    customer_ids, cust_idx = _factorize(cust)
+    n = len(customer_ids)
+    n_buckets = len(BUCKET_LABELS)
+
+    age_days = (as_of64 - dates).astype("timedelta64[D]").astype(np.int64)
+    bucket = np.digitize(age_days, BUCKET_EDGES)
+
+    # Charges per (customer, bucket) and total credits per customer
+    charged = (
+        np.bincount(
+            cust_idx * n_buckets + bucket,
+            weights=np.where(cents > 0, cents, 0),
+            minlength=n * n_buckets,
+        )
+        .astype(np.int64)
+        .reshape(n, n_buckets)
+    )
+    credits = np.bincount(
+        cust_idx, weights=np.where(cents < 0, -cents, 0), minlength=n
+    ).astype(np.int64)
+
+    # FIFO: the buckets are already in age order, so applying credits to the
+    # oldest charges first is a cumsum across the bucket axis (no row sort).
+    oldest_first = charged[:, ::-1]
+    applied_through = np.cumsum(oldest_first, axis=1)
+    open_cents = np.clip(applied_through - credits[:, None], 0, oldest_first)
+    buckets = open_cents[:, ::-1].copy()
+
+    # Unapplied credit (overpayment) has no age: show it in "Current"
+    buckets[:, 0] -= np.maximum(credits - charged.sum(axis=1), 0)
+    return customer_ids, buckets
+
+
+# ===========================
+# 4. STATEMENTS
+# ===========================
+
+
+def statement_period(start: Optional[datetime], end: Optional[datetime]):
+    """Fill in the default period (last STATEMENT_DAYS up to now)."""
+    end = end or datetime.now()
+    start = start or end - timedelta(days=STATEMENT_DAYS)
+    if start >= end:
+        raise ValueError("'start' must be before 'end'.")
+    return start, end
+
+
+def compute_statement_summary(cols: TransactionColumns, start: datetime, end: datetime):
+    """
+    Per-customer statement totals for [start, end).
+
+    Returns (customer_ids, opening, charges, payments, closing), all in cents.
+    """
+    start64 = np.datetime64(start, "us")
+    end64 = np.datetime64(end, "us")
+    mask = cols.entry_dates < end64
+    cust = cols.customer_ids[mask]
+    cents = cols.cents[mask]
+    dates = cols.entry_dates[mask]
+
+    customer_ids, cust_idx = _factorize(cust)
+    n = len(customer_ids)
+
+    before = dates < start64
+    in_period = ~before
+
+    def _sum(selector):
+        return np.bincount(
+            cust_idx[selector], weights=cents[selector], minlength=n
+        ).astype(np.int64)
+
+    opening = _sum(before)
+    charges = _sum(in_period & (cents > 0))
+    payments = _sum(in_period & (cents < 0))
+    closing = opening + charges + payments
+    return customer_ids, opening, charges, payments, closing
+
+
+def compute_customer_statement(
+    cols: TransactionColumns, start: datetime, end: datetime
+):
+    """
+    Statement lines for a single customer's columns.
+
+    Returns (opening_cents, line_index, running_balance_cents) where line_index
+    selects the in-period rows of `cols` in date order.
+    """
+    start64 = np.datetime64(start, "us")
+    end64 = np.datetime64(end, "us")
+
+    before = cols.entry_dates < start64
+    opening = int(cols.cents[before].sum())
+
+    in_period = np.flatnonzero(~before & (cols.entry_dates < end64))
+    order = np.lexsort((cols.transaction_ids[in_period], cols.entry_dates[in_period]))
+    line_index = in_period[order]
+    running = opening + np.cumsum(cols.cents[line_index])
+    return opening, line_index, running
@@ -0,0 +1,229 @@
+"""
+Production launcher: multi-worker uvicorn tuned for throughput.
+
+    cd ledger_api
+    python serve.py                          # one worker per CPU on :8000
+    python serve.py --workers 8 --db-connection-budget 120
+    python serve.py --ssl-keyfile key.pem --ssl-certfile cert.pem
+    python serve.py --dry-run                # print the plan and exit
+
+* uvloop + httptools when installed (they are in requirements.txt)
+* keep-alive longer than the usual load-balancer idle timeout, big backlog
+* each worker restarts gracefully after MAX_REQUESTS (+ random jitter so
+  they don't all restart together), which caps slow memory growth. Only
+  with 2+ workers: a single worker has no supervisor to restart it
+* DB_CONNECTION_BUDGET (the Azure SQL tier's connection limit, minus
+  DB_CONNECTION_RESERVE for migrations/admin tools) is split across
+  workers, so workers x pool never exceeds it
+* with more than one worker the per-process memory cache is switched off
+  (CACHE_BACKEND=redis is shared and stays on)
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import signal
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ⚙️ CONFIGURATION
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "60"))
+DB_CONNECTION_RESERVE = int(os.getenv("DB_CONNECTION_RESERVE", "5"))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))  # 0 = never recycle
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+
+def cpu_count() -> int:
+    # Respect container CPU pinning where the OS exposes it
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# ===========================
+# 1. SIZING
+# ===========================
+
+
+@dataclass
+class Plan:
+    workers: int
+    pool_size: int
+    max_overflow: int
+
+    @property
+    def connections_per_worker(self) -> int:
+        return self.pool_size + self.max_overflow
+
+
+def plan_workers(workers: int, budget: int, reserve: int) -> Plan:
+    """
+    Split the connection budget across workers. Each worker gets a hard cap
+    (pool_size + max_overflow); a quarter of it is overflow, so idle workers
+    don't sit on connections they rarely need.
+    """
+    usable = budget - reserve
+    if usable < workers:
+        print(
+            f"⚠️  Budget of {usable} connections can't give {workers} workers one "
+            f"each; running {max(usable, 1)} workers."
+        )
+        workers = max(usable, 1)
+    per_worker = max(usable // workers, 1)
+    max_overflow = per_worker // 4
+    return Plan(workers, per_worker - max_overflow, max_overflow)
+
+
+# ===========================
+# 2. WORKER RECYCLING
+# ===========================
+
+
+class RecycleAfterRequests:
+    """
+    ASGI wrapper: after `limit` requests, ask this worker to shut down
+    gracefully (SIGTERM -> uvicorn finishes in-flight requests). The uvicorn
+    supervisor then starts a fresh worker in its place.
+    """
+
+    def __init__(self, app, limit: int):
+        self.app = app
+        self.limit = limit
+        self.served = 0
+        self.signalled = False
+
+    def __getattr__(self, name):
+        return getattr(self.app, name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.served += 1
+            if self.served >= self.limit and not self.signalled:
+                self.signalled = True
+                print(
+                    f"♻️  Worker {os.getpid()} served {self.served} requests, recycling"
+                )
+                os.kill(os.getpid(), signal.SIGTERM)
+        await self.app(scope, receive, send)
+
+
+def create_worker_app():
+    """uvicorn factory, run once inside every worker process."""
+    import main
+
+    app = main.create_app()
+    if MAX_REQUESTS > 0:
+        # Jitter per worker, or they all restart at the same moment
+        return RecycleAfterRequests(
+            app, MAX_REQUESTS + random.randint(0, MAX_REQUESTS_JITTER)
+        )
+    return app
+
+
+# ===========================
+# 3. CLI
+# ===========================
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Ledger API in production")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_WORKERS", cpu_count()))
+    )
+    parser.add_argument(
+        "--db-connection-budget", type=int, default=DB_CONNECTION_BUDGET
+    )
+    parser.add_argument(
+        "--db-connection-reserve", type=int, default=DB_CONNECTION_RESERVE
+    )
+    parser.add_argument("--keep-alive", type=int, default=75, help="seconds")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds")
+    parser.add_argument("--ssl-keyfile")
+    parser.add_argument("--ssl-certfile")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    plan = plan_workers(
+        args.workers, args.db_connection_budget, args.db_connection_reserve
+    )
+    loop = "uvloop" if _installed("uvloop") else "auto"
+    http = "httptools" if _installed("httptools") else "auto"
+
+    # Workers are spawned processes: they read these in Settings.from_env()
+    os.environ["DB_POOL_SIZE"] = str(plan.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(plan.max_overflow)
+
+    job_workers = int(os.getenv("JOB_WORKERS", "2"))
+    if os.getenv("JOB_BACKEND", "thread") == "thread" and (
+        plan.connections_per_worker <= job_workers
+    ):
+        print(
+            f"⚠️  {plan.connections_per_worker} connections per worker but "
+            f"JOB_WORKERS={job_workers}: background jobs may starve requests."
+        )
+
+    # The memory cache is per process: a write only invalidates the worker
+    # that served it, and the others keep answering with stale data
+    if plan.workers > 1 and os.getenv("CACHE_BACKEND", "memory") == "memory":
+        print(
+            f"⚠️  CACHE_BACKEND=memory can't be shared by {plan.workers} workers; "
+            "caching is off. Set CACHE_BACKEND=redis to keep it."
+        )
+        os.environ["CACHE_BACKEND"] = "none"
+
+    # A single worker runs without the uvicorn supervisor: nothing would
+    # start it again after a recycle, so the API would just go down
+    max_requests = MAX_REQUESTS if plan.workers > 1 else 0
+    os.environ["MAX_REQUESTS"] = str(max_requests)
+
+    print("🚀 Ledger API")
+    print(f"   {plan.workers} workers on {args.host}:{args.port} ({loop}/{http})")
+    print(
+        f"   DB pool per worker: {plan.pool_size} + {plan.max_overflow} overflow "
+        f"= {plan.workers * plan.connections_per_worker} of "
+        f"{args.db_connection_budget} connections "
+        f"({args.db_connection_reserve} reserved)"
+    )
+    recycle = (
+        f"after {max_requests}-{max_requests + MAX_REQUESTS_JITTER} requests"
+        if max_requests > 0
+        else "never"
+    )
+    print(
+        f"   Keep-alive {args.keep_alive}s, backlog {args.backlog}, recycle {recycle}"
+    )
+    if args.dry_run:
+        return
+
+    import uvicorn
+
+    uvicorn.run(
+        "serve:create_worker_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=plan.workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        ssl_keyfile=args.ssl_keyfile,
+        ssl_certfile=args.ssl_certfile,
+        access_log=False,  # per-request logging costs more than it's worth here
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+
+def _origins_from_env() -> List[str]:
+    raw = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173")
+    return [origin.strip() for origin in raw.split(",") if origin.strip()]
+
+
+def _int_from_env(name: str) -> Optional[int]:
+    raw = os.getenv(name)
+    return int(raw) if raw else None
+
+
+@dataclass
+class Settings:
+    """
+    Per-process configuration for `create_app`.
+
+    Defaults come from the environment / .env, but tests and CLI scripts can
+    pass their own (e.g. a throwaway SQLite URL) without touching os.environ.
+    """
+
+    database_url: Optional[str] = None
+    cors_origins: List[str] = field(default_factory=_origins_from_env)
+    static_dir: str = "dist"
+    # Connections opened at startup so the first requests don't pay for them
+    warm_up_connections: int = 1
+    # Per-worker pool cap (serve.py derives these from DB_CONNECTION_BUDGET)
+    db_pool_size: Optional[int] = None
+    db_max_overflow: Optional[int] = None
+    # Per-request profiling middleware + SQL hooks (see profiling.py)
+    profiling: bool = False
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        load_dotenv()
+        return cls(
+            database_url=os.getenv("DATABASE_URL"),
+            static_dir=os.getenv("STATIC_DIR", "dist"),
+            warm_up_connections=int(os.getenv("DB_WARM_UP_CONNECTIONS", "1")),
+            db_pool_size=_int_from_env("DB_POOL_SIZE"),
+            db_max_overflow=_int_from_env("DB_MAX_OVERFLOW"),
+            profiling=os.getenv("PROFILING_ENABLED", "0") == "1",
+        )
@@ -1,17 +1,27 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import {
   AppShell, Container, Table, Title, Text, Badge, Group, Alert,
   Button, Modal, TextInput, Stack, Drawer, NumberInput, Divider, Tabs, Select,
   ActionIcon, Avatar, Paper, SimpleGrid, useMantineColorScheme, Burger,
-  ThemeIcon, Center, PasswordInput, ScrollArea
+  ThemeIcon, Center, PasswordInput, Skeleton
 } from '@mantine/core';
-import { useDisclosure } from '@mantine/hooks';
+import { useDebouncedValue, useDisclosure } from '@mantine/hooks';
 import { notifications } from '@mantine/notifications';
 import {
   IconUserPlus, IconCurrencyDollar, IconSearch,
   IconUsers, IconReceipt, IconNote, IconPlus, IconChartBar,
   IconPhone, IconMapPin, IconMail, IconLock, IconShieldLock, IconTrash
 } from '@tabler/icons-react';
+import { VirtualTable } from './VirtualTable.jsx';
+import { usePagedRows } from './usePagedRows.js';
+import { useLedgerCache } from './useLedgerCache.js';
+import { useIncrementalSearch } from './useIncrementalSearch.js';
+
+// --- TABLES ---
+// Fixed row heights (VirtualTable needs them) and typing pause before a search hits the server
+const CUSTOMER_ROW_HEIGHT = 64;
+const TX_ROW_HEIGHT = 44;
+const SEARCH_DEBOUNCE_MS = 300;
 
 // --- HELPERS ---
 const formatDate = (dateString) => new Date(dateString).toLocaleDateString('en-US', {
@@ -19,6 +29,64 @@ const formatDate = (dateString) => new Date(dateString).toLocaleDateString('en-U
 });
 const formatMoney = (amount) => new Intl.NumberFormat('en-US', { style: 'currency', currency: 'USD' }).format(amount);
 const getInitials = (name) => name.split(' ').map(n => n[0]).join('').substring(0, 2).toUpperCase();
+const matches = (q, ...fields) => fields.some((f) => f?.toLowerCase().includes(q));
+// Search tests for the offline copy (customers are listed by ID)
+const customerMatches = (q, id, customers) => {
+  const c = customers.get(id);
+  return matches(q, c.CustomerName, c.Email);
+};
+const transactionMatches = (q, tx, customers) => matches(q, tx.Notes, customers.get(tx.CustomerID)?.CustomerName);
+const customerOption = (c) => ({ value: c.CustomerID.toString(), label: `${c.CustomerName} (#${c.CustomerID})` });
+
+// Heatmap badge: cutoffs are the 33rd / 66th percentile of TxCount (from /transactions/summary/)
+const activityBadge = (count, [lowCutoff, highCutoff]) => {
+  if (count === 0) return { color: 'gray', label: 'Inactive' };
+  const color = count >= highCutoff ? 'green' : count >= lowCutoff ? 'cyan' : 'blue';
+  return { color, label: `${count} Txns` };
+};
+
+const PlaceholderRow = ({ height, cols }) => (
+  <Table.Tr style={{ height }}>
+    <Table.Td colSpan={cols}><Skeleton height={12} radius="xl" /></Table.Td>
+  </Table.Tr>
+);
+
+// One page of a paged endpoint: resolves to { total, items }
+const loadPage = async (request, path, q, offset, limit) => {
+  const query = new URLSearchParams({ ...(q ? { q } : {}), offset, limit });
+  const res = await request(`${path}?${query}`);
+  if (!res.ok) throw new Error(`Failed to load ${path}`);
+  return res.json();
+};
+
+// --- SESSION REFRESH ---
+// One refresh at a time: refresh tokens are single-use, so parallel 401s share
+// it, and other tabs wait on the same Web Lock. A tab that gets the lock after
+// another one refreshed finds the new access token in localStorage and uses it.
+let refreshInFlight = null;
+const rotateRefreshToken = async (staleAccessToken) => {
+  const current = localStorage.getItem('ledger_token');
+  if (current && current !== staleAccessToken) return current;
+  const refreshToken = localStorage.getItem('ledger_refresh_token');
+  if (!refreshToken) return null;
+  const res = await fetch('/token/refresh', {
+    method: 'POST', headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ refresh_token: refreshToken })
+  });
+  if (!res.ok) return null;
+  const data = await res.json();
+  localStorage.setItem('ledger_token', data.access_token);
+  localStorage.setItem('ledger_refresh_token', data.refresh_token);
+  return data.access_token;
+};
+const refreshSession = (staleAccessToken) => {
+  if (!refreshInFlight) {
+    const run = () => rotateRefreshToken(staleAccessToken);
+    refreshInFlight = (navigator.locks ? navigator.locks.request('ledger-token-refresh', run) : run())
+      .finally(() => { refreshInFlight = null; });
+  }
+  return refreshInFlight;
+};
 
 function App() {
   const { colorScheme } = useMantineColorScheme();
@@ -43,14 +111,22 @@ function App() {
 
   // --- DATA STATE ---
   const [activeTab, setActiveTab] = useState('customers');
-  const [customers, setCustomers] = useState([]);
-  const [transactions, setTransactions] = useState([]);
+  const [summary, setSummary] = useState(null); // totals for the cards, computed by the server
+  const [dataVersion, setDataVersion] = useState(0); // bumped after writes
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
 
-  // Search
+  // Search (filtered on the server, once typing pauses)
   const [customerSearch, setCustomerSearch] = useState('');
   const [transactionSearch, setTransactionSearch] = useState('');
+  const [debouncedCustomerSearch] = useDebouncedValue(customerSearch.trim(), SEARCH_DEBOUNCE_MS);
+  const [debouncedTransactionSearch] = useDebouncedValue(transactionSearch.trim(), SEARCH_DEBOUNCE_MS);
+
+  // Customer picker in the transaction modal (searches the server too)
+  const [pickerSearch, setPickerSearch] = useState('');
+  const [debouncedPickerSearch] = useDebouncedValue(pickerSearch.trim(), SEARCH_DEBOUNCE_MS);
+  const [pickerMatches, setPickerMatches] = useState([]);
+  const [pickedOption, setPickedOption] = useState(null);
 
   // Modals/Drawers
   const [opened, { open, close }] = useDisclosure(false);
@@ -60,9 +136,8 @@ function App() {
   // Forms
   const [formData, setFormData] = useState({ CustomerName: '', Email: '', PhoneNumber: '', HomeAddress: '' });
   const [selectedCustomer, setSelectedCustomer] = useState(null);
+  const [customerHistory, setCustomerHistory] = useState([]);
   const [txForm, setTxForm] = useState({ customerId: null, amount: '', notes: '' });
-  const [submitting, setSubmitting] = useState(false);
-  const [txSubmitting, setTxSubmitting] = useState(false);
   const [formError, setFormError] = useState('');
 
   // --- AUTH HANDLERS ---
@@ -84,6 +159,7 @@ function App() {
       if (!res.ok) throw new Error(data.detail || 'Auth failed');
 
       localStorage.setItem('ledger_token', data.access_token);
+      localStorage.setItem('ledger_refresh_token', data.refresh_token);
       localStorage.setItem('ledger_is_admin', data.is_admin);
 
       setToken(data.access_token);
@@ -97,17 +173,42 @@ function App() {
   };
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('ledger_refresh_token');
+    if (refreshToken) {
+      // Server-side logout; fire and forget
+      fetch('/token/revoke', {
+        method: 'POST', headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken })
+      }).catch(() => {});
+    }
     localStorage.removeItem('ledger_token');
+    localStorage.removeItem('ledger_refresh_token');
     localStorage.removeItem('ledger_is_admin');
     setToken(null);
     setIsAdmin(false);
-    setCustomers([]);
+    setSummary(null);
+    cache.clear(); // the next user of this browser must not see this ledger
   };
 
   const authenticatedFetch = async (url, options = {}) => {
-    const headers = { ...options.headers, 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' };
-    const res = await fetch(url, { ...options, headers });
+    const send = (accessToken) => fetch(url, {
+      ...options,
+      headers: { ...options.headers, 'Authorization': `Bearer ${accessToken}`, 'Content-Type': 'application/json' }
+    });
+    const sent = localStorage.getItem('ledger_token') || token;
+    let res = await send(sent);
+    if (res.status === 401) {
+      // Access token expired: renew it with the refresh token instead of logging in again
+      const renewed = await refreshSession(sent);
+      if (renewed) res = await send(renewed);
+    }
     if (res.status === 401) { logout(); throw new Error("Session expired"); }
+    if ((res.status === 429 || res.status === 503) && (options.method || 'GET') === 'GET') {
+      // Server is shedding load: honour Retry-After once (reads only, capped at 5s)
+      const wait = Math.min(Number(res.headers.get('Retry-After')) || 1, 5);
+      await new Promise((resolve) => setTimeout(resolve, wait * 1000));
+      res = await send(localStorage.getItem('ledger_token') || token);
+    }
     return res;
   };
 
@@ -154,91 +255,261 @@ function App() {
   };
 
   // --- API LOGIC ---
+  // Offline copy of the whole ledger (IndexedDB + /sync/ deltas). Once it's
+  // complete, tables, search and cards are computed here and the server only
+  // sends changes; until then the tables page from the server.
+  const cache = useLedgerCache(authenticatedFetch, Boolean(token));
+  const local = cache.complete;
+
+  // The tables fetch their own pages (usePagedRows); this loads the cards
   const fetchData = async () => {
     if (!token) return;
     setLoading(true);
     try {
-      const [custRes, txRes] = await Promise.all([
-        authenticatedFetch('/customers/'),
-        authenticatedFetch('/transactions/')
-      ]);
-      const custData = await custRes.json();
-      const txData = await txRes.json();
-
-      setCustomers(custData);
-      setTransactions(txData.sort((a, b) => new Date(b.EntryDate) - new Date(a.EntryDate)));
-
-      if (selectedCustomer) {
-        const updated = custData.find(c => c.CustomerID === selectedCustomer.CustomerID);
-        if (updated) setSelectedCustomer(updated);
-      }
+      const res = await authenticatedFetch('/transactions/summary/');
+      if (!res.ok) throw new Error('Could not load the ledger summary');
+      setSummary(await res.json());
     } catch (err) { setError(err.message); } finally { setLoading(false); }
   };
 
   useEffect(() => { fetchData(); }, [token]);
 
+  // After a write: new cards, and the tables drop their pages and refetch
+  // (the offline copy gets its changes from /sync/ instead)
+  const refreshData = () => { if (!local) { setDataVersion((v) => v + 1); fetchData(); } };
+
+  // Latest authenticatedFetch, so the page loaders keep their identity across renders
+  const fetchRef = useRef(authenticatedFetch);
+  useEffect(() => { fetchRef.current = authenticatedFetch; });
+
+  // Only a new search makes a new loader (and a new `ensure` in usePagedRows)
+  const loadCustomerPage = useCallback(
+    (offset, limit) => loadPage(fetchRef.current, '/customers/page/', debouncedCustomerSearch, offset, limit),
+    [debouncedCustomerSearch]
+  );
+  const loadTransactionPage = useCallback(
+    (offset, limit) => loadPage(fetchRef.current, '/transactions/page/', debouncedTransactionSearch, offset, limit),
+    [debouncedTransactionSearch]
+  );
+
+  const customerRows = usePagedRows(loadCustomerPage, `${dataVersion}|${debouncedCustomerSearch}`);
+  const transactionRows = usePagedRows(loadTransactionPage, `${dataVersion}|${debouncedTransactionSearch}`);
+
+  useEffect(() => {
+    if (!txModalOpened || local) return;
+    let stale = false;
+    const query = new URLSearchParams({ q: debouncedPickerSearch, limit: 20 });
+    authenticatedFetch(`/customers/page/?${query}`)
+      .then((res) => res.json())
+      .then((data) => { if (!stale) setPickerMatches(data.items || []); })
+      .catch(() => {});
+    return () => { stale = true; };
+  }, [txModalOpened, debouncedPickerSearch, local]);
+
+  const fetchHistory = async (customerId) => {
+    if (local) return; // read from the offline copy
+    try {
+      const res = await authenticatedFetch(`/transactions/page/?customer_id=${customerId}&limit=50`);
+      if (res.ok) setCustomerHistory((await res.json()).items);
+    } catch (err) { setError(err.message); }
+  };
+
   // --- DATA HANDLERS ---
+  // Writes are optimistic: the row shows at once and is taken back if the server refuses it
   const handleCreateCustomer = async () => {
-    setFormError(''); setSubmitting(true);
+    const draft = formData;
+    setFormError('');
+    const tempId = cache.addPending('customers', { ...draft, TxCount: 0, Balance: '0.00' });
+    close();
+    setFormData({ CustomerName: '', Email: '', PhoneNumber: '', HomeAddress: '' });
     try {
       const res = await authenticatedFetch('/customers/', {
-        method: 'POST', body: JSON.stringify(formData),
+        method: 'POST', body: JSON.stringify(draft),
       });
       const data = await res.json();
       if (!res.ok) throw new Error(data.detail);
 
-      close();
-      setFormData({ CustomerName: '', Email: '', PhoneNumber: '', HomeAddress: '' });
-      fetchData();
+      const { transactions: _, ...saved } = data;
+      cache.settle('customers', tempId, { ...saved, TxCount: 0, Balance: '0.00' });
+      refreshData();
 
       notifications.show({ title: 'Success', message: 'Customer added to database', color: 'teal' });
     } catch (err) {
+      // Rolled back: reopen the form with what was typed
+      cache.settle('customers', tempId, null);
+      setFormData(draft);
       setFormError(err.message);
-    } finally {
-      setSubmitting(false);
+      open();
     }
   };
 
   const handleTransactionSubmit = async (source) => {
     let cid = source === 'drawer' ? selectedCustomer.CustomerID : txForm.customerId;
     if (!cid || !txForm.amount) return;
-    setTxSubmitting(true);
+    const body = { CustomerID: Number(cid), Amount: parseFloat(txForm.amount), Notes: txForm.notes, EntryDate: new Date().toISOString() };
+    const tempId = cache.addPending('transactions', { ...body, Amount: body.Amount.toFixed(2) });
+    setTxForm({ customerId: null, amount: '', notes: '' });
+    setPickedOption(null);
+    closeTxModal();
     try {
       const res = await authenticatedFetch('/transactions/', {
         method: 'POST',
-        body: JSON.stringify({ CustomerID: cid, Amount: parseFloat(txForm.amount), Notes: txForm.notes, EntryDate: new Date().toISOString() }),
+        body: JSON.stringify(body),
       });
       if (!res.ok) throw new Error("Transaction Failed");
-      setTxForm({ customerId: null, amount: '', notes: '' });
-      closeTxModal();
-      fetchData();
+      const created = await res.json();
+      cache.settle('transactions', tempId, created);
+      if (!local && selectedCustomer && selectedCustomer.CustomerID === created.CustomerID) {
+        // Drawer is showing this customer: update it in place
+        setCustomerHistory((h) => [created, ...h]);
+        setSelectedCustomer((c) => ({
+          ...c,
+          TxCount: c.TxCount + 1,
+          Balance: (parseFloat(c.Balance) + parseFloat(created.Amount)).toFixed(2)
+        }));
+      }
+      refreshData();
 
-      notifications.show({ title: 'Transaction Recorded', message: `Successfully processed $${txForm.amount}`, color: 'green' });
+      notifications.show({ title: 'Transaction Recorded', message: `Successfully processed $${body.Amount.toFixed(2)}`, color: 'green' });
     } catch (err) {
+      cache.settle('transactions', tempId, null);
       notifications.show({ title: 'Transaction Failed', message: err.message, color: 'red' });
-    } finally {
-      setTxSubmitting(false);
     }
   };
 
-  const handleRowClick = (c) => { setSelectedCustomer(c); setTxForm({ customerId: null, amount: '', notes: '' }); openDrawer(); };
-
-  // --- STATS & FILTERS ---
-  const totalBalance = transactions.reduce((acc, tx) => acc + parseFloat(tx.Amount), 0);
-  const avgTransaction = transactions.length > 0 ? totalBalance / transactions.length : 0;
+  const handleRowClick = (c) => {
+    if (c.CustomerID < 0) return; // still being saved
+    setSelectedCustomer(c); setCustomerHistory([]); setTxForm({ customerId: null, amount: '', notes: '' });
+    openDrawer(); fetchHistory(c.CustomerID);
+  };
 
-  const filteredCustomers = customers.filter(c =>
-    c.CustomerName.toLowerCase().includes(customerSearch.toLowerCase()) ||
-    (c.Email && c.Email.toLowerCase().includes(customerSearch.toLowerCase()))
+  // --- OFFLINE COPY SELECTORS (null until the copy is complete) ---
+  // The copy is already sorted (useLedgerCache), so a search only filters,
+  // and rows get their CustomerName when they scroll into view
+  const customerList = useIncrementalSearch(
+    local ? cache.customerIds : null, debouncedCustomerSearch.toLowerCase(), cache.customers, customerMatches
+  );
+  const transactionList = useIncrementalSearch(
+    local ? cache.transactions : null, debouncedTransactionSearch.toLowerCase(), cache.customers, transactionMatches
   );
 
-  const filteredTransactions = transactions.filter(tx => {
-    const cName = customers.find(c => c.CustomerID === tx.CustomerID)?.CustomerName || '';
-    const query = transactionSearch.toLowerCase();
-    return cName.toLowerCase().includes(query) || (tx.Notes && tx.Notes.toLowerCase().includes(query));
-  });
+  // Same shape as usePagedRows, every row already here
+  const customerTable = customerList
+    ? { total: customerList.length, row: (i) => cache.customers.get(customerList[i]) }
+    : customerRows;
+  const transactionTable = transactionList
+    ? {
+      total: transactionList.length,
+      row: (i) => {
+        const tx = transactionList[i];
+        return tx && { ...tx, CustomerName: cache.customers.get(tx.CustomerID)?.CustomerName };
+      }
+    }
+    : transactionRows;
+
+  const localPickerMatches = useMemo(() => {
+    if (!local) return null;
+    const q = debouncedPickerSearch.toLowerCase();
+    const found = [];
+    for (const c of cache.customers.values()) {
+      if (c.CustomerID > 0 && matches(q, c.CustomerName, c.Email)) found.push(c);
+      if (found.length === 20) break;
+    }
+    return found;
+  }, [local, cache.customers, debouncedPickerSearch]);
+
+  // Drawer: the live row, so pending posts move the balance. The copy is
+  // newest first, so the scan stops at the 50th match.
+  const drawerCustomer = (local && selectedCustomer && cache.customers.get(selectedCustomer.CustomerID)) || selectedCustomer;
+  const drawerHistory = useMemo(() => {
+    if (!local || !selectedCustomer) return customerHistory;
+    const history = [];
+    for (const tx of cache.transactions) {
+      if (tx.CustomerID === selectedCustomer.CustomerID) history.push(tx);
+      if (history.length === 50) break;
+    }
+    return history;
+  }, [local, selectedCustomer, cache.transactions, customerHistory]);
+
+  // --- STATS (memoized; from the offline copy, else summed by the server) ---
+  const stats = useMemo(() => {
+    if (local) {
+      // One pass over the customers; the TxCounts sort as a typed array (no comparator)
+      let volume = 0;
+      const active = [];
+      for (const c of cache.customers.values()) {
+        volume += parseFloat(c.Balance);
+        if (c.TxCount > 0) active.push(c.TxCount);
+      }
+      const counts = Int32Array.from(active).sort();
+      const count = cache.transactions.length;
+      return {
+        volume,
+        customers: cache.customers.size,
+        avgTransaction: count > 0 ? volume / count : 0,
+        cutoffs: [0.33, 0.66].map((p) => counts[Math.floor(counts.length * p)] ?? 0)
+      };
+    }
+    const volume = parseFloat(summary?.Volume ?? 0);
+    const count = summary?.Transactions ?? 0;
+    return {
+      volume,
+      customers: summary?.Customers ?? 0,
+      avgTransaction: count > 0 ? volume / count : 0,
+      cutoffs: summary?.ActivityCutoffs ?? [0, 0]
+    };
+  }, [local, cache.customers, cache.transactions, summary]);
+
+  // Keep the picked customer selectable while the search shows other matches
+  const customerOptions = useMemo(() => {
+    const options = (localPickerMatches ?? pickerMatches).map(customerOption);
+    if (pickedOption && !options.some((o) => o.value === pickedOption.value)) options.unshift(pickedOption);
+    return options;
+  }, [localPickerMatches, pickerMatches, pickedOption]);
+
+  const renderCustomerRow = (i) => {
+    const c = customerTable.row(i);
+    if (!c) return <PlaceholderRow key={`loading-${i}`} height={CUSTOMER_ROW_HEIGHT} cols={4} />;
+    const badge = activityBadge(c.TxCount, stats.cutoffs);
+    return (
+      <Table.Tr key={c.CustomerID} onClick={() => handleRowClick(c)} style={{ cursor: 'pointer', height: CUSTOMER_ROW_HEIGHT }}>
+        <Table.Td>
+          <Group gap="sm" wrap="nowrap">
+            <Avatar radius="xl">{getInitials(c.CustomerName)}</Avatar>
+            <div style={{ minWidth: 0 }}>
+              <Text fw={500} truncate>{c.CustomerName}</Text>
+              <Text size="xs" c="dimmed">ID: {c.CustomerID}</Text>
+            </div>
+          </Group>
+        </Table.Td>
+        <Table.Td>
+          <Text size="sm" truncate>{c.Email || '-'}</Text>
+          <Text size="xs" c="dimmed" truncate>{c.PhoneNumber}</Text>
+        </Table.Td>
+        <Table.Td><Text size="sm" truncate>{c.HomeAddress || '-'}</Text></Table.Td>
+        <Table.Td>
+          <Badge color={badge.color} variant="light">{badge.label}</Badge>
+        </Table.Td>
+      </Table.Tr>
+    );
+  };
 
-  const customerOptions = customers.map(c => ({ value: c.CustomerID.toString(), label: `${c.CustomerName} (#${c.CustomerID})` }));
+  const renderTransactionRow = (i) => {
+    const tx = transactionTable.row(i);
+    if (!tx) return <PlaceholderRow key={`loading-${i}`} height={TX_ROW_HEIGHT} cols={4} />;
+    return (
+      <Table.Tr key={tx.TransactionID} style={{ height: TX_ROW_HEIGHT }}>
+        <Table.Td><Text size="sm">{formatDate(tx.EntryDate)}</Text></Table.Td>
+        <Table.Td><Text fw={500} size="sm" truncate>{tx.CustomerName}</Text></Table.Td>
+        <Table.Td><Text size="sm" c="dimmed" fs="italic" truncate>{tx.Notes || '-'}</Text></Table.Td>
+        <Table.Td align="right">
+          <Text fw={700} c={parseFloat(tx.Amount) >= 0 ? 'green' : 'red'}>
+            {parseFloat(tx.Amount) > 0 ? '+' : ''}{formatMoney(tx.Amount)}
+          </Text>
+        </Table.Td>
+      </Table.Tr>
+    );
+  };
 
   // --- VIEW: LOGIN SCREEN ---
   if (!token) {
@@ -282,6 +553,7 @@ function App() {
 
               <img src="/logo.png" alt="Logo" style={{ height: 35, width: 'auto' }} />
               <Text fw={800} size="xl">LedgerPro</Text>
+              {cache.offline && <Badge color="gray" variant="light">Offline · saved copy</Badge>}
             </Group>
 
             {/* Desktop Buttons (Hidden on Mobile) */}
@@ -323,7 +595,7 @@ function App() {
               <Group justify="space-between">
                 <div>
                   <Text c="dimmed" size="xs" tt="uppercase" fw={700}>Total Volume</Text>
-                  <Text fw={700} size="xl">{formatMoney(totalBalance)}</Text>
+                  <Text fw={700} size="xl">{formatMoney(stats.volume)}</Text>
                 </div>
                 <ThemeIcon variant="light" size="xl" radius="md"><IconCurrencyDollar /></ThemeIcon>
               </Group>
@@ -333,7 +605,7 @@ function App() {
               <Group justify="space-between">
                 <div>
                   <Text c="dimmed" size="xs" tt="uppercase" fw={700}>Total Customers</Text>
-                  <Text fw={700} size="xl">{customers.length}</Text>
+                  <Text fw={700} size="xl">{stats.customers.toLocaleString('en-US')}</Text>
                 </div>
                 <ThemeIcon variant="light" size="xl" radius="md"><IconUsers /></ThemeIcon>
               </Group>
@@ -343,7 +615,7 @@ function App() {
               <Group justify="space-between">
                 <div>
                   <Text c="dimmed" size="xs" tt="uppercase" fw={700}>Avg. Transaction</Text>
-                  <Text fw={700} size="xl">{formatMoney(avgTransaction)}</Text>
+                  <Text fw={700} size="xl">{formatMoney(stats.avgTransaction)}</Text>
                 </div>
                 <ThemeIcon variant="light" size="xl" radius="md"><IconChartBar /></ThemeIcon>
               </Group>
@@ -359,83 +631,31 @@ function App() {
                 <Tabs.Tab value="transactions" leftSection={<IconReceipt size={16} />}>Transactions</Tabs.Tab>
               </Tabs.List>
 
-              {/* --- DYNAMIC HEATMAP CUSTOMER TABLE --- */}
+              {/* --- DYNAMIC HEATMAP CUSTOMER TABLE (virtualized, paged on the server) --- */}
               <Tabs.Panel value="customers">
                 <TextInput leftSection={<IconSearch size={16} />} placeholder="Search customers..." mb="md" value={customerSearch} onChange={(e) => setCustomerSearch(e.currentTarget.value)} />
-
-                <ScrollArea>
-                  {(() => {
-                    const counts = customers
-                      .map(c => c.transactions?.length || 0)
-                      .filter(n => n > 0)
-                      .sort((a, b) => a - b);
-                    const lowCutoff = counts[Math.floor(counts.length * 0.33)] || 0;
-                    const highCutoff = counts[Math.floor(counts.length * 0.66)] || 0;
-
-                    return (
-                      <Table striped highlightOnHover verticalSpacing="sm" minWidth={600}>
-                        <Table.Thead><Table.Tr><Table.Th>Name</Table.Th><Table.Th>Contact</Table.Th><Table.Th>Address</Table.Th><Table.Th>Status</Table.Th></Table.Tr></Table.Thead>
-                        <Table.Tbody>
-                          {filteredCustomers.map(c => {
-                            const count = c.transactions?.length || 0;
-                            let badgeColor = 'gray';
-                            let badgeLabel = 'Inactive';
-                            if (count > 0) {
-                              if (count >= highCutoff) badgeColor = 'green';
-                              else if (count >= lowCutoff) badgeColor = 'cyan';
-                              else badgeColor = 'blue';
-                              badgeLabel = `${count} Txns`;
-                            }
-                            return (
-                              <Table.Tr key={c.CustomerID} onClick={() => handleRowClick(c)} style={{ cursor: 'pointer' }}>
-                                <Table.Td>
-                                  <Group gap="sm">
-                                    <Avatar radius="xl">{getInitials(c.CustomerName)}</Avatar>
-                                    <div>
-                                      <Text fw={500}>{c.CustomerName}</Text>
-                                      <Text size="xs" c="dimmed">ID: {c.CustomerID}</Text>
-                                    </div>
-                                  </Group>
-                                </Table.Td>
-                                <Table.Td>
-                                  <Text size="sm">{c.Email || '-'}</Text>
-                                  <Text size="xs" c="dimmed">{c.PhoneNumber}</Text>
-                                </Table.Td>
-                                <Table.Td><Text size="sm" lineClamp={1} w={200}>{c.HomeAddress || '-'}</Text></Table.Td>
-                                <Table.Td>
-                                  <Badge color={badgeColor} variant="light">{badgeLabel}</Badge>
-                                </Table.Td>
-                              </Table.Tr>
-                            );
-                          })}
-                        </Table.Tbody>
-                      </Table>
-                    );
-                  })()}
-                </ScrollArea>
+                {customerTable.total === 0 && <Text c="dimmed" ta="center" py="md">No customers found</Text>}
+                <VirtualTable
+                  rowCount={customerTable.total ?? 0}
+                  rowHeight={CUSTOMER_ROW_HEIGHT}
+                  renderRow={renderCustomerRow}
+                  onRangeChange={customerTable.ensure}
+                  resetKey={debouncedCustomerSearch}
+                  head={<Table.Tr><Table.Th>Name</Table.Th><Table.Th>Contact</Table.Th><Table.Th>Address</Table.Th><Table.Th w={120}>Status</Table.Th></Table.Tr>}
+                />
               </Tabs.Panel>
 
               <Tabs.Panel value="transactions">
                 <TextInput leftSection={<IconSearch size={16} />} placeholder="Search transactions..." mb="md" value={transactionSearch} onChange={(e) => setTransactionSearch(e.currentTarget.value)} />
-                <ScrollArea>
-                  <Table striped highlightOnHover verticalSpacing="xs" minWidth={600}>
-                    <Table.Thead><Table.Tr><Table.Th>Date</Table.Th><Table.Th>Customer</Table.Th><Table.Th>Notes</Table.Th><Table.Th align="right">Amount</Table.Th></Table.Tr></Table.Thead>
-                    <Table.Tbody>
-                      {filteredTransactions.map(tx => (
-                        <Table.Tr key={tx.TransactionID}>
-                          <Table.Td><Text size="sm">{formatDate(tx.EntryDate)}</Text></Table.Td>
-                          <Table.Td><Text fw={500} size="sm">{customers.find(c => c.CustomerID === tx.CustomerID)?.CustomerName}</Text></Table.Td>
-                          <Table.Td><Text size="sm" c="dimmed" fs="italic">{tx.Notes || '-'}</Text></Table.Td>
-                          <Table.Td align="right">
-                            <Text fw={700} c={tx.Amount >= 0 ? 'green' : 'red'}>
-                              {tx.Amount > 0 ? '+' : ''}{formatMoney(tx.Amount)}
-                            </Text>
-                          </Table.Td>
-                        </Table.Tr>
-                      ))}
-                    </Table.Tbody>
-                  </Table>
-                </ScrollArea>
+                {transactionTable.total === 0 && <Text c="dimmed" ta="center" py="md">No transactions found</Text>}
+                <VirtualTable
+                  rowCount={transactionTable.total ?? 0}
+                  rowHeight={TX_ROW_HEIGHT}
+                  renderRow={renderTransactionRow}
+                  onRangeChange={transactionTable.ensure}
+                  resetKey={debouncedTransactionSearch}
+                  head={<Table.Tr><Table.Th w={200}>Date</Table.Th><Table.Th>Customer</Table.Th><Table.Th>Notes</Table.Th><Table.Th w={140} align="right">Amount</Table.Th></Table.Tr>}
+                />
               </Tabs.Panel>
             </Tabs>
           </Paper>
@@ -450,17 +670,23 @@ function App() {
           <TextInput label="Email" name="Email" value={formData.Email} onChange={(e) => setFormData({ ...formData, [e.target.name]: e.target.value })} />
           <TextInput label="Phone" name="PhoneNumber" value={formData.PhoneNumber} onChange={(e) => setFormData({ ...formData, [e.target.name]: e.target.value })} />
           <TextInput label="Address" name="HomeAddress" value={formData.HomeAddress} onChange={(e) => setFormData({ ...formData, [e.target.name]: e.target.value })} />
-          <Button fullWidth mt="md" onClick={handleCreateCustomer} loading={submitting}>Create Customer</Button>
+          <Button fullWidth mt="md" onClick={handleCreateCustomer}>Create Customer</Button>
         </Stack>
       </Modal>
 
       {/* --- MODAL 2: Create Transaction (Global) --- */}
       <Modal opened={txModalOpened} onClose={closeTxModal} title="Record Transaction" centered>
         <Stack>
-          <Select label="Select Customer" placeholder="Search..." searchable data={customerOptions} value={txForm.customerId ? txForm.customerId.toString() : null} onChange={(val) => setTxForm({ ...txForm, customerId: val })} />
+          {/* Options are already filtered by the server */}
+          <Select
+            label="Select Customer" placeholder="Search..." searchable data={customerOptions}
+            searchValue={pickerSearch} onSearchChange={setPickerSearch} filter={({ options }) => options}
+            value={txForm.customerId ? txForm.customerId.toString() : null}
+            onChange={(val, option) => { setTxForm({ ...txForm, customerId: val }); setPickedOption(option); }}
+          />
           <NumberInput label="Amount" placeholder="0.00" prefix="$" decimalScale={2} value={txForm.amount} onChange={(val) => setTxForm({ ...txForm, amount: val })} />
           <TextInput label="Notes" placeholder="Invoice #, Refund, etc." leftSection={<IconNote size={16} />} value={txForm.notes} onChange={(e) => setTxForm({ ...txForm, notes: e.target.value })} />
-          <Button fullWidth mt="md" onClick={() => handleTransactionSubmit('global')} loading={txSubmitting} disabled={!txForm.customerId || !txForm.amount}>Post Transaction</Button>
+          <Button fullWidth mt="md" onClick={() => handleTransactionSubmit('global')} disabled={!txForm.customerId || !txForm.amount}>Post Transaction</Button>
         </Stack>
       </Modal>
 
@@ -500,23 +726,23 @@ function App() {
 
       {/* --- DRAWER: Customer Details --- */}
       <Drawer opened={drawerOpened} onClose={closeDrawer} position="right" size="md" title="Customer Overview">
-        {selectedCustomer && (
+        {drawerCustomer && (
           <Stack>
             <Paper withBorder p="md" radius="md" bg="var(--mantine-color-gray-0)">
-              <Center mb="sm"><Avatar size="xl" radius="xl">{getInitials(selectedCustomer.CustomerName)}</Avatar></Center>
-              <Text ta="center" size="xl" fw={700} mb="md">{selectedCustomer.CustomerName}</Text>
+              <Center mb="sm"><Avatar size="xl" radius="xl">{getInitials(drawerCustomer.CustomerName)}</Avatar></Center>
+              <Text ta="center" size="xl" fw={700} mb="md">{drawerCustomer.CustomerName}</Text>
 
               <Stack gap="sm" mb="md">
-                <Group wrap="nowrap"><ThemeIcon variant="light" color="gray" size="sm"><IconMail size={14} /></ThemeIcon><Text size="sm" c="dimmed" style={{ wordBreak: 'break-all' }}>{selectedCustomer.Email || 'No Email'}</Text></Group>
-                <Group wrap="nowrap"><ThemeIcon variant="light" color="gray" size="sm"><IconPhone size={14} /></ThemeIcon><Text size="sm" c="dimmed">{selectedCustomer.PhoneNumber || 'No Phone'}</Text></Group>
-                <Group wrap="nowrap"><ThemeIcon variant="light" color="gray" size="sm"><IconMapPin size={14} /></ThemeIcon><Text size="sm" c="dimmed" style={{ whiteSpace: 'normal' }}>{selectedCustomer.HomeAddress || 'No Address'}</Text></Group>
+                <Group wrap="nowrap"><ThemeIcon variant="light" color="gray" size="sm"><IconMail size={14} /></ThemeIcon><Text size="sm" c="dimmed" style={{ wordBreak: 'break-all' }}>{drawerCustomer.Email || 'No Email'}</Text></Group>
+                <Group wrap="nowrap"><ThemeIcon variant="light" color="gray" size="sm"><IconPhone size={14} /></ThemeIcon><Text size="sm" c="dimmed">{drawerCustomer.PhoneNumber || 'No Phone'}</Text></Group>
+                <Group wrap="nowrap"><ThemeIcon variant="light" color="gray" size="sm"><IconMapPin size={14} /></ThemeIcon><Text size="sm" c="dimmed" style={{ whiteSpace: 'normal' }}>{drawerCustomer.HomeAddress || 'No Address'}</Text></Group>
               </Stack>
 
               <Divider my="sm" />
               <Group justify="space-between">
                 <Text size="sm" fw={500}>Current Balance</Text>
-                <Text size="xl" fw={700} c={(selectedCustomer.transactions?.reduce((a, t) => a + parseFloat(t.Amount), 0) || 0) >= 0 ? 'green' : 'red'}>
-                  {formatMoney(selectedCustomer.transactions?.reduce((a, t) => a + parseFloat(t.Amount), 0) || 0)}
+                <Text size="xl" fw={700} c={parseFloat(drawerCustomer.Balance) >= 0 ? 'green' : 'red'}>
+                  {formatMoney(drawerCustomer.Balance)}
                 </Text>
               </Group>
             </Paper>
@@ -524,13 +750,13 @@ function App() {
             <Text fw={600} size="sm" mt="md">Quick Action</Text>
             <Group align="end" grow>
               <NumberInput prefix="$" placeholder="0.00" value={txForm.amount} onChange={(val) => setTxForm({ ...txForm, amount: val })} />
-              <Button onClick={() => handleTransactionSubmit('drawer')} loading={txSubmitting}>Post</Button>
+              <Button onClick={() => handleTransactionSubmit('drawer')}>Post</Button>
             </Group>
             <TextInput placeholder="Add a note..." mt="xs" leftSection={<IconNote size={16} />} value={txForm.notes} onChange={(e) => setTxForm({ ...txForm, notes: e.target.value })} />
 
             <Divider label="History" labelPosition="center" mt="lg" />
             <Stack gap="xs">
-              {[...(selectedCustomer.transactions || [])].reverse().map(tx => (
+              {drawerHistory.map(tx => (
                 <Paper key={tx.TransactionID} withBorder p="sm" radius="md">
                   <Group justify="space-between" mb={4}>
                     <Text size="xs" c="dimmed">{formatDate(tx.EntryDate)}</Text>
@@ -0,0 +1,56 @@
+import { useEffect, useRef, useState } from 'react';
+import { ScrollArea, Table } from '@mantine/core';
+
+// Windowed table: only the rows in view (plus `overscan` on each side) are in
+// the DOM, so rendering doesn't grow with the row count.
+// Every row must be exactly `rowHeight` px tall.
+
+// Browsers cap how tall an element can be (Firefox at ~17.9M px; 500,000
+// rows x 44px is 22M). Past this the scroll range is compressed: the
+// scrollbar covers every row, each pixel of scrolling just moves more than
+// one pixel's worth of rows.
+const MAX_SCROLL_HEIGHT = 10_000_000;
+export function VirtualTable({
+  rowCount, rowHeight, renderRow, head, onRangeChange, resetKey,
+  height = 560, overscan = 6, minWidth = 600
+}) {
+  const viewportRef = useRef(null);
+  const [scrollTop, setScrollTop] = useState(0);
+
+  // New search: back to the top
+  useEffect(() => { viewportRef.current?.scrollTo({ top: 0 }); }, [resetKey]);
+
+  const fullHeight = rowCount * rowHeight;
+  const scrollHeight = Math.min(fullHeight, MAX_SCROLL_HEIGHT);
+  const ratio = fullHeight > scrollHeight ? (fullHeight - height) / (scrollHeight - height) : 1;
+  const offset = scrollTop * ratio; // the scroll position at full size
+
+  // Rows that would start above the content's top edge are out of view anyway
+  const first = Math.max(0, Math.floor(offset / rowHeight) - overscan, Math.ceil((offset - scrollTop) / rowHeight));
+  const last = Math.min(rowCount, Math.ceil((offset + height) / rowHeight) + overscan);
+  const top = scrollTop - (offset - first * rowHeight); // where row `first` goes
+  const bottom = Math.max(0, scrollHeight - top - (last - first) * rowHeight);
+
+  // Lets the owner fetch the rows that just scrolled into view
+  useEffect(() => { onRangeChange?.(first, last); }, [first, last, onRangeChange]);
+
+  const rows = [];
+  for (let i = first; i < last; i++) rows.push(renderRow(i));
+
+  // Spacer rows stand in for everything above / below the window. The extra
+  // empty row keeps the stripes from flickering as `first` changes parity.
+  const above = top > 0 ? 1 : 0;
+  return (
+    <ScrollArea h={height} viewportRef={viewportRef} onScrollPositionChange={({ y }) => setScrollTop(y)}>
+      <Table striped highlightOnHover stickyHeader verticalSpacing="xs" layout="fixed" miw={minWidth}>
+        <Table.Thead>{head}</Table.Thead>
+        <Table.Tbody>
+          {above > 0 && <Table.Tr style={{ height: top }} />}
+          {(first + above) % 2 === 1 && <Table.Tr />}
+          {rows}
+          {bottom > 0 && <Table.Tr style={{ height: bottom }} />}
+        </Table.Tbody>
+      </Table>
+    </ScrollArea>
+  );
+}
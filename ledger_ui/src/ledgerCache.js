@@ -0,0 +1,68 @@
+// Offline copy of the ledger in IndexedDB: customers and transactions keyed by
+// their IDs, plus the /sync/ cursors (high-water marks). Without IndexedDB
+// (some private windows) every call is a no-op and the app reads the server.
+const DB_NAME = 'ledger-cache';
+const DB_VERSION = 1;
+const STORES = ['customers', 'transactions', 'meta'];
+
+let dbPromise = null;
+const openDb = () => {
+  if (!dbPromise) {
+    dbPromise = new Promise((resolve) => {
+      if (typeof indexedDB === 'undefined') return resolve(null);
+      const req = indexedDB.open(DB_NAME, DB_VERSION);
+      req.onupgradeneeded = () => {
+        req.result.createObjectStore('customers', { keyPath: 'CustomerID' });
+        req.result.createObjectStore('transactions', { keyPath: 'TransactionID' });
+        req.result.createObjectStore('meta');
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => resolve(null);
+    });
+  }
+  return dbPromise;
+};
+
+const result = (req) => new Promise((resolve, reject) => {
+  req.onsuccess = () => resolve(req.result);
+  req.onerror = () => reject(req.error);
+});
+
+const committed = (tx) => new Promise((resolve, reject) => {
+  tx.oncomplete = () => resolve();
+  tx.onerror = tx.onabort = () => reject(tx.error);
+});
+
+// Everything cached: { customers, transactions, cursor }, or null if nothing is
+export async function loadCache() {
+  const db = await openDb();
+  if (!db) return null;
+  const tx = db.transaction(STORES, 'readonly');
+  const [customers, transactions, cursor] = await Promise.all([
+    result(tx.objectStore('customers').getAll()),
+    result(tx.objectStore('transactions').getAll()),
+    result(tx.objectStore('meta').get('cursor'))
+  ]);
+  return cursor ? { customers, transactions, cursor } : null;
+}
+
+// One /sync/ answer: rows and the cursor that covers them, in one transaction
+// so a closed tab can't leave the cursor ahead of the rows
+export async function saveChanges(customers, transactions, cursor) {
+  const db = await openDb();
+  if (!db) return;
+  const tx = db.transaction(STORES, 'readwrite');
+  customers.forEach((c) => tx.objectStore('customers').put(c));
+  transactions.forEach((t) => tx.objectStore('transactions').put(t));
+  tx.objectStore('meta').put(cursor, 'cursor');
+  return committed(tx);
+}
+
+// Logout: the next user must not see this user's ledger
+export async function clearCache() {
+  const db = await openDb();
+  if (!db) return;
+  const tx = db.transaction(STORES, 'readwrite');
+  STORES.forEach((name) => tx.objectStore(name).clear());
+  return committed(tx);
+}
@@ -0,0 +1,21 @@
+import { useMemo, useRef } from 'react';
+
+// Filters an already sorted `list` for the search text `q` (so the result is
+// sorted too). Typing on narrows the previous matches instead of scanning the
+// whole list again; a new list, query or `source` (what `test` reads besides
+// the item, e.g. the customers Map) starts over. `test(q, item, source)`
+// must be a stable function.
+export function useIncrementalSearch(list, q, source, test) {
+  const last = useRef(null);
+  return useMemo(() => {
+    if (!list || !q) {
+      last.current = null;
+      return list;
+    }
+    const prev = last.current;
+    const narrows = prev && prev.list === list && prev.source === source && q.includes(prev.q);
+    const result = (narrows ? prev.result : list).filter((item) => test(q, item, source));
+    last.current = { list, q, source, result };
+    return result;
+  }, [list, q, source, test]);
+}
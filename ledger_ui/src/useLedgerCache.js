@@ -0,0 +1,231 @@
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
+import { clearCache, loadCache, saveChanges } from './ledgerCache.js';
+
+const SYNC_INTERVAL_MS = 60_000; // background delta refresh
+
+const empty = () => ({ customers: new Map(), transactions: new Map(), customerIds: [], txOrder: [] });
+const ID_KEY = { customers: 'CustomerID', transactions: 'TransactionID' };
+
+const cents = (amount) => Math.round(parseFloat(amount) * 100);
+const addMoney = (a, b) => ((cents(a) + cents(b)) / 100).toFixed(2);
+const withTransaction = (c, tx) => ({ ...c, TxCount: c.TxCount + 1, Balance: addMoney(c.Balance, tx.Amount) });
+
+// Copies saved before the server sent resume cursors start from the page cursor
+const resumeCursor = (at) => (at.resume_since
+  ? { since: at.resume_since, afterId: at.resume_after_id }
+  : { since: at.customers_since, afterId: at.customers_after_id });
+
+// The copy is kept sorted the way the tables show it (customers by ID,
+// transactions newest first), so rendering and searching never sort.
+// EntryDate is parsed once, when a row comes in.
+const byId = (a, b) => a - b;
+const newestFirst = (a, b) => b.EntryTime - a.EntryTime || b.TransactionID - a.TransactionID;
+const withTime = (tx) => ({ ...tx, EntryTime: Date.parse(tx.EntryDate) });
+
+// Index of the first item in `sorted` that comes after `item`
+const sortedIndex = (sorted, item, compare) => {
+  let lo = 0, hi = sorted.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (compare(sorted[mid], item) <= 0) lo = mid + 1; else hi = mid;
+  }
+  return lo;
+};
+
+// A sync delta is a handful of rows: binary-insert them. A big page (the
+// first download, a stored copy) is cheaper to append and sort once.
+const insertSorted = (sorted, added, compare) => {
+  if (added.length === 0) return sorted;
+  if (added.length > 64) return [...sorted, ...added].sort(compare);
+  const next = sorted.slice();
+  added.forEach((item) => next.splice(sortedIndex(next, item, compare), 0, item));
+  return next;
+};
+
+const merge = (prev, page) => {
+  const customers = new Map(prev.customers);
+  const newIds = page.customers.map((c) => c.CustomerID).filter((id) => !customers.has(id));
+  page.customers.forEach((c) => customers.set(c.CustomerID, c));
+
+  const transactions = new Map(prev.transactions);
+  const added = [];
+  let txOrder = prev.txOrder;
+  page.transactions.forEach((t) => {
+    const tx = withTime(t);
+    const old = transactions.get(tx.TransactionID);
+    transactions.set(tx.TransactionID, tx);
+    if (!old) { added.push(tx); return; }
+    // Seen before (e.g. settled, then synced): swap the row in place
+    if (txOrder === prev.txOrder) txOrder = txOrder.slice();
+    txOrder[sortedIndex(txOrder, old, newestFirst) - 1] = tx;
+  });
+  return {
+    customers,
+    transactions,
+    customerIds: insertSorted(prev.customerIds, newIds, byId),
+    txOrder: insertSorted(txOrder, added, newestFirst)
+  };
+};
+
+// The whole ledger, kept in IndexedDB and refreshed with /sync/ deltas.
+// Startup renders from the stored copy, then asks the server only for rows
+// past the stored cursors. Mutations show up right away as pending rows
+// (negative IDs, never stored) until the server confirms or rejects them.
+// `complete` turns true once a full copy is on this device.
+export function useLedgerCache(request, enabled) {
+  const [data, setData] = useState(empty);
+  const [pending, setPending] = useState(empty);
+  const [complete, setComplete] = useState(false);
+  const [offline, setOffline] = useState(false);
+
+  const cursor = useRef(null);
+  const inFlight = useRef(null);
+  const rerun = useRef(false); // a write landed while a sync was already running
+  const generation = useRef(0); // bumped by clear(): late answers are dropped
+  const nextTempId = useRef(-1);
+  const requestRef = useRef(request);
+  useEffect(() => { requestRef.current = request; });
+
+  const sync = useCallback(function run() {
+    if (inFlight.current) {
+      rerun.current = true;
+      return inFlight.current;
+    }
+    const gen = generation.current;
+    inFlight.current = (async () => {
+      const start = cursor.current;
+      let more = true;
+      while (more && gen === generation.current) {
+        const at = cursor.current;
+        const params = new URLSearchParams({ after_tx: at?.after_tx ?? 0 });
+        if (at?.customers_since) {
+          // A round starts from the server's resume cursor, which stays behind
+          // customer edits that may not have committed yet; `more` pages on
+          const { since, afterId } = at === start
+            ? resumeCursor(at)
+            : { since: at.customers_since, afterId: at.customers_after_id };
+          params.set('customers_since', since);
+          params.set('customers_after_id', afterId);
+        }
+        const res = await requestRef.current(`/sync/?${params}`);
+        if (!res.ok) throw new Error('Sync failed');
+        const page = await res.json();
+        if (gen !== generation.current) break;
+
+        const next = {
+          after_tx: page.after_tx,
+          customers_since: page.customers_since,
+          customers_after_id: page.customers_after_id,
+          resume_since: page.customers_resume_since,
+          resume_after_id: page.customers_resume_after_id,
+          complete: Boolean(at?.complete) || !page.more
+        };
+        cursor.current = next;
+        setData((prev) => merge(prev, page));
+        setComplete(next.complete);
+        await saveChanges(page.customers, page.transactions, next).catch(() => {}); // quota: memory only
+        more = page.more;
+      }
+      setOffline(false);
+    })()
+      .catch((err) => { setOffline(true); throw err; })
+      .finally(() => {
+        inFlight.current = null;
+        if (rerun.current) {
+          rerun.current = false;
+          run().catch(() => {});
+        }
+      });
+    return inFlight.current;
+  }, []);
+
+  // Stored copy first, then whatever changed since it was stored
+  useEffect(() => {
+    if (!enabled) return;
+    let cancelled = false;
+    loadCache()
+      .catch(() => null)
+      .then((cached) => {
+        if (cancelled) return;
+        if (cached && !cursor.current) {
+          cursor.current = cached.cursor;
+          setData(merge(empty(), cached));
+          setComplete(Boolean(cached.cursor.complete));
+        }
+        sync().catch(() => {});
+      });
+    const onOnline = () => sync().catch(() => {});
+    const timer = setInterval(onOnline, SYNC_INTERVAL_MS);
+    window.addEventListener('online', onOnline);
+    return () => {
+      cancelled = true;
+      clearInterval(timer);
+      window.removeEventListener('online', onOnline);
+    };
+  }, [enabled, sync]);
+
+  // kind: 'customers' | 'transactions'. Returns the temporary ID.
+  const addPending = useCallback((kind, row) => {
+    const id = nextTempId.current--;
+    setPending((p) => ({ ...p, [kind]: new Map(p[kind]).set(id, { ...row, [ID_KEY[kind]]: id }) }));
+    return id;
+  }, []);
+
+  // The server answered: swap the pending row for `saved`, or drop it (rollback)
+  const settle = useCallback((kind, tempId, saved) => {
+    setPending((p) => {
+      const rows = new Map(p[kind]);
+      rows.delete(tempId);
+      return { ...p, [kind]: rows };
+    });
+    if (saved) {
+      setData((prev) => {
+        if (prev[kind].has(saved[ID_KEY[kind]])) return prev; // a sync got there first
+        const next = merge(prev, { customers: [], transactions: [], [kind]: [saved] });
+        const owner = kind === 'transactions' && prev.customers.get(saved.CustomerID);
+        if (owner) next.customers.set(owner.CustomerID, withTransaction(owner, saved));
+        return next;
+      });
+    }
+    sync().catch(() => {}); // authoritative balances (and the rows, stored)
+  }, [sync]);
+
+  const clear = useCallback(() => {
+    generation.current++;
+    rerun.current = false;
+    cursor.current = null;
+    setData(empty());
+    setPending(empty());
+    setComplete(false);
+    return clearCache().catch(() => {});
+  }, []);
+
+  // Pending rows merged in, so balances move with them
+  const customers = useMemo(() => {
+    const rows = new Map(data.customers);
+    pending.customers.forEach((c, id) => rows.set(id, c));
+    pending.transactions.forEach((tx) => {
+      const c = rows.get(tx.CustomerID);
+      if (c) rows.set(c.CustomerID, withTransaction(c, tx));
+    });
+    return rows;
+  }, [data.customers, pending]);
+
+  // Sorted like the tables: pending customers (negative IDs) first, pending
+  // transactions (just posted, so the newest) on top
+  const customerIds = useMemo(
+    () => (pending.customers.size
+      ? [...[...pending.customers.keys()].sort(byId), ...data.customerIds]
+      : data.customerIds),
+    [data.customerIds, pending.customers]
+  );
+
+  const transactions = useMemo(
+    () => (pending.transactions.size
+      ? [...[...pending.transactions.values()].reverse(), ...data.txOrder]
+      : data.txOrder),
+    [data.txOrder, pending.transactions]
+  );
+
+  return { complete, offline, customers, customerIds, transactions, sync, addPending, settle, clear };
+}
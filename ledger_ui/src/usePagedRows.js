@@ -0,0 +1,49 @@
+import { useCallback, useEffect, useRef, useState } from 'react';
+
+const MAX_PAGES = 20; // pages kept in memory; far-away ones are fetched again if needed
+
+const empty = (key) => ({ key, total: null, pages: new Map() });
+
+// Server-side paging for VirtualTable: rows are fetched a page at a time as
+// they scroll into view. `load(offset, limit)` resolves to { total, items }
+// (`total` only comes with the first page). A new `key` (search text, data
+// version) starts over from an empty table.
+export function usePagedRows(load, key, pageSize = 100) {
+  const [state, setState] = useState(() => empty(key));
+  const requested = useRef(new Set());
+  const latestKey = useRef(key);
+  useEffect(() => { latestKey.current = key; }, [key]);
+
+  const current = state.key === key ? state : empty(key);
+
+  const ensure = useCallback((first, last) => {
+    const lastPage = Math.floor(Math.max(last - 1, 0) / pageSize);
+    for (let page = Math.floor(first / pageSize); page <= lastPage; page++) {
+      const id = `${key}#${page}`;
+      if (requested.current.has(id)) continue;
+      requested.current.add(id);
+
+      load(page * pageSize, pageSize)
+        .then((data) => {
+          if (latestKey.current !== key) return; // answer to an old search
+          setState((prev) => {
+            const base = prev.key === key ? prev : empty(key);
+            const pages = new Map(base.pages).set(page, data.items);
+            // Memory stays flat too: forget the page furthest from this one
+            while (pages.size > MAX_PAGES) {
+              let far = page;
+              for (const p of pages.keys()) if (Math.abs(p - page) > Math.abs(far - page)) far = p;
+              pages.delete(far);
+              requested.current.delete(`${key}#${far}`);
+            }
+            return { key, total: data.total ?? base.total, pages };
+          });
+        })
+        .catch(() => { requested.current.delete(id); }); // retried on the next scroll
+    }
+  }, [key, load, pageSize]);
+
+  const row = (index) => current.pages.get(Math.floor(index / pageSize))?.[index % pageSize];
+
+  return { total: current.total, row, ensure };
+}